@@ -0,0 +1,45 @@
+"""
+Fixtures shared by the tests of w1thermsensor and the logger scripts
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# the package and the logger scripts in 记录温度 are not installed,
+# the package must come first since 记录温度 carries a copy of it
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "记录温度"))
+sys.path.insert(0, str(ROOT))
+
+# never try to load the kernel modules when a test has no base directory
+os.environ.setdefault("W1THERMSENSOR_NO_KERNEL_MODULE", "1")
+
+#: the w1_slave dump of a 12 bit DS18B20 reading 25.0625 °C
+RAW_SCRATCHPAD = "91 01 4b 46 7f ff 0c 10 1c"
+
+
+@pytest.fixture
+def sysfs_tree(tmp_path, monkeypatch):
+    """A static sysfs tree of two DS18B20 sensors on one bus master
+
+    The tree is used as ``BASE_DIRECTORY`` of the sensors. Every sensor has
+    a ``w1_slave`` dump and a ``temperature`` attribute with the same reading,
+    the bus master supports bulk conversions which finish immediately.
+    """
+    from w1thermsensor import W1ThermSensor
+
+    master = tmp_path / "w1_bus_master1"
+    master.mkdir()
+    (master / W1ThermSensor.BULK_READ_FILE).write_text("1\n")
+    for i in range(2):
+        sensor_directory = tmp_path / "28-{0:012x}".format(i + 1)
+        sensor_directory.mkdir()
+        (sensor_directory / W1ThermSensor.SLAVE_FILE).write_text(
+            "{0} : crc=1c YES\n{0} t=25062\n".format(RAW_SCRATCHPAD)
+        )
+        (sensor_directory / W1ThermSensor.TEMPERATURE_FILE).write_text("25062\n")
+    monkeypatch.setattr(W1ThermSensor, "BASE_DIRECTORY", tmp_path)
+    return tmp_path
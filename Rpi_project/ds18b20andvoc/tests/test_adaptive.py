@@ -0,0 +1,51 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.adaptive import AdaptiveResolution
+from w1thermsensor.errors import W1ThermSensorError
+from w1thermsensor.simulation import SimulatedBus
+
+
+def test_resolution_is_lowered_while_stable():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, seed=1)
+    sensor = AdaptiveResolution(W1ThermSensor(base_directory=bus.root), low=10, stable_readings=2)
+
+    # when
+    for _ in range(3):
+        sensor.get_temperature()
+
+    # then
+    assert sensor.resolution == 10
+    assert sensor.sensor.get_resolution() == 10
+
+
+def test_reading_is_kept_if_the_resolution_change_fails(monkeypatch):
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, seed=1)
+    sensor = AdaptiveResolution(W1ThermSensor(base_directory=bus.root), low=10, stable_readings=1)
+    sensor.get_temperature()
+
+    def set_resolution(resolution, persist=False):
+        raise W1ThermSensorError("Failed to change resolution")
+
+    monkeypatch.setattr(sensor.sensor, "set_resolution", set_resolution)
+
+    # when
+    with pytest.warns(RuntimeWarning, match="Keeping the resolution of 12 bit"):
+        temperature = sensor.get_temperature()
+
+    # then
+    assert -55 <= temperature <= 125
+    assert sensor.resolution == 12
+    assert isinstance(sensor.resolution_error, W1ThermSensorError)
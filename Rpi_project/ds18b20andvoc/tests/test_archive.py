@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+archive.py 压缩归档的测试
+"""
+
+import math
+import sqlite3
+import struct
+
+import pytest
+
+import archive
+from samples import INSERT_SAMPLE, get_channel_ids, update_rollups
+
+BASE = 86400 * 19000
+
+
+def assert_same_samples(actual, expected):
+    assert [ts for ts, _ in actual] == [ts for ts, _ in expected]
+    for (_, a), (_, b) in zip(actual, expected):
+        # 逐位比较，NaN 和 -0.0 也要原样还原
+        assert struct.pack(">d", a) == struct.pack(">d", b)
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [(BASE + 30 * i, 20 + i / 16) for i in range(2880)],
+        [(BASE + 30 * i + i % 3, -10.5 + (i % 7) / 16) for i in range(1000)],
+        [(BASE + i * i, round(0.01 * i, 2)) for i in range(200)],
+        [(BASE + i, 0.1 * i + 1e-9) for i in range(100)],
+        [(BASE, math.nan), (BASE + 1, math.inf), (BASE + 2, -math.inf), (BASE + 3, -0.0), (BASE + 4, 5e-324)],
+        [(BASE, 21.5)],
+        [],
+    ],
+    ids=["regular", "jitter", "hundredths", "xor", "special", "single", "empty"],
+)
+def test_encode_decode_round_trip(rows):
+    assert_same_samples(archive.decode_block(archive.encode_block(rows)), rows)
+
+
+def test_regular_samples_are_compressed():
+    rows = [(BASE + 30 * i, 20 + (i // 10 % 5) / 16) for i in range(2880)]
+
+    assert len(archive.encode_block(rows)) < len(rows)
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 63, -64, 64, 2 ** 40, -(2 ** 63)])
+def test_varint_round_trip(value):
+    out = bytearray()
+    archive.write_varint(out, value)
+
+    assert archive.read_varint(bytes(out), 0) == (value, len(out))
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "archive.db"), isolation_level=None)
+    archive.ensure_archive_schema(conn)
+    channel_id = get_channel_ids(conn, ["temp_list.temp"])["temp_list.temp"]
+    rows = [(channel_id, BASE + 30 * i, 18 + (i % 40) / 16) for i in range(3 * 2880)]
+    conn.execute("BEGIN")
+    conn.executemany(INSERT_SAMPLE, rows)
+    update_rollups(conn, channel_id, rows[0][1], rows[-1][1])
+    conn.execute("COMMIT")
+    yield conn, channel_id, [(ts, value) for _, ts, value in rows]
+    conn.close()
+
+
+def read_rollups(conn):
+    return conn.execute("SELECT * FROM samples_hour ORDER BY channel_id, bucket").fetchall()
+
+
+def test_archive_keeps_samples_and_rollups(db):
+    conn, channel_id, rows = db
+    rollups = read_rollups(conn)
+
+    archived = list(archive.archive(conn, BASE + 2 * 86400 + 1000, pause=0))
+
+    assert [(start, count) for _, start, count in archived] == [(BASE, 2880), (BASE + 86400, 2880)]
+    assert conn.execute("SELECT count(*) FROM samples").fetchone()[0] == 2880
+    assert list(archive.read_samples(conn, channel_id, 0, BASE + 3 * 86400)) == rows
+    assert read_rollups(conn) == rollups
+
+
+def test_read_samples_within_range(db):
+    conn, channel_id, rows = db
+    list(archive.archive(conn, BASE + 86400, pause=0))
+    start, end = BASE + 86400 - 1000, BASE + 86400 + 1000
+
+    assert list(archive.read_samples(conn, channel_id, start, end, chunk_size=7)) == [
+        (ts, value) for ts, value in rows if start <= ts < end
+    ]
+
+
+def test_archive_again_merges_late_samples(db):
+    conn, channel_id, rows = db
+    list(archive.archive(conn, BASE + 86400, pause=0))
+    # 归档后才写入的旧样本，以及与归档样本同一秒的样本
+    conn.execute(INSERT_SAMPLE, (channel_id, BASE + 15, 30.0))
+    conn.execute(INSERT_SAMPLE, (channel_id, BASE + 30, 99.0))
+
+    assert list(archive.archive(conn, BASE + 86400, pause=0)) == [("temp_list.temp", BASE, 2881)]
+
+    samples = list(archive.read_samples(conn, channel_id, BASE, BASE + 86400))
+    assert samples[:3] == [rows[0], (BASE + 15, 30.0), rows[1]]
+    assert len(samples) == 2881
+
+
+def test_archive_size(db):
+    conn, _, _ = db
+    list(archive.archive(conn, BASE + 86400, pause=0))
+
+    ((name, count, size),) = archive.archive_size(conn)
+
+    assert (name, count) == ("temp_list.temp", 2880)
+    assert 0 < size < count
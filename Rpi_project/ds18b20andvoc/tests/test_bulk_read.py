@@ -0,0 +1,145 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from w1thermsensor import AsyncW1ThermSensor, W1ThermSensor
+from w1thermsensor.errors import W1ThermSensorError
+from w1thermsensor.simulation import SimulatedBus
+
+
+def test_trigger_bulk_conversion(sysfs_tree):
+    # when
+    triggered = W1ThermSensor.trigger_bulk_conversion()
+
+    # then
+    assert triggered is True
+    assert W1ThermSensor.get_bulk_read_paths() == [
+        sysfs_tree / "w1_bus_master1" / W1ThermSensor.BULK_READ_FILE
+    ]
+
+
+def test_trigger_bulk_conversion_without_support(sysfs_tree):
+    # given
+    (sysfs_tree / "w1_bus_master1" / W1ThermSensor.BULK_READ_FILE).unlink()
+
+    # when
+    triggered = W1ThermSensor.trigger_bulk_conversion()
+
+    # then
+    assert triggered is False
+
+
+def test_trigger_bulk_conversion_on_simulated_bus():
+    # given
+    bus = SimulatedBus(sensors=3, time_scale=0.01, seed=1)
+
+    # when
+    triggered = W1ThermSensor.trigger_bulk_conversion(base_directory=bus.root)
+
+    # then
+    assert triggered is True
+    assert (bus.root / SimulatedBus.MASTER_NAME / "therm_bulk_read").read_text() == "1\n"
+
+
+def test_trigger_bulk_conversion_timeout():
+    # given a conversion which takes 7.5 seconds
+    bus = SimulatedBus(sensors=3, time_scale=10, seed=1)
+
+    # then
+    with pytest.raises(W1ThermSensorError, match="did not finish within"):
+        W1ThermSensor.trigger_bulk_conversion(timeout=0.05, base_directory=bus.root)
+
+
+def test_read_many_bulk_on_simulated_bus():
+    # given
+    bus = SimulatedBus(sensors=4, time_scale=0.01, seed=1)
+    sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)
+
+    # when
+    readings = W1ThermSensor.read_many(sensors, bulk=True)
+
+    # then
+    assert [r.sensor for r in readings] == sensors
+    assert all(r.ok for r in readings)
+
+
+@pytest.fixture
+def failing_trigger_tree(sysfs_tree):
+    """A sysfs tree whose bulk read trigger cannot be written"""
+    trigger = sysfs_tree / "w1_bus_master1" / W1ThermSensor.BULK_READ_FILE
+    trigger.unlink()
+    trigger.mkdir()
+    return sysfs_tree
+
+
+def test_trigger_bulk_conversion_fails(failing_trigger_tree):
+    # then
+    with pytest.raises(W1ThermSensorError, match="Failed to trigger"):
+        W1ThermSensor.trigger_bulk_conversion()
+
+
+def test_trigger_bulk_conversion_fails_to_poll(sysfs_tree, monkeypatch):
+    # given a bus master which vanishes after the conversion was triggered
+    def read_text(self, *args, **kwargs):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(Path, "read_text", read_text)
+
+    # then
+    with pytest.raises(W1ThermSensorError, match="Failed to read the bulk conversion state"):
+        W1ThermSensor.trigger_bulk_conversion()
+
+
+def test_read_many_bulk(sysfs_tree):
+    # given
+    sensors = W1ThermSensor.get_available_sensors()
+
+    # when
+    readings = W1ThermSensor.read_many(sensors, bulk=True)
+
+    # then
+    assert [r.sensor for r in readings] == sensors
+    assert [r.temperature for r in readings] == [25.0625, 25.0625]
+
+
+def test_read_all_bulk_falls_back_if_the_trigger_fails(failing_trigger_tree):
+    # when
+    with pytest.warns(RuntimeWarning, match="Falling back"):
+        readings = W1ThermSensor.read_all(bulk=True)
+
+    # then
+    assert len(readings) == 2
+    assert all(r.ok for r in readings)
+
+
+def test_async_read_all_bulk_falls_back_if_the_trigger_fails(failing_trigger_tree):
+    # when
+    with pytest.warns(RuntimeWarning, match="Falling back"):
+        readings = asyncio.run(AsyncW1ThermSensor.read_all(bulk=True))
+
+    # then
+    assert len(readings) == 2
+    assert all(r.ok for r in readings)
+
+
+def test_async_read_many_bulk(sysfs_tree):
+    # given
+    sensors = AsyncW1ThermSensor.get_available_sensors()
+
+    # when
+    readings = asyncio.run(AsyncW1ThermSensor.read_many(sensors, bulk=True))
+
+    # then
+    assert [r.sensor for r in readings] == sensors
+    assert [r.temperature for r in readings] == [25.0625, 25.0625]
@@ -0,0 +1,128 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2023 by Brett Lounsbury
+:license: MIT, see LICENSE for more details.
+"""
+
+import sqlite3
+
+import pytest
+
+from w1thermsensor.calibration_data import CalibrationData, MultiPointCalibrationData
+from w1thermsensor.errors import InvalidCalibrationDataError
+
+POINTS = [(98.6, 99.2), (0.4, 0.0), (24.6, 25.0)]
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE samples (raw REAL, corrected REAL)")
+    connection.executemany(
+        "INSERT INTO samples (raw) VALUES (?)", [(0.4,), (12.5,), (None,), (98.6,), (135.6,)]
+    )
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def test_points_are_stored_sorted():
+    # when
+    calibration_data = MultiPointCalibrationData(POINTS)
+
+    # then
+    assert calibration_data.points == ((0.4, 0.0), (24.6, 25.0), (98.6, 99.2))
+    assert calibration_data == MultiPointCalibrationData(tuple(reversed(POINTS)))
+    assert hash(calibration_data) == hash(MultiPointCalibrationData(sorted(POINTS)))
+
+
+@pytest.mark.parametrize(
+    "points",
+    [
+        pytest.param([], id="no points"),
+        pytest.param([(0.4, 0.0)], id="single point"),
+        pytest.param([(0.4, 0.0), (0.4, 0.2), (98.6, 99.2)], id="duplicate measured value"),
+    ],
+)
+def test_invalid_points(points):
+    with pytest.raises(InvalidCalibrationDataError):
+        MultiPointCalibrationData(points)
+
+
+@pytest.mark.parametrize(
+    "raw_temperature, expected_temperature",
+    [
+        pytest.param(0.4, 0.0, id="first point"),
+        pytest.param(24.6, 25.0, id="middle point"),
+        pytest.param(12.5, 12.5, id="first segment"),
+        pytest.param(61.6, 62.1, id="second segment"),
+        pytest.param(-11.7, -12.5, id="below the range"),
+        pytest.param(135.6, 136.3, id="above the range"),
+    ],
+)
+def test_multi_point_correction(raw_temperature, expected_temperature):
+    # given
+    calibration_data = MultiPointCalibrationData(POINTS)
+
+    # when
+    corrected = calibration_data.correct_temperature_for_calibration_data(raw_temperature)
+
+    # then
+    assert corrected == pytest.approx(expected_temperature)
+
+
+def test_multi_point_correction_of_arrays():
+    # given
+    np = pytest.importorskip("numpy")
+    calibration_data = MultiPointCalibrationData(POINTS)
+    raw_temperatures = [-11.7, 0.4, 12.5, 61.6, 135.6]
+
+    # when
+    corrected = calibration_data.correct_temperature_for_calibration_data(
+        np.array(raw_temperatures)
+    )
+
+    # then
+    np.testing.assert_allclose(corrected, [
+        calibration_data.correct_temperature_for_calibration_data(t) for t in raw_temperatures
+    ])
+
+
+def test_correct_sqlite_column_with_multi_point_data(connection):
+    # given
+    calibration_data = MultiPointCalibrationData(POINTS)
+
+    # when
+    rows = calibration_data.correct_sqlite_column(connection, "samples", "raw", "corrected")
+
+    # then
+    assert rows == 4
+    corrected = [r for r, in connection.execute("SELECT corrected FROM samples ORDER BY rowid")]
+    assert corrected[2] is None
+    assert corrected[:2] + corrected[3:] == pytest.approx([0.0, 12.5, 99.2, 136.3])
+
+
+def test_correct_sqlite_column_in_place(connection):
+    # given
+    calibration_data = CalibrationData(
+        measured_high_point=98.6, measured_low_point=0.4, reference_high_point=99.2
+    )
+
+    # when
+    rows = calibration_data.correct_sqlite_column(connection, "samples", "raw")
+
+    # then
+    assert rows == 4
+    raw = [r for r, in connection.execute("SELECT raw FROM samples ORDER BY rowid")]
+    assert raw[2] is None
+    assert raw[:2] + raw[3:] == pytest.approx([
+        calibration_data.correct_temperature_for_calibration_data(t) for t in (0.4, 12.5, 98.6, 135.6)
+    ])
+
+    # and the change is not committed
+    connection.rollback()
+    assert connection.execute("SELECT raw FROM samples WHERE rowid = 2").fetchone() == (12.5,)
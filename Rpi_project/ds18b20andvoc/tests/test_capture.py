@@ -0,0 +1,147 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import struct
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.capture import (
+    HEADER,
+    MAGIC,
+    RECORD,
+    CaptureRecord,
+    CaptureRecorder,
+    ReplayBus,
+    map_records,
+    read_records
+)
+from w1thermsensor.errors import SensorNotReadyError, W1ThermSensorError
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.simulation import SimulatedBus
+
+
+@pytest.fixture
+def capture_path(tmp_path):
+    return tmp_path / "sensors.w1cap"
+
+
+def record_simulated_reads(path, reads):
+    bus = SimulatedBus(sensors=1, time_scale=0, temperature_file=False, seed=3)
+    sensor = W1ThermSensor(base_directory=bus.root)
+    with CaptureRecorder(path) as recorder:
+        sensor.recorder = recorder
+        temperatures = [sensor.get_temperature() for _ in range(reads)]
+    return sensor, temperatures
+
+
+def test_record_layout(capture_path):
+    # given
+    sensor, _ = record_simulated_reads(capture_path, 3)
+
+    # when
+    data = capture_path.read_bytes()
+
+    # then
+    assert RECORD.format == "<dB6s9sB"
+    assert RECORD.size == 25
+    assert len(data) == HEADER.size + 3 * RECORD.size
+    assert HEADER.unpack_from(data) == (MAGIC, 1, RECORD.size)
+
+    timestamp, family, sensor_id, scratchpad, crc_ok = struct.unpack_from(
+        "<dB6s9sB", data, HEADER.size
+    )
+    assert timestamp > 0
+    assert family == sensor.type.value
+    assert sensor_id.hex() == sensor.id
+    assert len(scratchpad) == 9
+    assert crc_ok == 1
+
+
+def test_round_trip_through_replay_bus(capture_path):
+    # given
+    sensor, temperatures = record_simulated_reads(capture_path, 5)
+
+    # when
+    records = list(read_records(capture_path))
+    bus = ReplayBus(capture_path)
+    replayed = W1ThermSensor(sensor.type, sensor.id, base_directory=bus.root)
+
+    # then
+    assert [r.sensor_id for r in records] == [sensor.id] * 5
+    assert [replayed.get_temperature() for _ in range(5)] == temperatures
+
+
+def test_map_records_matches_read_records(capture_path):
+    # given
+    np = pytest.importorskip("numpy")
+    record_simulated_reads(capture_path, 4)
+
+    # when
+    mapped = map_records(capture_path)
+    records = list(read_records(capture_path))
+
+    # then
+    assert len(mapped) == len(records) == 4
+    np.testing.assert_array_equal(mapped["timestamp"], [r.timestamp for r in records])
+    assert bytes(mapped["id"][0]).hex() == records[0].sensor_id
+    assert bytes(mapped["scratchpad"][-1]) == records[-1].scratchpad
+    assert list(mapped["crc_ok"]) == [1, 1, 1, 1]
+
+
+def test_crc_failed_records_are_replayed(capture_path):
+    # given
+    scratchpad = bytes.fromhex("91 01 4b 46 7f ff 0c 10 1c")
+    with CaptureRecorder(capture_path) as recorder:
+        recorder.record(CaptureRecord(1.0, Sensor.DS18B20, "0000000000a1", scratchpad, False))
+        recorder.record(CaptureRecord(2.0, Sensor.DS18B20, "0000000000a1", scratchpad, True))
+
+    # when
+    bus = ReplayBus(capture_path)
+    sensor = W1ThermSensor(Sensor.DS18B20, "0000000000a1", base_directory=bus.root)
+
+    # then
+    assert [r.crc_ok for r in read_records(capture_path)] == [False, True]
+    with pytest.raises(SensorNotReadyError):
+        sensor.get_temperature()
+    assert sensor.get_temperature() == 25.0625
+
+
+def test_partially_written_record_is_skipped(capture_path):
+    # given
+    record_simulated_reads(capture_path, 2)
+    with capture_path.open("ab") as f:
+        f.write(b"\x00" * (RECORD.size // 2))
+
+    # when
+    records = list(read_records(capture_path))
+
+    # then
+    assert len(records) == 2
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        pytest.param(HEADER.pack(MAGIC, 2, RECORD.size), id="newer version"),
+        pytest.param(HEADER.pack(b"W1XXX", 1, RECORD.size), id="wrong magic"),
+        pytest.param(HEADER.pack(MAGIC, 1, 32), id="wrong record size"),
+        pytest.param(b"W1C", id="truncated"),
+    ],
+)
+def test_unsupported_capture_file(capture_path, header):
+    # given
+    capture_path.write_bytes(header)
+
+    # then
+    with pytest.raises(W1ThermSensorError, match="no supported capture file"):
+        list(read_records(capture_path))
+    with pytest.raises(W1ThermSensorError):
+        CaptureRecorder(capture_path)
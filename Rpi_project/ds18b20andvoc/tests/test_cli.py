@@ -0,0 +1,236 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.cli import cli
+from w1thermsensor.errors import SensorNotReadyError
+from w1thermsensor.registry import sensor_registry
+from w1thermsensor.simulation import SimulatedBus
+
+
+@pytest.fixture
+def simulate(monkeypatch):
+    """Select a simulated bus for all sensors, like W1THERMSENSOR_SIMULATE does"""
+    def simulate(spec):
+        bus = SimulatedBus.from_spec(spec)
+        monkeypatch.setattr(W1ThermSensor, "BASE_DIRECTORY", bus.root)
+        sensor_registry.invalidate()
+        return bus
+
+    yield simulate
+    sensor_registry.invalidate()
+
+
+@pytest.fixture
+def read_many_calls(monkeypatch):
+    """Record the arguments of every W1ThermSensor.read_many() call"""
+    calls = []
+    read_many = W1ThermSensor.read_many
+
+    def spy(sensors, unit, max_workers=None, bulk=False):
+        calls.append({"max_workers": max_workers, "bulk": bulk})
+        return read_many(sensors, unit, max_workers=max_workers, bulk=bulk)
+
+    monkeypatch.setattr(W1ThermSensor, "read_many", spy)
+    return calls
+
+
+def test_all(simulate, read_many_calls):
+    # given
+    bus = simulate("sensors=3,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all"])
+
+    # then
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[0] == "Got temperatures of 3 sensors:"
+    assert len(lines) == 4
+    for i, line in enumerate(lines[1:], start=1):
+        assert line.startswith("  Sensor {0} (".format(i))
+        assert line.endswith(" celsius")
+    assert {line.split("(")[1].split(")")[0] for line in lines[1:]} == {
+        s.id for s in bus.sensors.values()
+    }
+    assert result.stderr == ""
+    # the sensors are read concurrently by default
+    assert read_many_calls == [
+        {"max_workers": W1ThermSensor.MAX_CONCURRENT_READS, "bulk": False}
+    ]
+
+
+def test_all_parallel_and_bulk(simulate, read_many_calls):
+    # given
+    simulate("sensors=3,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all", "-p", "2", "-b", "-j"])
+
+    # then
+    assert result.exit_code == 0
+    assert read_many_calls == [{"max_workers": 2, "bulk": True}]
+    assert len(json.loads(result.stdout)) == 3
+
+
+def test_all_json_keeps_stderr_empty(simulate):
+    # given
+    simulate("sensors=2,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all", "-j"])
+
+    # then
+    assert result.exit_code == 0
+    assert result.stderr == ""
+    data = json.loads(result.stdout)
+    assert [d["id"] for d in data] == [1, 2]
+
+
+def test_all_json_with_elapsed(simulate):
+    # given
+    simulate("sensors=2,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all", "-j", "--elapsed"])
+
+    # then
+    assert result.exit_code == 0
+    assert result.stderr == ""
+    data = json.loads(result.stdout)
+    assert set(data) == {"readings", "elapsed"}
+    assert len(data["readings"]) == 2
+    assert data["elapsed"] >= 0
+
+
+def test_all_with_elapsed(simulate):
+    # given
+    simulate("sensors=2,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all", "-e"])
+
+    # then
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[0] == "Got temperatures of 2 sensors:"
+    assert lines[-1].startswith("Read all sensors in ")
+    assert lines[-1].endswith(" seconds")
+
+
+def test_all_raises_the_error_of_a_failed_read(simulate):
+    # given
+    simulate("sensors=2,time_scale=0,crc_failure_rate=1.0")
+
+    # when
+    result = CliRunner().invoke(cli, ["all"])
+
+    # then
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SensorNotReadyError)
+    assert result.stdout == ""
+
+
+def test_all_json_through_the_environment():
+    # given
+    env = dict(os.environ, W1THERMSENSOR_SIMULATE="sensors=2,time_scale=0")
+
+    # when
+    output = subprocess.check_output(
+        [sys.executable, "-m", "w1thermsensor", "all", "-j"],
+        cwd=str(Path(__file__).parents[1]),
+        env=env,
+        stderr=subprocess.STDOUT,
+    )
+
+    # then
+    assert len(json.loads(output)) == 2
+
+
+def test_watch_ndjson(simulate):
+    # given
+    bus = simulate("sensors=3,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["watch", "-n", "2", "-i", "0.01"])
+
+    # then
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(records) == 6
+    assert {r["hwid"] for r in records} == {s.id for s in bus.sensors.values()}
+    for record in records:
+        assert set(record) == {"timestamp", "hwid", "type", "temperature", "unit", "error"}
+        assert record["type"] == "DS18B20"
+        assert record["unit"] == "celsius"
+        assert isinstance(record["temperature"], float)
+        assert record["error"] is None
+    # all readings of a sweep share its timestamp
+    assert len({r["timestamp"] for r in records}) == 2
+
+
+def test_watch_csv(simulate):
+    # given
+    simulate("sensors=2,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(
+        cli, ["watch", "-n", "2", "-i", "0.01", "-f", "csv", "-u", "kelvin"]
+    )
+
+    # then
+    assert result.exit_code == 0
+    rows = list(csv.DictReader(io.StringIO(result.stdout)))
+    assert len(rows) == 4
+    assert all(row["unit"] == "kelvin" and row["error"] == "" for row in rows)
+    assert all(float(row["temperature"]) > 200 for row in rows)
+
+
+def test_watch_writes_error_rows(simulate):
+    # given
+    simulate("sensors=2,time_scale=0,crc_failure_rate=1.0")
+
+    # when
+    result = CliRunner().invoke(cli, ["watch", "-n", "2", "-i", "0.01"])
+
+    # then
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(records) == 4
+    for record in records:
+        assert record["temperature"] is None
+        assert "is not yet ready to read temperature" in record["error"]
+
+
+def test_watch_reports_sweeps_on_stderr(simulate):
+    # given
+    simulate("sensors=2,time_scale=0")
+
+    # when
+    result = CliRunner().invoke(cli, ["watch", "-n", "2", "-i", "0.01"])
+
+    # then
+    assert result.exit_code == 0
+    assert "Sweep" not in result.stdout
+    sweeps = result.stderr.splitlines()
+    assert len(sweeps) == 2
+    assert sweeps[0].startswith("Sweep 0: read 2 sensors in ")
+    assert sweeps[1].startswith("Sweep 1: read 2 sensors in ")
@@ -0,0 +1,106 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import pytest
+
+from w1thermsensor.benchmark import generate_raw_lines
+from w1thermsensor.decoder import TemperatureDecoder, decode_many
+from w1thermsensor.errors import ResetValueError
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.simulation import SimulatedSensor, crc8
+from w1thermsensor.units import Unit
+
+np = pytest.importorskip("numpy")
+
+
+def format_w1_slave(sensor, scratchpad, verdict):
+    """Return the w1_slave dump the kernel writes for the given scratchpad"""
+    data = " ".join("{0:02x}".format(b) for b in scratchpad)
+    return "{0} : crc={1:02x} {2}\n{0} t={3}\n".format(
+        data, crc8(scratchpad[:8]), "YES" if verdict else "NO",
+        sensor.get_millicelsius(scratchpad)
+    )
+
+
+def make_decoder(sensor_type=Sensor.DS18B20):
+    return TemperatureDecoder(sensor_type, "0000000001", 0.0, Unit.DEGREES_C, 85.0, 1.0)
+
+
+def test_decode_many_matches_decode_line():
+    # given
+    lines = generate_raw_lines(2000, seed=7)
+    decoder = make_decoder()
+
+    # when
+    temperatures = decode_many(lines)
+
+    # then the reset value is masked and everything else decoded alike
+    for line, temperature, masked in zip(lines, temperatures.data, temperatures.mask):
+        if masked:
+            with pytest.raises(ResetValueError):
+                decoder.decode_line(line)
+        else:
+            assert temperature == decoder.decode_line(line)
+
+
+def test_decode_many_whole_dumps():
+    # given
+    sensor = SimulatedSensor(Sensor.DS18B20, "0000000001")
+    dumps = []
+    expected = []
+    for temperature in (-55.0, -0.0625, 0.0, 21.5, 124.9375):
+        scratchpad = sensor.get_scratchpad(temperature)
+        dumps.append(format_w1_slave(sensor, scratchpad, True))
+        expected.append(temperature)
+
+    # when
+    temperatures = decode_many(dumps)
+
+    # then
+    assert temperatures.tolist() == expected
+    assert temperatures.tolist() == [
+        make_decoder().decode_line(dump.splitlines()[1]) for dump in dumps
+    ]
+
+
+def test_decode_many_ds18s20_matches_decode_line():
+    # given
+    sensor = SimulatedSensor(Sensor.DS18S20, "0000000001")
+    lines = [
+        format_w1_slave(sensor, sensor.get_scratchpad(t), True).splitlines()[1]
+        for t in (-10.25, 0.0, 18.75, 30.5)
+    ]
+    decoder = TemperatureDecoder(Sensor.DS18S20, "0000000001", 0.0, Unit.DEGREES_C, 85.0, 1e-3)
+
+    # when
+    temperatures = decode_many(lines, Sensor.DS18S20)
+
+    # then
+    assert temperatures.tolist() == pytest.approx(
+        [decoder.decode_millicelsius(int(line.split("t=")[1])) for line in lines]
+    )
+
+
+def test_decode_many_masks_invalid_entries():
+    # given
+    sensor = SimulatedSensor(Sensor.DS18B20, "0000000001")
+    good = format_w1_slave(sensor, sensor.get_scratchpad(20.0), True)
+    crc_failed = format_w1_slave(sensor, sensor.get_scratchpad(20.0), False)
+    reset = format_w1_slave(sensor, sensor.get_scratchpad(85.0), True)
+    no_answer = "00 00 00 00 00 00 00 00 00 : crc=00 YES\n"
+
+    # when
+    temperatures = decode_many([good, crc_failed, reset, no_answer, "garbage"])
+
+    # then
+    assert temperatures.mask.tolist() == [False, True, True, True, True]
+    assert temperatures[0] == 20.0
+    with pytest.raises(ResetValueError):
+        make_decoder().decode_line(reset.splitlines()[1])
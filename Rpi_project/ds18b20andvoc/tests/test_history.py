@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+history.py 查询和导出的测试
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+import history
+from archive import archive, ensure_archive_schema
+from samples import INSERT_SAMPLE, ensure_schema, get_channel_ids, update_rollups
+
+#: 一个 UTC 天的开始，样本从这里开始每 30 秒一个，共 3 天
+BASE = 86400 * 19000
+
+
+def make_samples(channel_id, count=3 * 2880, seed=1):
+    rng = random.Random(seed)
+    return [
+        (channel_id, BASE + 30 * i, round(rng.uniform(15, 30) * 16) / 16)
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "history.db"), isolation_level=None)
+    ensure_schema(conn)
+    channel_id = get_channel_ids(conn, ["temp_list.temp"])["temp_list.temp"]
+    rows = make_samples(channel_id)
+    conn.execute("BEGIN")
+    conn.executemany(INSERT_SAMPLE, rows)
+    update_rollups(conn, channel_id, rows[0][1], rows[-1][1])
+    conn.execute("COMMIT")
+    yield conn, rows
+    conn.close()
+
+
+def expected_rows(rows, start, end, interval):
+    """由样本直接计算 [start, end) 的重采样结果，从 start 之后的第一个整段开始"""
+    start += (-start) % interval
+    buckets = {}
+    for _, ts, value in rows:
+        if start <= ts < end:
+            bucket = buckets.setdefault(ts - ts % interval, [0, value, value, 0.0, 0.0])
+            bucket[0] += 1
+            bucket[1] = min(bucket[1], value)
+            bucket[2] = max(bucket[2], value)
+            bucket[3] += value
+            bucket[4] += value * value
+    return [history.resampled_row((ts, *bucket)) for ts, bucket in sorted(buckets.items())]
+
+
+def fetch(conn, start, end, interval):
+    return [row for chunk in history.query(conn, "temp_list.temp", start, end, interval, 7) for row in chunk]
+
+
+def assert_rows_equal(actual, expected):
+    assert [row[:4] for row in actual] == [row[:4] for row in expected]
+    assert [row[4:] for row in actual] == [pytest.approx(row[4:]) for row in expected]
+
+
+@pytest.mark.parametrize("interval", [60, 90, 3600, 7200, 86400])
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (BASE, BASE + 2 * 86400),
+        (BASE - 86400, BASE + 4 * 86400),
+        (BASE + 1234, BASE + 86400 + 5 * 3600 + 17),
+        (BASE - 3600, BASE + 3 * 86400 + 3600),
+        (BASE + 45, BASE + 100),
+    ],
+)
+def test_resampling_stays_within_start_and_end(db, start, end, interval):
+    conn, rows = db
+
+    actual = fetch(conn, start, end, interval)
+
+    assert_rows_equal(actual, expected_rows(rows, start, end, interval))
+    assert all(row[0] >= start and row[0] < end for row in actual)
+
+
+def test_rollup_query_only_includes_complete_buckets():
+    sql, params = history.build_rollup_query(1, BASE, BASE + 3 * 3600 + 1800, 3600)
+
+    assert "samples_hour" in sql
+    assert params == (3600, 1, BASE, BASE + 3 * 3600)
+
+
+def test_rollup_query_without_matching_rollup():
+    assert history.build_rollup_query(1, BASE, BASE + 86400, 90) is None
+
+
+def test_raw_samples(db):
+    conn, rows = db
+    start, end = BASE + 100, BASE + 1000
+
+    actual = fetch(conn, start, end, None)
+
+    assert actual == [(ts, value) for _, ts, value in rows if start <= ts < end]
+
+
+@pytest.mark.parametrize("interval", [0, -60])
+def test_interval_must_be_positive(db, interval):
+    conn, _ = db
+
+    with pytest.raises(ValueError):
+        fetch(conn, BASE, BASE + 86400, interval)
+
+
+def test_unknown_channel(db):
+    conn, _ = db
+
+    with pytest.raises(ValueError):
+        list(history.query(conn, "unknown"))
+
+
+@pytest.mark.parametrize("interval, columns", [(None, history.RAW_COLUMNS), (3600, history.RESAMPLED_COLUMNS)])
+def test_export_npy(db, tmp_path, interval, columns):
+    np = pytest.importorskip("numpy")
+    conn, _ = db
+    directory = tmp_path / "export"
+    start, end = BASE + 1234, BASE + 86400 + 17
+
+    written = history.export_npy(
+        history.query(conn, "temp_list.temp", start, end, interval, 100), columns, str(directory))
+
+    # 每列一个文件，可以只映射需要的列
+    assert sorted(path.name for path in directory.iterdir()) == sorted(f"{column}.npy" for column in columns)
+    arrays = [np.load(str(directory / f"{column}.npy"), mmap_mode="r") for column in columns]
+    assert all(array.shape == (written,) for array in arrays)
+    assert arrays[0].dtype == np.dtype("<i8")
+    assert list(zip(*(array.tolist() for array in arrays))) == pytest.approx(fetch(conn, start, end, interval))
+
+
+def test_export_npy_empty(db, tmp_path):
+    np = pytest.importorskip("numpy")
+    conn, _ = db
+    directory = tmp_path / "empty"
+
+    written = history.export_npy(history.query(conn, "temp_list.temp", 0, 1), history.RAW_COLUMNS, str(directory))
+
+    assert written == 0
+    assert all(np.load(str(directory / f"{column}.npy")).shape == (0,) for column in history.RAW_COLUMNS)
+
+
+def test_list_channels(db):
+    conn, rows = db
+
+    assert list(history.list_channels(conn)) == [("temp_list.temp", len(rows), rows[0][1], rows[-1][1])]
+
+
+def test_list_channels_with_archive(db):
+    conn, rows = db
+    ensure_archive_schema(conn)
+    channel_id = rows[0][0]
+    # 数值为 NULL 的样本不归档，比归档的样本还早
+    conn.execute(INSERT_SAMPLE, (channel_id, BASE - 86400, None))
+    list(archive(conn, BASE + 2 * 86400, pause=0))
+
+    assert list(history.list_channels(conn)) == [
+        ("temp_list.temp", len(rows) + 1, BASE - 86400, rows[-1][1])
+    ]
@@ -0,0 +1,193 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import pytest
+
+from w1thermsensor import W1ThermSensor, kernel
+from w1thermsensor.errors import KernelModuleLoadError
+
+PROC_MODULES = """\
+w1_gpio 16384 0 - Live 0x0000000000000000
+wire 36864 1 w1_gpio, Live 0x0000000000000000
+snd_bcm2835 24576 1 - Live 0x0000000000000000
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    """Point the kernel module lookups and the base directory into tmp_path"""
+    proc_modules = tmp_path / "proc_modules"
+    proc_modules.write_text(PROC_MODULES)
+    sys_modules = tmp_path / "sys_module"
+    sys_modules.mkdir()
+    monkeypatch.setattr(kernel, "PROC_MODULES", proc_modules)
+    monkeypatch.setattr(kernel, "SYS_MODULES", sys_modules)
+    monkeypatch.setattr(W1ThermSensor, "BASE_DIRECTORY", tmp_path / "devices")
+    return tmp_path
+
+
+@pytest.fixture
+def modprobe(monkeypatch):
+    """Record the commands run instead of running them"""
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+
+    monkeypatch.setattr(kernel.subprocess, "run", run)
+    return commands
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(kernel, "time", clock)
+    return clock
+
+
+def test_get_missing_kernel_modules(modules):
+    # then
+    assert kernel.get_missing_kernel_modules() == ["w1_therm"]
+    assert kernel.get_missing_kernel_modules(["wire", "w1_gpio"]) == []
+
+
+def test_built_in_kernel_modules_are_not_missing(modules):
+    # given
+    (modules / "sys_module" / "w1_therm").mkdir()
+
+    # then
+    assert kernel.get_missing_kernel_modules() == []
+
+
+def test_all_kernel_modules_are_missing_without_proc_modules(modules):
+    # given
+    (modules / "proc_modules").unlink()
+
+    # then
+    assert kernel.get_missing_kernel_modules() == ["w1_gpio", "w1_therm"]
+
+
+def test_load_kernel_modules_probes_only_missing_modules(modules, modprobe, clock):
+    # given the bus comes up a little after modprobe is run
+    def sleep(seconds):
+        FakeClock.sleep(clock, seconds)
+        W1ThermSensor.BASE_DIRECTORY.mkdir(exist_ok=True)
+
+    clock.sleep = sleep
+
+    # when
+    kernel.load_kernel_modules()
+
+    # then
+    assert modprobe == [["modprobe", "-a", "w1_therm"]]
+
+
+def test_load_kernel_modules_skips_an_existing_bus(modules, modprobe):
+    # given
+    W1ThermSensor.BASE_DIRECTORY.mkdir()
+
+    # when
+    kernel.load_kernel_modules()
+
+    # then
+    assert modprobe == []
+
+
+def test_load_kernel_modules_without_modprobe(modules, monkeypatch, clock):
+    # given
+    def run(command, **kwargs):
+        raise FileNotFoundError(command[0])
+
+    monkeypatch.setattr(kernel.subprocess, "run", run)
+
+    # then
+    with pytest.raises(KernelModuleLoadError):
+        kernel.load_kernel_modules()
+
+
+def test_wait_for_base_directory_backs_off(modules, clock):
+    # when
+    found = kernel.wait_for_base_directory(0.1)
+
+    # then
+    assert not found
+    assert clock.sleeps == pytest.approx([0.005, 0.01, 0.02, 0.04, 0.025])
+    assert clock.now == pytest.approx(100.1)
+
+
+def test_wait_for_base_directory_returns_once_it_exists(modules, clock):
+    # given the bus appears after the third check
+    def sleep(seconds):
+        FakeClock.sleep(clock, seconds)
+        if len(clock.sleeps) == 2:
+            W1ThermSensor.BASE_DIRECTORY.mkdir()
+
+    clock.sleep = sleep
+
+    # when
+    found = kernel.wait_for_base_directory(1.0)
+
+    # then
+    assert found
+    assert clock.sleeps == pytest.approx([0.005, 0.01])
+
+
+def test_load_kernel_modules_raises_if_the_bus_does_not_come_up(modules, modprobe, clock):
+    # when
+    with pytest.raises(KernelModuleLoadError):
+        kernel.load_kernel_modules()
+
+    # then
+    assert modprobe == [["modprobe", "-a", "w1_therm"]]
+    timeout = W1ThermSensor.RETRY_ATTEMPTS * W1ThermSensor.RETRY_DELAY_SECONDS
+    assert sum(clock.sleeps) == pytest.approx(timeout)
+    assert clock.sleeps[:3] == pytest.approx([0.005, 0.01, 0.02])
+
+
+def test_ensure_kernel_modules_loads_once(monkeypatch):
+    # given
+    loads = []
+    monkeypatch.delenv("W1THERMSENSOR_NO_KERNEL_MODULE", raising=False)
+    monkeypatch.setattr(kernel, "_loaded", False)
+    monkeypatch.setattr(kernel, "load_kernel_modules", lambda: loads.append(1))
+
+    # when
+    kernel.ensure_kernel_modules()
+    kernel.ensure_kernel_modules()
+
+    # then
+    assert loads == [1]
+
+
+def test_ensure_kernel_modules_can_be_disabled(monkeypatch):
+    # given
+    loads = []
+    monkeypatch.setenv("W1THERMSENSOR_NO_KERNEL_MODULE", "1")
+    monkeypatch.setattr(kernel, "_loaded", False)
+    monkeypatch.setattr(kernel, "load_kernel_modules", lambda: loads.append(1))
+
+    # when
+    kernel.ensure_kernel_modules()
+
+    # then
+    assert loads == []
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+migrate_db 的测试
+"""
+
+import sqlite3
+import sys
+import time
+
+import pytest
+
+import migrate_db
+
+# 旧表 temp_list 的行: (id, temp, date)，旧表中有 id 为 0 的行
+TEMP_LIST = [
+    (0, 21.5, "2024-01-01 00:00:00"),
+    (1, 21.6, "2024-01-01 00:10:00.250000"),
+    (2, None, "2024-01-01 00:20:00"),
+    (3, 21.8, "坏的时间"),
+    (4, 21.9, "2024-01-01 00:40:00"),
+    (5, 22.0, "2024-01-01 00:40:00"),
+    (6, 22.1, "2024-01-01 01:00:00"),
+]
+
+# 旧表 tempanvoc 的行: (id, timestamp, temp, ch2o, tvoc, co2)
+TEMPANVOC = [
+    (1, "2024-01-01 00:00:00", 20.5, 0.01, 0.2, 450.0),
+    (2, "2024-01-01 01:00:00", 20.7, None, 0.3, 470.0),
+]
+
+# 2024-01-01 00:00:00 UTC
+MIDNIGHT = 1704067200
+
+
+@pytest.fixture(autouse=True)
+def utc(monkeypatch):
+    """旧表的本地时间按 UTC 转换"""
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture(autouse=True)
+def no_pause(monkeypatch):
+    monkeypatch.setattr(migrate_db.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "temp_ds.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE temp_list (id INTEGER PRIMARY KEY, temp REAL, date TEXT)")
+    conn.executemany("INSERT INTO temp_list (id, temp, date) VALUES (?, ?, ?)", TEMP_LIST)
+    conn.execute(
+        "CREATE TABLE tempanvoc (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+        "temp REAL, ch2o REAL, tvoc REAL, co2 REAL)"
+    )
+    conn.executemany("INSERT INTO tempanvoc VALUES (?, ?, ?, ?, ?, ?)", TEMPANVOC)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def run_migration(monkeypatch, db_path, *args):
+    monkeypatch.setattr(sys, "argv", ["migrate_db.py", *args, db_path])
+    migrate_db.main()
+
+
+def fetch_samples(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT c.name, s.ts, s.value FROM samples s JOIN channels c ON c.id = s.channel_id "
+            "ORDER BY c.name, s.ts"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_migrate(monkeypatch, db_path):
+    # when
+    run_migration(monkeypatch, db_path)
+
+    # then 空值和无法解析的时间被跳过，同一秒的重复样本只保留第一个
+    assert fetch_samples(db_path) == [
+        ("temp_list.temp", MIDNIGHT, 21.5),
+        ("temp_list.temp", MIDNIGHT + 600, 21.6),
+        ("temp_list.temp", MIDNIGHT + 2400, 21.9),
+        ("temp_list.temp", MIDNIGHT + 3600, 22.1),
+        ("tempanvoc.ch2o", MIDNIGHT, 0.01),
+        ("tempanvoc.co2", MIDNIGHT, 450.0),
+        ("tempanvoc.co2", MIDNIGHT + 3600, 470.0),
+        ("tempanvoc.temp", MIDNIGHT, 20.5),
+        ("tempanvoc.temp", MIDNIGHT + 3600, 20.7),
+        ("tempanvoc.tvoc", MIDNIGHT, 0.2),
+        ("tempanvoc.tvoc", MIDNIGHT + 3600, 0.3),
+    ]
+
+    # and 旧表保持不变
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT count(*) FROM temp_list").fetchone() == (len(TEMP_LIST),)
+    conn.close()
+
+
+def test_migrate_prints_the_sample_counts(monkeypatch, db_path, capsys):
+    # when
+    run_migration(monkeypatch, db_path, "--chunk-size", "3")
+
+    # then
+    output = capsys.readouterr().out
+    assert "temp_list: 迁移了 4 个样本" in output
+    assert "tempanvoc: 迁移了 7 个样本" in output
+
+
+def test_migrate_without_legacy_tables(monkeypatch, tmp_path):
+    # given
+    db_path = str(tmp_path / "empty.db")
+
+    # when
+    run_migration(monkeypatch, db_path)
+
+    # then
+    assert fetch_samples(db_path) == []
+
+
+def test_migrate_resumes_after_an_interruption(monkeypatch, db_path):
+    # given 迁移在第一块之后被中断
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(migrate_db.time, "sleep", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        run_migration(monkeypatch, db_path, "--chunk-size", "2")
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT source, last_id FROM migration_progress").fetchall() == [
+        ("temp_list", 1)
+    ]
+    conn.close()
+    assert len(fetch_samples(db_path)) == 2
+
+    # when
+    monkeypatch.setattr(migrate_db.time, "sleep", lambda seconds: None)
+    run_migration(monkeypatch, db_path, "--chunk-size", "2")
+
+    # then
+    assert len(fetch_samples(db_path)) == 11
+
+
+def test_migrate_again_only_migrates_new_rows(monkeypatch, db_path, capsys):
+    # given
+    run_migration(monkeypatch, db_path)
+    capsys.readouterr()
+
+    # when 再次运行
+    run_migration(monkeypatch, db_path)
+
+    # then
+    assert "temp_list: 迁移了 0 个样本" in capsys.readouterr().out
+    assert len(fetch_samples(db_path)) == 11
+
+    # when 记录程序写入了新行
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO temp_list (temp, date) VALUES (22.3, '2024-01-01 01:10:00')")
+    conn.commit()
+    conn.close()
+    run_migration(monkeypatch, db_path)
+
+    # then
+    assert "temp_list: 迁移了 1 个样本" in capsys.readouterr().out
+    assert fetch_samples(db_path)[4] == ("temp_list.temp", MIDNIGHT + 4200, 22.3)
@@ -0,0 +1,81 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import threading
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.errors import NoSensorFoundError
+from w1thermsensor.simulation import SimulatedBus
+
+
+@pytest.fixture
+def bus():
+    return SimulatedBus(sensors=5, time_scale=0.01, seed=1)
+
+
+def test_read_many_keeps_the_order_of_the_sensors(bus):
+    # given
+    sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)[::-1]
+
+    # when
+    readings = W1ThermSensor.read_many(sensors)
+
+    # then
+    assert [r.sensor for r in readings] == sensors
+    assert all(r.ok and -55 <= r.temperature <= 125 for r in readings)
+
+
+def test_read_many_captures_the_error_of_a_failing_sensor(bus):
+    # given a sensor which is unplugged after it was discovered
+    sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)
+    bus.remove_sensor(sensors[2].id)
+
+    # when
+    readings = W1ThermSensor.read_many(sensors)
+
+    # then
+    assert [r.sensor for r in readings] == sensors
+    assert [r.ok for r in readings] == [True, True, False, True, True]
+    assert isinstance(readings[2].error, NoSensorFoundError)
+    assert readings[2].temperature is None
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_read_many_max_workers(bus, monkeypatch, max_workers):
+    # given
+    sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def read_file(parts, read_file=bus.read_file):
+        with lock:
+            active.append(parts)
+            peak.append(len(active))
+        try:
+            return read_file(parts)
+        finally:
+            with lock:
+                active.remove(parts)
+
+    monkeypatch.setattr(bus, "read_file", read_file)
+
+    # when
+    readings = W1ThermSensor.read_many(sensors, max_workers=max_workers)
+
+    # then
+    assert all(r.ok for r in readings)
+    assert max(peak) <= max_workers
+
+
+def test_read_many_without_sensors():
+    assert W1ThermSensor.read_many([]) == []
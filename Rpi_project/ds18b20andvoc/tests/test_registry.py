@@ -0,0 +1,161 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.errors import NoSensorFoundError
+from w1thermsensor.registry import SensorRegistry
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.simulation import SimulatedBus
+
+
+class CountingSensor(W1ThermSensor):
+    """Counts the scans of the bus"""
+
+    scans = 0
+
+    @classmethod
+    def get_available_sensors(cls, types=None, base_directory=None):
+        cls.scans += 1
+        return super().get_available_sensors(types, base_directory)
+
+
+@pytest.fixture
+def bus():
+    CountingSensor.scans = 0
+    return SimulatedBus(sensors=3, time_scale=0, seed=1)
+
+
+def make_registry(bus, ttl):
+    return SensorRegistry(CountingSensor, ttl=ttl, base_directory=bus.root)
+
+
+def ids(sensors):
+    return sorted(s.id for s in sensors)
+
+
+def test_no_rescan_within_the_ttl(bus):
+    # given
+    registry = make_registry(bus, ttl=3600)
+    sensors = registry.get_sensors()
+
+    # when a sensor is plugged in within the ttl
+    bus.add_sensor(sensor_id="00000000abcd")
+
+    # then
+    assert registry.get_sensors() == sensors
+    assert CountingSensor.scans == 1
+
+
+def test_rescan_once_the_ttl_expired(bus, monkeypatch):
+    # given
+    now = [1000.0]
+    monkeypatch.setattr("w1thermsensor.registry.time.monotonic", lambda: now[0])
+    registry = make_registry(bus, ttl=5)
+    registry.get_sensors()
+    bus.add_sensor(sensor_id="00000000abcd")
+
+    # when
+    now[0] += 4.9
+    within = registry.get_sensors()
+    now[0] += 0.2
+    expired = registry.get_sensors()
+
+    # then
+    assert len(within) == 3
+    assert len(expired) == 4
+    assert CountingSensor.scans == 2
+
+
+def test_no_rescan_if_the_slaves_did_not_change(bus):
+    # given
+    registry = make_registry(bus, ttl=0)
+    sensors = registry.get_sensors()
+
+    # when
+    again = registry.get_sensors()
+
+    # then
+    assert again == sensors
+    assert all(a is b for a, b in zip(again, sensors))
+    assert CountingSensor.scans == 1
+
+
+def test_rescan_after_a_slave_was_added(bus):
+    # given
+    registry = make_registry(bus, ttl=0)
+    before = ids(registry.get_sensors())
+
+    # when
+    bus.add_sensor(sensor_id="00000000abcd")
+
+    # then
+    assert ids(registry.get_sensors()) == sorted(before + ["00000000abcd"])
+    assert CountingSensor.scans == 2
+
+
+def test_rescan_after_a_slave_was_removed(bus):
+    # given
+    registry = make_registry(bus, ttl=0)
+    removed, *kept = ids(registry.get_sensors())
+
+    # when
+    bus.remove_sensor(removed)
+
+    # then
+    assert ids(registry.get_sensors()) == kept
+    with pytest.raises(NoSensorFoundError):
+        registry.get_sensor(removed)
+    assert CountingSensor.scans == 2
+
+
+def test_invalidate_forces_a_rescan(bus):
+    # given
+    registry = make_registry(bus, ttl=3600)
+    registry.get_sensors()
+
+    # when
+    registry.invalidate()
+    registry.get_sensors()
+
+    # then
+    assert CountingSensor.scans == 2
+
+
+def test_get_sensor(bus):
+    # given
+    registry = make_registry(bus, ttl=3600)
+    sensor_id = ids(registry.get_sensors())[0]
+
+    # when
+    sensor = registry.get_sensor(sensor_id)
+
+    # then
+    assert sensor.id == sensor_id
+    assert registry.get_sensor(sensor_id) is sensor
+    assert CountingSensor.scans == 1
+
+
+def test_get_sensor_not_connected(bus):
+    registry = make_registry(bus, ttl=3600)
+
+    with pytest.raises(NoSensorFoundError):
+        registry.get_sensor("00000000ffff")
+
+
+def test_get_sensors_by_type(bus):
+    # given
+    bus.add_sensor(Sensor.DS18S20, sensor_id="00000000abcd")
+    registry = make_registry(bus, ttl=3600)
+
+    # then
+    assert ids(registry.get_sensors([Sensor.DS18S20])) == ["00000000abcd"]
+    assert len(registry.get_sensors(["DS18B20"])) == 3
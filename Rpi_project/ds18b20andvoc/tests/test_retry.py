@@ -0,0 +1,176 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import threading
+
+import pytest
+
+from w1thermsensor import RetryPolicy, RetryScheduler
+from w1thermsensor.errors import (
+    NoSensorFoundError,
+    ResetValueError,
+    SensorNotReadyError,
+    SensorTimeoutError
+)
+from w1thermsensor.units import Unit
+
+NO_DELAY = RetryPolicy(attempts=3, delay=0, jitter=0)
+
+
+class FakeSensor:
+    """Sensor which fails with the given errors before it reads its temperature"""
+
+    def __init__(self, sensor_id, temperature=20.0, errors=(), release=None):
+        self.id = sensor_id
+        self.temperature = temperature
+        self.errors = list(errors)
+        self.release = release
+        self.reads = 0
+
+    def get_temperature(self, unit=Unit.DEGREES_C):
+        self.reads += 1
+        if self.release is not None:
+            self.release.wait()
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.temperature
+
+
+@pytest.mark.parametrize(
+    "error_factory",
+    [
+        pytest.param(SensorNotReadyError, id="not ready"),
+        pytest.param(lambda s: ResetValueError(s.id), id="reset value"),
+    ],
+)
+def test_sweep_retries_until_success(error_factory):
+    # given
+    sensor = FakeSensor("0000000000a1", temperature=21.5)
+    sensor.errors = [error_factory(sensor), error_factory(sensor)]
+
+    # when
+    with RetryScheduler(NO_DELAY) as scheduler:
+        (reading,) = scheduler.sweep([sensor])
+
+    # then
+    assert reading.ok
+    assert reading.temperature == 21.5
+    assert sensor.reads == 3
+
+
+def test_sweep_gives_up_after_attempts():
+    # given
+    sensor = FakeSensor("0000000000a1")
+    sensor.errors = [SensorNotReadyError(sensor) for _ in range(5)]
+
+    # when
+    with RetryScheduler(NO_DELAY) as scheduler:
+        (reading,) = scheduler.sweep([sensor])
+
+    # then
+    assert isinstance(reading.error, SensorNotReadyError)
+    assert sensor.reads == 4
+
+
+def test_sweep_returns_non_retryable_error_right_away():
+    # given
+    failing = FakeSensor("0000000000a1", errors=[NoSensorFoundError("Sensor 0000000000a1 is gone")])
+    broken = FakeSensor("0000000000a2", errors=[OSError("read failed")])
+    working = FakeSensor("0000000000a3", temperature=19.0)
+
+    # when
+    with RetryScheduler(NO_DELAY) as scheduler:
+        readings = scheduler.sweep([failing, broken, working])
+
+    # then
+    assert [r.sensor for r in readings] == [failing, broken, working]
+    assert isinstance(readings[0].error, NoSensorFoundError)
+    assert isinstance(readings[1].error, OSError)
+    assert readings[2].temperature == 19.0
+    assert failing.reads == 1
+    assert broken.reads == 1
+
+
+def test_sweep_returns_partial_readings_on_timeout():
+    # given
+    release = threading.Event()
+    slow = FakeSensor("0000000000a1", release=release)
+    fast = FakeSensor("0000000000a2", temperature=18.0)
+
+    # when
+    try:
+        with RetryScheduler(NO_DELAY) as scheduler:
+            slow_reading, fast_reading = scheduler.sweep([slow, fast], timeout=0.05)
+    finally:
+        release.set()
+
+    # then
+    assert fast_reading.temperature == 18.0
+    assert isinstance(slow_reading.error, SensorTimeoutError)
+    assert slow_reading.error.sensor is slow
+
+
+def test_sweep_drops_reads_left_over_from_an_earlier_sweep():
+    # given
+    release = threading.Event()
+    sensor = FakeSensor("0000000000a1", temperature=20.0, release=release)
+
+    with RetryScheduler(NO_DELAY) as scheduler:
+        (first,) = scheduler.sweep([sensor], timeout=0.05)
+
+        # when
+        sensor.temperature = 25.0
+        release.set()
+        (second,) = scheduler.sweep([sensor])
+
+    # then
+    assert isinstance(first.error, SensorTimeoutError)
+    assert second.temperature == 25.0
+    assert sensor.reads == 2
+
+
+def test_sweep_forgets_reads_of_sensors_no_longer_swept():
+    # given
+    release = threading.Event()
+    slow = FakeSensor("0000000000a1", release=release)
+    other = FakeSensor("0000000000a2")
+
+    with RetryScheduler(NO_DELAY) as scheduler:
+        scheduler.sweep([slow], timeout=0.05)
+
+        # when
+        scheduler.sweep([other])
+        release.set()
+
+        # then
+        assert slow.id not in scheduler._inflight
+
+
+def test_sweep_uses_per_sensor_policies():
+    # given
+    patient = FakeSensor("0000000000a1", temperature=22.0)
+    patient.errors = [SensorNotReadyError(patient) for _ in range(5)]
+    impatient = FakeSensor("0000000000a2")
+    impatient.errors = [SensorNotReadyError(impatient)]
+
+    scheduler = RetryScheduler(
+        RetryPolicy(attempts=0), policies={patient.id: RetryPolicy(attempts=5, delay=0, jitter=0)}
+    )
+
+    # when
+    with scheduler:
+        patient_reading, impatient_reading = scheduler.sweep([patient, impatient])
+
+    # then
+    assert scheduler.get_policy(patient).attempts == 5
+    assert patient_reading.temperature == 22.0
+    assert patient.reads == 6
+    assert isinstance(impatient_reading.error, SensorNotReadyError)
+    assert impatient.reads == 1
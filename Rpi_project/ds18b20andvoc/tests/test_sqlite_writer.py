@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+sqlite_writer.BatchWriter 的测试
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from sqlite_writer import BatchWriter
+
+INSERT = "INSERT INTO t (v) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "test.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (v REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def messages():
+    return []
+
+
+@pytest.fixture
+def make_writer(db_path, messages):
+    writers = []
+
+    def make_writer(**kwargs):
+        # 只由测试调用 flush() 写入，后台线程不会插手
+        kwargs.setdefault("max_rows", 1000)
+        kwargs.setdefault("max_delay", 3600)
+        writer = BatchWriter(db_path, handle_signals=False, log=messages.append, **kwargs)
+        writers.append(writer)
+        return writer
+
+    yield make_writer
+    for writer in writers:
+        writer.close()
+
+
+def read_values(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [v for v, in conn.execute("SELECT v FROM t ORDER BY v")]
+    finally:
+        conn.close()
+
+
+def test_rows_are_written_on_close(db_path, make_writer):
+    writer = make_writer()
+    for v in range(5):
+        writer.add(INSERT, (v,))
+    assert read_values(db_path) == []
+
+    writer.close()
+
+    assert read_values(db_path) == [0, 1, 2, 3, 4]
+
+
+def test_rows_are_written_when_max_rows_is_reached(db_path, make_writer):
+    writer = make_writer(max_rows=3)
+    for v in range(3):
+        writer.add(INSERT, (v,))
+
+    # 由后台线程写入
+    deadline = time.monotonic() + 5
+    while not read_values(db_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert read_values(db_path) == [0, 1, 2]
+
+
+def test_failing_rows_are_retried_and_then_dropped(db_path, make_writer, messages):
+    writer = make_writer(max_attempts=3)
+    writer.add(INSERT, (1,))
+    writer.add(INSERT, (None,))
+    writer.add(INSERT, (2,))
+
+    # 整批写入失败时样本留在缓存中
+    assert [writer.flush() for _ in range(3)] == [False, False, False]
+    assert read_values(db_path) == []
+    assert len(messages) == 3
+
+    # 之后逐条写入，写不进去的样本被丢弃
+    assert writer.flush() is True
+    assert read_values(db_path) == [1, 2]
+    assert "丢弃无法写入的样本 (None,)" in messages[-1]
+
+    # 恢复整批写入
+    writer.add(INSERT, (3,))
+    assert writer.flush() is True
+    assert read_values(db_path) == [1, 2, 3]
+
+
+def test_rows_added_while_failing_are_kept(db_path, make_writer):
+    writer = make_writer(max_attempts=2)
+    writer.add(INSERT, (None,))
+    assert writer.flush() is False
+    writer.add(INSERT, (1,))
+    assert writer.flush() is False
+
+    assert writer.flush() is True
+    assert read_values(db_path) == [1]
+
+
+def test_on_flush_exception_does_not_lose_rows(db_path, make_writer, messages):
+    calls = []
+
+    def on_flush(conn, pending):
+        calls.append(pending)
+        raise RuntimeError("boom")
+
+    writer = make_writer(max_attempts=2, on_flush=on_flush)
+    writer.add(INSERT, (1,))
+
+    assert writer.flush() is False
+    assert writer.flush() is False
+    assert read_values(db_path) == []
+
+    # 逐条写入时样本照常写入，on_flush 的失败记录到日志
+    assert writer.flush() is True
+    assert read_values(db_path) == [1]
+    assert len(calls) == 3
+    assert "on_flush 失败: boom" in messages[-1]
+    assert writer._thread.is_alive()
+
+
+def test_on_flush_runs_in_the_same_transaction(db_path, make_writer):
+    def on_flush(conn, pending):
+        conn.execute(INSERT, (len(pending[INSERT]) * 100,))
+
+    writer = make_writer(on_flush=on_flush)
+    writer.add(INSERT, (1,))
+    writer.add(INSERT, (2,))
+
+    assert writer.flush() is True
+    assert read_values(db_path) == [1, 2, 200]
+
+
+def test_add_after_close_fails(make_writer):
+    writer = make_writer()
+    writer.close()
+
+    with pytest.raises(ValueError):
+        writer.add(INSERT, (1,))
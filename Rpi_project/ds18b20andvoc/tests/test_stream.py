@@ -0,0 +1,136 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from w1thermsensor import AsyncW1ThermSensor, W1ThermSensor
+from w1thermsensor.errors import SensorNotReadyError
+from w1thermsensor.schedule import TickSchedule
+from w1thermsensor.simulation import SimulatedBus
+from w1thermsensor.units import Unit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_schedule_waits_for_the_next_tick():
+    # given
+    clock = FakeClock()
+    schedule = TickSchedule(1.0, clock=clock)
+
+    # when the first tick took 0.25 seconds
+    assert schedule.start() == 0.0
+    clock.now += 0.25
+    schedule.complete(0.25)
+
+    # then the next tick starts early by the estimated duration
+    assert schedule.tick == 1
+    assert schedule.start() == pytest.approx(0.5)
+    assert schedule.missed == 0
+
+
+def test_schedule_skips_overrun_ticks():
+    # given
+    clock = FakeClock()
+    schedule = TickSchedule(1.0, clock=clock)
+    schedule.start()
+
+    # when the first tick overran the next two
+    clock.now += 3.5
+    schedule.complete(3.5)
+
+    # then only the latest overdue tick is done
+    assert schedule.start() == 0.0
+    assert schedule.tick == 3
+    assert schedule.missed == 2
+    assert schedule.deadline == 103.0
+
+    # and the missed ticks are reported once
+    schedule.complete(0.1)
+    clock.now += 0.1
+    schedule.start()
+    assert schedule.tick == 4
+    assert schedule.missed == 0
+
+
+def test_schedule_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        TickSchedule(0)
+
+
+def test_stream_stops_after_count():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # when
+    readings = list(sensor.stream(0.01, units=(Unit.DEGREES_C, Unit.DEGREES_F), count=3))
+
+    # then
+    assert [r.tick for r in readings] == [0, 1, 2]
+    assert all(r.sensor is sensor and r.error is None for r in readings)
+    for reading in readings:
+        celsius, fahrenheit = reading.temperatures
+        assert fahrenheit == pytest.approx(celsius * 1.8 + 32)
+
+
+def test_stream_carries_sensor_errors():
+    # given a bus on which every read fails the CRC check
+    bus = SimulatedBus(sensors=1, time_scale=0, crc_failure_rate=1.0, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # when
+    readings = list(sensor.stream(0.01, count=2))
+
+    # then
+    assert len(readings) == 2
+    assert all(isinstance(r.error, SensorNotReadyError) for r in readings)
+    assert all(r.temperatures is None for r in readings)
+
+
+def test_stream_reports_missed_ticks():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # when processing the first reading overruns the next ticks
+    readings = []
+    for reading in sensor.stream(0.02, count=2):
+        readings.append(reading)
+        time.sleep(0.09)
+
+    # then
+    assert readings[0].missed == 0
+    assert readings[1].missed >= 2
+    assert readings[1].tick == 1 + readings[1].missed
+
+
+def test_async_stream():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, crc_failure_rate=1.0, seed=1)
+    sensor = AsyncW1ThermSensor(base_directory=bus.root)
+
+    async def collect():
+        return [reading async for reading in sensor.stream(0.01, count=3)]
+
+    # when
+    readings = asyncio.run(collect())
+
+    # then
+    assert [r.tick for r in readings] == [0, 1, 2]
+    assert all(isinstance(r.error, SensorNotReadyError) for r in readings)
@@ -0,0 +1,95 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.errors import SensorNotReadyError
+from w1thermsensor.simulation import SimulatedBus
+
+
+@pytest.mark.parametrize("keep_open", [False, True])
+def test_temperature_file_matches_w1_slave(sysfs_tree, keep_open):
+    for sensor in W1ThermSensor.get_available_sensors():
+        sensor = W1ThermSensor(sensor_id=sensor.id, keep_open=keep_open)
+        assert sensor.use_temperature_file
+
+        # when
+        from_temperature_file = sensor.get_temperature()
+        sensor.use_temperature_file = False
+        from_w1_slave = sensor.get_temperature()
+
+        # then
+        assert from_temperature_file == from_w1_slave == 25.0625
+        sensor.close()
+
+
+def test_temperature_file_is_preferred(sysfs_tree):
+    # given a w1_slave dump which would fail the CRC check
+    sensor = W1ThermSensor.get_available_sensors()[0]
+    sensor.sensorpath.write_text("garbage : crc=00 NO\ngarbage t=0\n")
+
+    # then
+    assert sensor.get_temperature() == 25.0625
+
+
+def test_w1_slave_is_used_without_temperature_file(sysfs_tree):
+    # given
+    for sensor_directory in sysfs_tree.glob("28-*"):
+        (sensor_directory / W1ThermSensor.TEMPERATURE_FILE).unlink()
+    sensor = W1ThermSensor.get_available_sensors()[0]
+
+    # then
+    assert not sensor.use_temperature_file
+    assert sensor.get_temperature() == 25.0625
+
+
+def test_w1_slave_crc_failure(sysfs_tree):
+    # given
+    sensor = W1ThermSensor.get_available_sensors()[0]
+    sensor.use_temperature_file = False
+    sensor.sensorpath.write_text("garbage : crc=00 NO\ngarbage t=0\n")
+
+    # then
+    with pytest.raises(SensorNotReadyError):
+        sensor.get_temperature()
+
+
+def test_temperature_file_is_used_on_simulated_bus():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, temperature_file=True, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # when
+    temperature = sensor.get_temperature()
+
+    # then
+    assert sensor.use_temperature_file
+    assert temperature * 16 == int(temperature * 16)
+
+
+def test_w1_slave_is_used_on_simulated_bus_without_temperature_file():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, temperature_file=False, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # then
+    assert not sensor.use_temperature_file
+    assert -55 <= sensor.get_temperature() <= 125
+
+
+def test_temperature_file_crc_failure():
+    # given a bus on which every read fails the CRC check
+    bus = SimulatedBus(sensors=1, time_scale=0, crc_failure_rate=1.0, seed=1)
+    sensor = W1ThermSensor(base_directory=bus.root)
+
+    # then
+    with pytest.raises(SensorNotReadyError):
+        sensor.get_temperature()
@@ -0,0 +1,103 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import sys
+from array import array
+
+import pytest
+
+from w1thermsensor import W1ThermSensor
+from w1thermsensor.calibration_data import CalibrationData
+from w1thermsensor.errors import UnsupportedUnitError
+from w1thermsensor.simulation import SimulatedBus
+from w1thermsensor.units import Unit
+
+TEMPERATURES = [-55.0, -12.3125, 0.0, 21.5, 37.0625, 125.0]
+
+UNIT_PAIRS = [
+    pytest.param(unit_from, unit_to, id="{0}-{1}".format(unit_from.value, unit_to.value))
+    for unit_from in Unit
+    for unit_to in Unit
+]
+
+
+def convert_each(values, unit_from, unit_to):
+    convert = Unit.get_conversion_function(unit_from, unit_to)
+    return [convert(v) for v in values]
+
+
+@pytest.mark.parametrize("unit_from, unit_to", UNIT_PAIRS)
+def test_convert_numpy_array(unit_from, unit_to):
+    # given
+    np = pytest.importorskip("numpy")
+    values = np.array(TEMPERATURES)
+
+    # when
+    converted = Unit.convert_array(values, unit_from, unit_to)
+
+    # then
+    assert isinstance(converted, np.ndarray)
+    assert converted.tolist() == convert_each(TEMPERATURES, unit_from, unit_to)
+    assert values.tolist() == TEMPERATURES
+
+
+@pytest.mark.parametrize("unit_from, unit_to", UNIT_PAIRS)
+def test_convert_double_array(unit_from, unit_to):
+    # given
+    pytest.importorskip("numpy")
+    values = array("d", TEMPERATURES)
+
+    # when
+    converted = Unit.convert_array(values, unit_from, unit_to)
+
+    # then
+    assert isinstance(converted, array)
+    assert converted.tolist() == convert_each(TEMPERATURES, unit_from, unit_to)
+    assert values.tolist() == TEMPERATURES
+
+
+@pytest.mark.parametrize("unit_from, unit_to", UNIT_PAIRS)
+def test_convert_without_numpy(monkeypatch, unit_from, unit_to):
+    # given
+    monkeypatch.setitem(sys.modules, "numpy", None)
+
+    # when
+    converted_array = Unit.convert_array(array("d", TEMPERATURES), unit_from, unit_to)
+    converted_list = Unit.convert_array(tuple(TEMPERATURES), unit_from, unit_to)
+
+    # then
+    assert isinstance(converted_array, array)
+    assert converted_array.tolist() == convert_each(TEMPERATURES, unit_from, unit_to)
+    assert converted_list == convert_each(TEMPERATURES, unit_from, unit_to)
+
+
+def test_convert_unsupported_unit():
+    with pytest.raises(UnsupportedUnitError):
+        Unit.convert_array([21.5], Unit.DEGREES_C, "rankine")
+
+
+def test_get_temperatures_converts_a_single_read():
+    # given
+    bus = SimulatedBus(sensors=1, time_scale=0, seed=5)
+    sensor = W1ThermSensor(
+        base_directory=bus.root,
+        calibration_data=CalibrationData(
+            measured_high_point=99.0, measured_low_point=1.0, reference_high_point=100.0
+        ),
+    )
+    units = [Unit.DEGREES_C, Unit.DEGREES_F, Unit.KELVIN]
+
+    # when
+    temperatures = sensor.get_temperatures(units)
+    corrected = sensor.get_corrected_temperatures(units)
+
+    # then
+    assert temperatures[1:] == [temperatures[0] * 1.8 + 32.0, temperatures[0] + 273.15]
+    assert corrected[1:] == [corrected[0] * 1.8 + 32.0, corrected[0] + 273.15]
@@ -16,23 +16,63 @@ __author_email__ = "tuxtimo@gmail.com"
 __url__ = "http://github.com/timofurrer/w1thermsensor"
 __download_url__ = "http://github.com/timofurrer/w1thermsensor"
 
-import os
+import importlib
 
-from w1thermsensor.async_core import AsyncW1ThermSensor  # noqa
-from w1thermsensor.core import W1ThermSensor  # noqa
 from w1thermsensor.errors import (  # noqa
     KernelModuleLoadError,
     NoSensorFoundError,
     ResetValueError,
     SensorNotReadyError,
+    SensorTimeoutError,
     UnsupportedUnitError,
     W1ThermSensorError
 )
-from w1thermsensor.kernel import load_kernel_modules
-from w1thermsensor.sensors import Sensor  # noqa
-from w1thermsensor.units import Unit  # noqa
-
-# Load kernel modules automatically upon import.
-# Set the environment variable W1THERMSENSOR_NO_KERNEL_MODULE=1
-if os.environ.get("W1THERMSENSOR_NO_KERNEL_MODULE", "0") != "1":  # pragma: no cover
-    load_kernel_modules()
+
+#: Holds the module of each attribute of this package.
+#  The modules are only imported on first use to keep the import fast.
+#  The kernel modules are loaded on the first access to the sensors.
+#  Set the environment variable W1THERMSENSOR_NO_KERNEL_MODULE=1 to disable it.
+_LAZY_ATTRIBUTES = {
+    "AdaptiveResolution": "w1thermsensor.adaptive",
+    "AsyncW1ThermSensor": "w1thermsensor.async_core",
+    "CaptureRecorder": "w1thermsensor.capture",
+    "ReplayBus": "w1thermsensor.capture",
+    "W1ThermSensor": "w1thermsensor.core",
+    "decode_many": "w1thermsensor.decoder",
+    "load_kernel_modules": "w1thermsensor.kernel",
+    "SensorReading": "w1thermsensor.reading",
+    "StreamReading": "w1thermsensor.reading",
+    "SensorRegistry": "w1thermsensor.registry",
+    "sensor_registry": "w1thermsensor.registry",
+    "RetryPolicy": "w1thermsensor.retry",
+    "RetryScheduler": "w1thermsensor.retry",
+    "TickSchedule": "w1thermsensor.schedule",
+    "Sensor": "w1thermsensor.sensors",
+    "SimulatedBus": "w1thermsensor.simulation",
+    "Unit": "w1thermsensor.units",
+}
+
+__all__ = [
+    "KernelModuleLoadError",
+    "NoSensorFoundError",
+    "ResetValueError",
+    "SensorNotReadyError",
+    "SensorTimeoutError",
+    "UnsupportedUnitError",
+    "W1ThermSensorError",
+] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
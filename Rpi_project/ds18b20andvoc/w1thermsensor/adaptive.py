@@ -0,0 +1,137 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import warnings
+from pathlib import Path
+from typing import Optional
+
+from w1thermsensor.core import W1ThermSensor
+from w1thermsensor.errors import W1ThermSensorError
+from w1thermsensor.reading import SensorReading
+from w1thermsensor.units import Unit
+
+
+class AdaptiveResolution:
+    """
+    Adapts the resolution of a sensor to how much its readings move.
+
+    A 12 bit conversion takes 750 ms, a 9 bit conversion only 94 ms.
+    While the readings are stable the sensor is switched to the ``low``
+    resolution, so reading it is much faster. As soon as a reading moves
+    by more than ``threshold`` the sensor is switched back to the ``high``
+    resolution for the following readings.
+
+    If the resolution cannot be changed after a reading, the reading is
+    still returned. The resolution stays unchanged, a ``RuntimeWarning`` is
+    issued and the error is kept in ``resolution_error``.
+
+    Note: root permissions are required to change the sensors resolution.
+
+    Examples:
+        Read a sensor with 10 bit while the temperature is stable
+
+        >>> sensor = AdaptiveResolution(W1ThermSensor(), low=10)
+        >>> sensor.get_temperature()
+    """
+
+    def __init__(
+        self,
+        sensor: W1ThermSensor,
+        low: int = 10,
+        high: int = 12,
+        threshold: Optional[float] = None,
+        stable_readings: int = 3,
+    ) -> None:
+        """Initializes an AdaptiveResolution and sets the sensor to the high resolution.
+
+        :param sensor: the sensor to adapt the resolution of.
+        :param int low: the resolution in bits used while the readings are stable.
+        :param int high: the resolution in bits used while the readings move.
+        :param float threshold: the change in Degrees Celsius between two readings
+                                which counts as moving. Defaults to one step
+                                of the low resolution.
+        :param int stable_readings: the number of stable readings after which
+                                    the resolution is lowered.
+
+        :raises W1ThermSensorError: if the resolution could not be changed
+        """
+        if not 9 <= low < high <= 12:
+            raise ValueError(
+                "The given resolutions '{0}' and '{1}' must satisfy "
+                "9 <= low < high <= 12".format(low, high)
+            )
+
+        self.sensor = sensor
+        self.low = low
+        self.high = high
+        # a resolution of n bits has steps of 2^-(n - 8) degrees
+        self.threshold = 2.0 ** (8 - low) if threshold is None else threshold
+        self.stable_readings = stable_readings
+        self.stable = 0
+        self.last_temperature: Optional[float] = None
+        #: Holds the error of the last failed resolution change, if any
+        self.resolution_error: Optional[W1ThermSensorError] = None
+
+        self.sensor.set_resolution(high)
+        self.resolution = high
+
+    @property
+    def base_directory(self) -> Path:
+        """The directory of the wrapped sensor, e.g. to group it for a bulk conversion"""
+        return self.sensor.base_directory
+
+    def _set_resolution(self, resolution: int) -> None:
+        if resolution == self.resolution:
+            return
+
+        try:
+            self.sensor.set_resolution(resolution)
+        except W1ThermSensorError as exc:
+            # the reading is valid, only the next one keeps the old resolution
+            self.resolution_error = exc
+            warnings.warn(
+                "{0}. Keeping the resolution of {1} bit".format(exc, self.resolution),
+                RuntimeWarning,
+            )
+            return
+        self.resolution = resolution
+        self.resolution_error = None
+
+    def get_temperature(self, unit: Unit = Unit.DEGREES_C) -> float:
+        """Returns the temperature in the specified unit and adapts the
+        resolution for the next reading.
+
+        See ``W1ThermSensor.get_temperature`` for details.
+        """
+        temperature = self.sensor.get_temperature(Unit.DEGREES_C)
+
+        if (
+            self.last_temperature is not None
+            and abs(temperature - self.last_temperature) <= self.threshold
+        ):
+            self.stable += 1
+            if self.stable >= self.stable_readings:
+                self._set_resolution(self.low)
+        else:
+            self.stable = 0
+            self._set_resolution(self.high)
+        self.last_temperature = temperature
+
+        return Unit.get_conversion_function(Unit.DEGREES_C, unit)(temperature)
+
+    def get_reading(self, unit: Unit = Unit.DEGREES_C) -> SensorReading:
+        """Returns the temperature in the specified unit wrapped in a reading
+
+        See ``W1ThermSensor.get_reading`` for details.
+        """
+        try:
+            return SensorReading(self.sensor, unit, temperature=self.get_temperature(unit))
+        except W1ThermSensorError as exc:
+            return SensorReading(self.sensor, unit, error=exc)
@@ -8,17 +8,42 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
-from typing import Iterable, List
-
-from w1thermsensor.core import W1ThermSensor, evaluate_resolution, evaluate_temperature
-from w1thermsensor.errors import (
-    InvalidCalibrationDataError,
-    NoSensorFoundError,
-    SensorNotReadyError,
-    W1ThermSensorError
-)
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional, Union
+
+from w1thermsensor.core import W1ThermSensor, evaluate_resolution
+from w1thermsensor.errors import InvalidCalibrationDataError, W1ThermSensorError
+from w1thermsensor.reading import SensorReading, StreamReading
+from w1thermsensor.schedule import TickSchedule
+from w1thermsensor.sensors import Sensor
 from w1thermsensor.units import Unit
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the executor shared by all async sensors for their blocking sysfs access
+
+    The executor is created on first use and holds at most
+    ``W1ThermSensor.MAX_CONCURRENT_READS`` threads.
+
+    :returns: the shared executor
+    :rtype: ThreadPoolExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=W1ThermSensor.MAX_CONCURRENT_READS,
+                thread_name_prefix="w1thermsensor",
+            )
+        return _executor
+
 
 class AsyncW1ThermSensor(W1ThermSensor):
     """
@@ -31,21 +56,136 @@ class AsyncW1ThermSensor(W1ThermSensor):
     The following methods are implemented as coroutines:
     * ``get_temperature()``
     * ``get_temperatures()``
+    * ``get_reading()``
     * ``get_resolution()``
+    * ``stream()`` as asynchronous generator
+    * ``create()``
+    * ``get_available_sensors_async()``
+    * ``gather_temperatures()``
+    * ``read_many()``
+    * ``read_all()``
+
+    The blocking sysfs access is done by the executor returned by
+    ``get_executor()``, which is shared by all async sensors and
+    bounds the number of concurrent reads.
 
     See ``W1ThermSensor`` for full reference.
     """
 
-    def __init__(self, *args, **kwargs):  # pragma: no cover
-        try:
-            import aiofiles  # noqa
-        except ImportError:
-            raise W1ThermSensorError(
-                "Install the async extras to add support for AsyncW1ThermSensor: "
-                "pip install w1thermsensor[async]"
-            )
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncW1ThermSensor":
+        """Initializes an AsyncW1ThermSensor without blocking the event loop.
+
+        Takes the same arguments as ``W1ThermSensor``.
+
+        :returns: the sensor instance.
+        :rtype: AsyncW1ThermSensor
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), lambda: cls(*args, **kwargs))
+
+    @classmethod
+    async def get_available_sensors_async(
+        cls,
+        types: Optional[Iterable[Union[Sensor, str]]] = None,
+        base_directory: Optional[Path] = None,
+    ) -> List["AsyncW1ThermSensor"]:
+        """Return all available sensors without blocking the event loop.
+
+        :param list types: the type of the sensor to look for.
+                           If types is None it will search for all available types.
+        :param base_directory: the directory to look for sensors in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: a list of sensor instances.
+        :rtype: list
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), cls.get_available_sensors, types, base_directory
+        )
+
+    @classmethod
+    async def gather_temperatures(
+        cls,
+        sensors: Optional[Iterable["AsyncW1ThermSensor"]] = None,
+        unit: Unit = Unit.DEGREES_C,
+        bulk: bool = False,
+    ) -> List[SensorReading]:
+        """Read the temperature of multiple sensors concurrently.
+
+        See ``W1ThermSensor.read_many`` for details.
 
-        super().__init__(*args, **kwargs)
+        :param list sensors: the sensors to read. If sensors is None
+                             all available sensors are read.
+        :param int unit: the unit of the temperatures requested.
+        :param bool bulk: if a bulk conversion should be used.
+
+        :returns: a reading for each sensor in the order of the given sensors.
+        :rtype: list
+        """
+        if sensors is None:
+            sensors = await cls.get_available_sensors_async()
+        sensors = list(sensors)
+
+        if bulk:
+            loop = asyncio.get_running_loop()
+            for base_directory in {s.base_directory for s in sensors}:
+                await loop.run_in_executor(
+                    get_executor(), cls.try_bulk_conversion, base_directory
+                )
+
+        return list(await asyncio.gather(*(s.get_reading(unit) for s in sensors)))
+
+    @classmethod
+    async def read_many(  # type: ignore
+        cls,
+        sensors: Iterable["AsyncW1ThermSensor"],
+        unit: Unit = Unit.DEGREES_C,
+        max_workers: Optional[int] = None,
+        bulk: bool = False,
+    ) -> List[SensorReading]:
+        """Read the temperature of multiple sensors concurrently.
+
+        See ``gather_temperatures`` for details. The concurrent reads are
+        bounded by the shared executor, ``max_workers`` is not used.
+
+        :param list sensors: the sensors to read.
+        :param int unit: the unit of the temperatures requested.
+        :param int max_workers: unused, kept for compatibility with ``W1ThermSensor``.
+        :param bool bulk: if a bulk conversion should be used.
+
+        :returns: a reading for each sensor in the order of the given sensors.
+        :rtype: list
+        """
+        return await cls.gather_temperatures(list(sensors), unit, bulk)
+
+    @classmethod
+    async def read_all(  # type: ignore
+        cls,
+        types: Optional[Iterable[Union[Sensor, str]]] = None,
+        unit: Unit = Unit.DEGREES_C,
+        max_workers: Optional[int] = None,
+        bulk: bool = False,
+        base_directory: Optional[Path] = None,
+    ) -> List[SensorReading]:
+        """Read the temperature of all available sensors concurrently.
+
+        See ``gather_temperatures`` for details.
+
+        :param list types: the type of the sensors to read.
+                           If types is None all available sensors are read.
+        :param int unit: the unit of the temperatures requested.
+        :param int max_workers: unused, kept for compatibility with ``W1ThermSensor``.
+        :param bool bulk: if a bulk conversion should be used.
+        :param base_directory: the directory to look for sensors in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: a reading for each available sensor.
+        :rtype: list
+        """
+        sensors = await cls.get_available_sensors_async(types, base_directory)
+        return await cls.gather_temperatures(sensors, unit, bulk)
 
     async def get_raw_sensor_strings(self) -> List[str]:  # type: ignore
         """Reads the raw strings from the kernel module sysfs interface
@@ -56,24 +196,38 @@ class AsyncW1ThermSensor(W1ThermSensor):
         :raises NoSensorFoundError: if the sensor could not be found
         :raises SensorNotReadyError: if the sensor is not ready yet
         """
-        try:
-            import aiofiles
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), W1ThermSensor.get_raw_sensor_strings, self
+        )
 
-            async with aiofiles.open(str(self.sensorpath), mode="r") as f:
-                data = await f.readlines()
-        except IOError:  # pragma: no cover
-            raise NoSensorFoundError(
-                "Could not find sensor of type {} with id {}".format(self.name, self.id)
-            )
+    async def get_raw_dump(self) -> bytes:  # type: ignore
+        """Reads the raw ``w1_slave`` dump through the file kept open
 
-        if (
-            len(data) < 1
-            or data[0].strip()[-3:] != "YES"
-            or "00 00 00 00 00 00 00 00 00" in data[0]
-        ):  # pragma: no cover
-            raise SensorNotReadyError(self)
+        :returns: the bytes of the whole dump
+        :rtype: bytes
 
-        return data
+        :raises NoSensorFoundError: if the sensor could not be found
+        :raises SensorNotReadyError: if the sensor is not ready yet
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), W1ThermSensor.get_raw_dump, self
+        )
+
+    async def get_raw_millicelsius(self) -> int:  # type: ignore
+        """Reads the temperature from the kernel sysfs ``temperature`` attribute
+
+        :returns: the temperature in millidegrees Celsius
+        :rtype: int
+
+        :raises NoSensorFoundError: if the sensor could not be found
+        :raises SensorNotReadyError: if the sensor is not ready yet
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), W1ThermSensor.get_raw_millicelsius, self
+        )
 
     async def get_temperature(self, unit: Unit = Unit.DEGREES_C) -> float:  # type: ignore
         """Returns the temperature in the specified unit
@@ -88,16 +242,26 @@ class AsyncW1ThermSensor(W1ThermSensor):
         :raises SensorNotReadyError: if the sensor is not ready yet
         :raises ResetValueError: if the sensor has still the initial value and no measurement
         """
-        raw_temperature_line = (await self.get_raw_sensor_strings())[1]
-        return evaluate_temperature(
-            raw_temperature_line,
-            self.RAW_VALUE_TO_DEGREE_CELSIUS_FACTOR,
-            unit,
-            self.type,
-            self.id,
-            self.offset,
-            self.SENSOR_RESET_VALUE,
-        )
+        decoder = self.get_decoder(unit)
+        if self.use_temperature_file and self.recorder is None:
+            return decoder.decode_millicelsius(await self.get_raw_millicelsius())
+        if self.keep_open:
+            return decoder.decode_dump(await self.get_raw_dump())
+
+        return decoder.decode_line((await self.get_raw_sensor_strings())[1])
+
+    async def get_reading(self, unit: Unit = Unit.DEGREES_C) -> SensorReading:  # type: ignore
+        """Returns the temperature in the specified unit wrapped in a reading
+
+        :param int unit: the unit of the temperature requested
+
+        :returns: the reading of this sensor
+        :rtype: SensorReading
+        """
+        try:
+            return SensorReading(self, unit, temperature=await self.get_temperature(unit))
+        except W1ThermSensorError as exc:
+            return SensorReading(self, unit, error=exc)
 
     async def get_corrected_temperature(self, unit: Unit = Unit.DEGREES_C) -> float:  # type: ignore
         """Returns the temperature in the specified unit, corrected based on the calibration data
@@ -120,11 +284,12 @@ class AsyncW1ThermSensor(W1ThermSensor):
                 None,
             )
 
+        convert = self.get_decoder(unit).convert
         raw_temperature = await self.get_temperature(Unit.DEGREES_C)
         corrected_temperature = self.calibration_data.correct_temperature_for_calibration_data(
             raw_temperature)
 
-        return Unit.get_conversion_function(Unit.DEGREES_C, unit)(corrected_temperature)
+        return convert(corrected_temperature)
 
     async def get_temperatures(self, units: Iterable[Unit]) -> List[float]:  # type: ignore
         """Returns the temperatures in the specified units
@@ -139,11 +304,10 @@ class AsyncW1ThermSensor(W1ThermSensor):
         :raises NoSensorFoundError: if the sensor could not be found
         :raises SensorNotReadyError: if the sensor is not ready yet
         """
+        # the conversions are bound once by the decoders of the units
+        converters = [self.get_decoder(unit).convert for unit in units]
         sensor_value = await self.get_temperature(Unit.DEGREES_C)
-        return [
-            Unit.get_conversion_function(Unit.DEGREES_C, unit)(sensor_value)
-            for unit in units
-        ]
+        return [convert(sensor_value) for convert in converters]
 
     async def get_corrected_temperatures(self,  # type: ignore
                                          units: Iterable[Unit]) -> List[float]:
@@ -161,11 +325,46 @@ class AsyncW1ThermSensor(W1ThermSensor):
         :raises InvalidCalibrationDataError: if the calibration data was not provided at creation
         """
 
+        converters = [self.get_decoder(unit).convert for unit in units]
         corrected_temperature = await self.get_corrected_temperature(Unit.DEGREES_C)
-        return [
-            Unit.get_conversion_function(Unit.DEGREES_C, unit)(corrected_temperature)
-            for unit in units
-        ]
+        return [convert(corrected_temperature) for convert in converters]
+
+    async def stream(  # type: ignore
+        self,
+        interval: float,
+        units: Iterable[Unit] = (Unit.DEGREES_C,),
+        count: Optional[int] = None,
+    ) -> AsyncIterator[StreamReading]:
+        """Yields readings of this sensor every ``interval`` seconds
+
+        See ``W1ThermSensor.stream`` for details.
+
+        :param float interval: the time in seconds between two readings.
+        :param list units: the units of the temperatures in each reading.
+        :param int count: the number of readings after which the stream ends.
+                          If count is None the stream does not end.
+
+        :returns: an asynchronous iterator over the readings
+        :rtype: async iterator
+        """
+        units = tuple(units)
+        schedule = TickSchedule(interval)
+        produced = 0
+        while count is None or produced < count:
+            await asyncio.sleep(schedule.start())
+            started = time.monotonic()
+            try:
+                temperatures, error = tuple(await self.get_temperatures(units)), None
+            except W1ThermSensorError as exc:
+                temperatures, error = None, exc
+            duration = time.monotonic() - started
+            reading = StreamReading(
+                self, schedule.tick, time.time(), duration, schedule.missed,
+                temperatures, error
+            )
+            schedule.complete(duration)
+            produced += 1
+            yield reading
 
     async def get_resolution(self) -> int:  # type: ignore
         """Get the current resolution from the sensor.
@@ -0,0 +1,429 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from w1thermsensor.async_core import AsyncW1ThermSensor
+from w1thermsensor.core import W1ThermSensor
+from w1thermsensor.core import convert_raw_temperature_to_sensor_count
+from w1thermsensor.decoder import TemperatureDecoder, decode_many
+from w1thermsensor.errors import ResetValueError, W1ThermSensorError
+from w1thermsensor.registry import SensorRegistry
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.simulation import SimulatedBus
+from w1thermsensor.units import Unit
+
+
+def generate_raw_lines(count: int, seed: int = 0) -> List[str]:
+    """Generate noisy ``w1_slave`` temperature lines of a 12 bit sensor
+
+    :param int count: the number of lines to generate.
+    :param int seed: the seed of the random generator.
+
+    :returns: the generated temperature lines.
+    :rtype: list
+    """
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        sensor_count = rng.randint(-55 * 16, 125 * 16)
+        raw = sensor_count & 0xFFFF
+        lines.append(
+            "{0:02x} {1:02x} 4b 46 7f ff 0c 10 1c t={2}\n".format(
+                raw & 0xFF, raw >> 8, sensor_count * 1000 // 16
+            )
+        )
+    return lines
+
+
+def write_sysfs_tree(directory: Path, sensors: int, seed: int = 0) -> Path:
+    """Write a static sysfs tree of 12 bit sensors into the given directory
+
+    Every sensor gets a ``w1_slave`` dump and a ``temperature`` attribute,
+    the bus master lists all sensors in ``w1_master_slaves``.
+
+    :param directory: the directory to write the tree into.
+    :param int sensors: the number of sensors.
+    :param int seed: the seed of the random generator.
+
+    :returns: the directory to use as base directory of the sensors.
+    :rtype: Path
+    """
+    master = directory / SimulatedBus.MASTER_NAME
+    master.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i, line in enumerate(generate_raw_lines(sensors, seed)):
+        name = "28-{0:012x}".format(i + 1)
+        data, millicelsius = line.split(" t=")
+        sensor_directory = directory / name
+        sensor_directory.mkdir(exist_ok=True)
+        (sensor_directory / W1ThermSensor.SLAVE_FILE).write_text(
+            "{0} : crc=1c YES\n{0} t={1}".format(data, millicelsius)
+        )
+        (sensor_directory / W1ThermSensor.TEMPERATURE_FILE).write_text(millicelsius)
+        names.append(name)
+    (master / SensorRegistry.MASTER_SLAVES_FILE).write_text(
+        "".join(name + "\n" for name in names)
+    )
+    return directory
+
+
+@lru_cache()
+def _legacy_evaluate_temperature(
+    raw_temperature_line: str,
+    raw_temperature_to_degree_celsius_factor: float,
+    target_temperature_unit: Unit,
+    sensor_type: Sensor,
+    sensor_id: str,
+    sensor_offset: float,
+    sensor_reset_value: float,
+) -> float:
+    # the ``lru_cache`` based implementation the decoder replaced
+    factor = Unit.get_conversion_function(Unit.DEGREES_C, target_temperature_unit)
+    sensor_bytes = raw_temperature_line.split()
+    int16 = int(sensor_bytes[1] + sensor_bytes[0], 16)
+    if int16 >> 15 != 0:
+        int16 -= 1 << 16
+    value = float(int16) / 16.0
+    if value == sensor_reset_value:
+        raise ResetValueError(sensor_id)
+    return factor(value + sensor_offset)
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_decode(lines: int = 10000, repeat: int = 5) -> Dict[str, Any]:
+    """Measure decoding raw temperature lines with the decoder of a sensor
+    against the previous ``lru_cache`` based ``evaluate_temperature``.
+    """
+    raw_lines = generate_raw_lines(lines)
+    decoder = TemperatureDecoder(Sensor.DS18B20, "benchmark", 0.0, Unit.DEGREES_C, 85.0, 1e-3)
+
+    def legacy():
+        for line in raw_lines:
+            try:
+                _legacy_evaluate_temperature(
+                    line, 1e-3, Unit.DEGREES_C, Sensor.DS18B20, "benchmark", 0.0, 85.0
+                )
+            except ResetValueError:
+                pass
+
+    def decode():
+        decode_line = decoder.decode_line
+        for line in raw_lines:
+            try:
+                decode_line(line)
+            except ResetValueError:
+                pass
+
+    millicelsius = [int(line.split("t=")[1]) for line in raw_lines]
+
+    def decode_millicelsius():
+        decode = decoder.decode_millicelsius
+        for value in millicelsius:
+            try:
+                decode(value)
+            except ResetValueError:
+                pass
+
+    legacy_seconds = _best_of(legacy, repeat)
+    decoder_seconds = _best_of(decode, repeat)
+    millicelsius_seconds = _best_of(decode_millicelsius, repeat)
+    return {
+        "lines": lines,
+        "legacy_ns_per_line": legacy_seconds / lines * 1e9,
+        "decoder_ns_per_line": decoder_seconds / lines * 1e9,
+        "millicelsius_ns_per_value": millicelsius_seconds / lines * 1e9,
+        "lines_per_second": lines / decoder_seconds,
+        "speedup": legacy_seconds / decoder_seconds,
+    }
+
+
+def bench_decode_many(lines: int = 100000, repeat: int = 5) -> Dict[str, Any]:
+    """Measure decoding a batch of archived temperature lines at once
+    against converting them one by one.
+    """
+    raw_lines = generate_raw_lines(lines)
+
+    def one_by_one():
+        for line in raw_lines:
+            convert_raw_temperature_to_sensor_count(line) / 16.0
+
+    try:
+        batch_seconds = _best_of(lambda: decode_many(raw_lines), repeat)
+    except W1ThermSensorError as exc:
+        return {"skipped": str(exc)}
+    one_by_one_seconds = _best_of(one_by_one, repeat)
+    return {
+        "lines": lines,
+        "one_by_one_ns_per_line": one_by_one_seconds / lines * 1e9,
+        "batch_ns_per_line": batch_seconds / lines * 1e9,
+        "speedup": one_by_one_seconds / batch_seconds,
+    }
+
+
+def bench_units(conversions: int = 100000, repeat: int = 5) -> Dict[str, Any]:
+    """Measure converting Degrees Celsius into every unit"""
+    temperatures = [t / 16.0 for t in range(conversions)]
+    results = {}
+    for unit in Unit:
+
+        def convert():
+            factor = Unit.get_conversion_function(Unit.DEGREES_C, unit)
+            for temperature in temperatures:
+                factor(temperature)
+
+        def lookup_and_convert():
+            for temperature in temperatures:
+                Unit.get_conversion_function(Unit.DEGREES_C, unit)(temperature)
+
+        def convert_array():
+            Unit.convert_array(buffer, Unit.DEGREES_C, unit)
+
+        buffer = array("d", temperatures)
+        results[unit.value] = {
+            "convert_ns": _best_of(convert, repeat) / conversions * 1e9,
+            "lookup_and_convert_ns": _best_of(lookup_and_convert, repeat) / conversions * 1e9,
+            "convert_array_ns": _best_of(convert_array, repeat) / conversions * 1e9,
+        }
+    return {"conversions": conversions, "units": results}
+
+
+def bench_discovery(
+    counts: Sequence[int] = (1, 10, 100, 1000), repeat: int = 5
+) -> Dict[str, Any]:
+    """Measure discovering the sensors of a fake sysfs tree by the number of sensors,
+    with a full scan of the tree and with a lookup in a ``SensorRegistry``.
+    """
+    results = []
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            base_directory = write_sysfs_tree(Path(directory), count)
+            registry = SensorRegistry(base_directory=base_directory)
+            registry.get_sensors()
+
+            scan_seconds = _best_of(
+                lambda: W1ThermSensor.get_available_sensors(base_directory=base_directory),
+                repeat,
+            )
+            registry_seconds = _best_of(registry.get_sensors, repeat)
+        results.append({
+            "sensors": count,
+            "scan_ms": scan_seconds * 1e3,
+            "scan_us_per_sensor": scan_seconds / count * 1e6,
+            "registry_ms": registry_seconds * 1e3,
+        })
+    return {"counts": results}
+
+
+def bench_read(reads: int = 2000, repeat: int = 5) -> Dict[str, Any]:
+    """Measure the overhead of reading a single sensor of a fake sysfs tree
+    from the ``temperature`` attribute and from the ``w1_slave`` dump,
+    opening the files for each read and keeping them open.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        base_directory = write_sysfs_tree(Path(directory), 1, seed=1)
+        results = {}
+        for keep_open, prefix in ((False, ""), (True, "kept_open_")):
+            with W1ThermSensor(base_directory=base_directory, keep_open=keep_open) as sensor:
+
+                def read():
+                    for _ in range(reads):
+                        sensor.get_temperature()
+
+                for use_temperature_file, name in ((True, "temperature"), (False, "w1_slave")):
+                    sensor.use_temperature_file = use_temperature_file
+                    results[prefix + name + "_us_per_read"] = (
+                        _best_of(read, repeat) / reads * 1e6)
+    return dict(results, reads=reads)
+
+
+def bench_sweep(
+    sensors: int = 32, time_scale: float = 0.1, repeat: int = 3
+) -> Dict[str, Any]:
+    """Measure the latency of reading every sensor of a simulated bus one
+    after the other, concurrently and after a bulk conversion.
+
+    The conversion time of the simulated sensors is scaled by ``time_scale``.
+    """
+    bus = SimulatedBus(sensors=sensors, time_scale=time_scale, seed=0)
+    all_sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)
+
+    def sequential():
+        for sensor in all_sensors:
+            sensor.get_reading()
+
+    return {
+        "sensors": sensors,
+        "time_scale": time_scale,
+        "conversion_ms": W1ThermSensor.CONVERSION_TIME_SECONDS * time_scale * 1e3,
+        "sequential_ms": _best_of(sequential, repeat) * 1e3,
+        "concurrent_ms": _best_of(lambda: W1ThermSensor.read_many(all_sensors), repeat) * 1e3,
+        "bulk_ms": _best_of(
+            lambda: W1ThermSensor.read_many(all_sensors, bulk=True), repeat) * 1e3,
+    }
+
+
+def bench_async(
+    sensors: int = 32, time_scale: float = 0.1, repeat: int = 3
+) -> Dict[str, Any]:
+    """Measure a sweep with ``AsyncW1ThermSensor`` against ``W1ThermSensor``
+    on a simulated bus, with and without conversion time.
+    """
+    results = {"sensors": sensors}
+    for scale, name in ((0.0, "overhead"), (time_scale, "sweep")):
+        bus = SimulatedBus(sensors=sensors, time_scale=scale, seed=0)
+        sync_sensors = W1ThermSensor.get_available_sensors(base_directory=bus.root)
+        async_sensors = AsyncW1ThermSensor.get_available_sensors(base_directory=bus.root)
+        loop = asyncio.new_event_loop()
+        try:
+            async_seconds = _best_of(
+                lambda: loop.run_until_complete(
+                    AsyncW1ThermSensor.gather_temperatures(async_sensors)),
+                repeat,
+            )
+        finally:
+            loop.close()
+        sync_seconds = _best_of(lambda: W1ThermSensor.read_many(sync_sensors), repeat)
+        results[name] = {
+            "time_scale": scale,
+            "sync_ms": sync_seconds * 1e3,
+            "async_ms": async_seconds * 1e3,
+        }
+    return results
+
+
+def bench_import(repeat: int = 5) -> Dict[str, Any]:
+    """Measure the time it takes a new Python process to start, and the time
+    it takes such a process to import this package, to access a sensor class
+    and to import the CLI. The imports are timed inside the new process.
+    """
+    environment = dict(
+        os.environ,
+        PYTHONPATH=str(Path(__file__).resolve().parent.parent),
+        W1THERMSENSOR_NO_KERNEL_MODULE="1",
+    )
+
+    def python(statement):
+        # the child times the statement itself and prints the seconds it took
+        timed = (
+            "import time; start = time.perf_counter(); {0}; "
+            "print(time.perf_counter() - start)".format(statement)
+        )
+        return min(
+            float(
+                subprocess.run(
+                    [sys.executable, "-c", timed],
+                    env=environment,
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True,
+                ).stdout
+            )
+            for _ in range(repeat)
+        )
+
+    startup = _best_of(
+        lambda: subprocess.run([sys.executable, "-c", "pass"], env=environment, check=True),
+        repeat,
+    )
+    return {
+        "startup_ms": startup * 1e3,
+        "package_ms": python("import w1thermsensor") * 1e3,
+        "sensor_ms": python("from w1thermsensor import W1ThermSensor") * 1e3,
+        "async_ms": python("from w1thermsensor import AsyncW1ThermSensor") * 1e3,
+        "cli_ms": python("import w1thermsensor.cli") * 1e3,
+    }
+
+
+#: Holds all available benchmarks by name
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "decode": bench_decode,
+    "decode_many": bench_decode_many,
+    "units": bench_units,
+    "discovery": bench_discovery,
+    "read": bench_read,
+    "sweep": bench_sweep,
+    "async": bench_async,
+    "import": bench_import,
+}
+
+
+def run(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Run the given benchmarks
+
+    :param list names: the names of the benchmarks to run.
+                       If names is None all benchmarks are run.
+
+    :returns: the results of each benchmark by name.
+    :rtype: dict
+    """
+    return {name: BENCHMARKS[name]() for name in (names or BENCHMARKS)}
+
+
+def report(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Run the given benchmarks and describe the environment they ran in,
+    so the reports of different runs can be compared.
+
+    :param list names: the names of the benchmarks to run.
+                       If names is None all benchmarks are run.
+
+    :returns: the report with the environment and the results.
+    :rtype: dict
+    """
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": run(names),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(
+        prog="python -m w1thermsensor.benchmark",
+        description="Benchmark the w1thermsensor package",
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        metavar="name",
+        help="the benchmarks to run: {0}. Defaults to all".format(", ".join(BENCHMARKS)),
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: {0}".format(", ".join(sorted(unknown))))
+    print(json.dumps(report(args.names), indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
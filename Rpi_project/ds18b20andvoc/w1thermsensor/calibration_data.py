@@ -8,13 +8,78 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
-from dataclasses import dataclass
+import abc
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
 
-from w1thermsensor.errors import InvalidCalibrationDataError
+from w1thermsensor.errors import InvalidCalibrationDataError, W1ThermSensorError
+
+if TYPE_CHECKING:  # pragma: no cover
+    import sqlite3
+
+
+def _quote_identifier(name: str) -> str:
+    return '"{0}"'.format(name.replace('"', '""'))
+
+
+class BaseCalibrationData(abc.ABC):
+    """
+    The base of all calibration data.
+
+    The temperatures to correct can be a single value, a NumPy array or
+    a whole column of an SQLite table, see ``correct_sqlite_column``.
+    """
+
+    @abc.abstractmethod
+    def correct_temperature_for_calibration_data(self, raw_temperature):
+        """
+        Correct the given temperature, or a NumPy array of temperatures, based on the
+        calibration data.
+        """
+
+    def correct_sqlite_column(
+        self,
+        connection: "sqlite3.Connection",
+        table: str,
+        column: str,
+        target_column: Optional[str] = None,
+    ) -> int:
+        """
+        Correct all temperatures of the given SQLite column with a single UPDATE statement.
+        The corrected temperatures replace the raw temperatures unless a ``target_column``
+        is given. NULL values are left untouched.
+
+        The change is not committed, so it can be rolled back with the connection.
+
+        Returns the number of corrected rows.
+        """
+        def calibrate(raw_temperature):
+            # NUMERIC columns may hold the temperatures as text
+            return float(self.correct_temperature_for_calibration_data(float(raw_temperature)))
+
+        connection.create_function("w1_calibrate", 1, calibrate, deterministic=True)
+        return self._update_sqlite_column(
+            connection, table, column, target_column, "w1_calibrate({0})", ()
+        )
+
+    @staticmethod
+    def _update_sqlite_column(connection, table, column, target_column, expression, params):
+        column = _quote_identifier(column)
+        cursor = connection.execute(
+            "UPDATE {0} SET {1} = {2} WHERE {3} IS NOT NULL".format(
+                _quote_identifier(table),
+                _quote_identifier(target_column) if target_column else column,
+                expression.format(column),
+                column,
+            ),
+            params,
+        )
+        return cursor.rowcount
 
 
 @dataclass(frozen=True)
-class CalibrationData:
+class CalibrationData(BaseCalibrationData):
     """
     This Class represents the data required for calibrating a temperature sensor and houses the
     logic to correct the temperature sensor's raw readings based on the calibration data.
@@ -58,6 +123,9 @@ class CalibrationData:
     reference_high_point: float
     reference_low_point: float = 0.0
 
+    #: Holds the factor the measured range is scaled by to the reference range
+    scaling_factor: float = field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
         """
         Validates that the required arguments are set and sanity check that the high points are
@@ -99,14 +167,138 @@ class CalibrationData:
                 self.__str__(),
             )
 
+        # the dataclass is frozen, so the scaling factor is computed once
+        reference_range = self.reference_high_point - self.reference_low_point
+        measured_range = self.measured_high_point - self.measured_low_point
+        object.__setattr__(self, "scaling_factor", reference_range / measured_range)
+
     def correct_temperature_for_calibration_data(self, raw_temperature):
         """
         Correct the temperature based on the calibration data provided.  This is done by taking
         the raw temperature reading and subtracting out the measured low point, scaling that by the
-        scaling factor, and then adding back the reference low point.
+        scaling factor, and then adding back the reference low point.  A NumPy array of
+        temperatures is corrected as a whole.
         """
-        reference_range = self.reference_high_point - self.reference_low_point
-        measured_range = self.measured_high_point - self.measured_low_point
-        scaling_factor = reference_range / measured_range
-        return ((raw_temperature - self.measured_low_point) * scaling_factor
+        return ((raw_temperature - self.measured_low_point) * self.scaling_factor
                 + self.reference_low_point)
+
+    def correct_sqlite_column(
+        self,
+        connection: "sqlite3.Connection",
+        table: str,
+        column: str,
+        target_column: Optional[str] = None,
+    ) -> int:
+        """
+        Correct all temperatures of the given SQLite column with a single UPDATE statement.
+        The two point correction is done in SQL without calling back into Python.
+
+        See ``BaseCalibrationData.correct_sqlite_column`` for details.
+        """
+        return self._update_sqlite_column(
+            connection, table, column, target_column, "({0} - ?) * ? + ?",
+            (self.measured_low_point, self.scaling_factor, self.reference_low_point),
+        )
+
+
+@dataclass(frozen=True)
+class MultiPointCalibrationData(BaseCalibrationData):
+    """
+    This Class represents calibration data gathered at more than two reference temperatures,
+    e.g. in an ice bath, at room temperature next to a reference thermometer and in boiling water.
+
+    The points are pairs of the temperature measured by the sensor and the reference temperature,
+    both in Celsius.  They are stored as a tuple ordered by the measured temperature, so equal
+    calibration data compares and hashes equal.  By default the readings are corrected by linear interpolation between the
+    two closest points.  Readings outside of the calibrated range are extrapolated from the
+    closest segment.
+
+    If a ``degree`` is given a polynomial of this degree is fitted to the points instead, which
+    smooths out errors of the single points.  Fitting the polynomial requires NumPy.
+
+    Example:
+        >>> MultiPointCalibrationData(((0.4, 0.0), (24.6, 25.0), (98.6, 99.2)))
+    """
+
+    points: Sequence[Tuple[float, float]]
+    degree: Optional[int] = None
+
+    #: Hold the measured and reference temperatures of the points ordered by the measured one
+    measured_points: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+    reference_points: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+    #: Holds the slope of the segment starting at each point
+    slopes: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+    #: Holds the coefficients of the fitted polynomial, highest power first
+    coefficients: Tuple[float, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """
+        Validates the points and precomputes the coefficients of the correction.
+        """
+        points = tuple(sorted((float(m), float(r)) for m, r in self.points))
+        if len(points) < 2:
+            raise InvalidCalibrationDataError(
+                "At least two points must be provided.", self.__str__()
+            )
+
+        measured = tuple(m for m, _ in points)
+        reference = tuple(r for _, r in points)
+        if any(low == high for low, high in zip(measured, measured[1:])):
+            raise InvalidCalibrationDataError(
+                "The measured temperatures of the points must be distinct.", self.__str__()
+            )
+
+        coefficients: Tuple[float, ...] = ()
+        if self.degree is not None:
+            if not 1 <= self.degree < len(points):
+                raise InvalidCalibrationDataError(
+                    "The degree must be between 1 and the number of points minus one.",
+                    self.__str__(),
+                )
+            coefficients = tuple(
+                float(c) for c in _import_numpy().polyfit(measured, reference, self.degree)
+            )
+
+        object.__setattr__(self, "points", points)
+        object.__setattr__(self, "measured_points", measured)
+        object.__setattr__(self, "reference_points", reference)
+        object.__setattr__(self, "slopes", tuple(
+            (r2 - r1) / (m2 - m1)
+            for (m1, r1), (m2, r2) in zip(points, points[1:])
+        ))
+        object.__setattr__(self, "coefficients", coefficients)
+
+    def correct_temperature_for_calibration_data(self, raw_temperature):
+        """
+        Correct the temperature based on the calibration points.  A NumPy array of temperatures
+        is corrected as a whole.
+        """
+        if self.coefficients:
+            # Horner's method works the same on a single value and on an array
+            corrected = 0.0
+            for coefficient in self.coefficients:
+                corrected = corrected * raw_temperature + coefficient
+            return corrected
+
+        measured = self.measured_points
+        last_segment = len(measured) - 2
+        if isinstance(raw_temperature, (int, float)):
+            i = min(max(bisect_right(measured, raw_temperature) - 1, 0), last_segment)
+            return (self.reference_points[i]
+                    + (raw_temperature - measured[i]) * self.slopes[i])
+
+        np = _import_numpy()
+        temperatures = np.asarray(raw_temperature, dtype=float)
+        i = np.clip(np.searchsorted(measured, temperatures, side="right") - 1, 0, last_segment)
+        return (np.asarray(self.reference_points)[i]
+                + (temperatures - np.asarray(measured)[i]) * np.asarray(self.slopes)[i])
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise W1ThermSensorError(
+            "Install numpy to use this calibration data: pip install numpy"
+        )
+    return numpy
@@ -0,0 +1,230 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+from typing import Iterable, Union
+
+from w1thermsensor.errors import ResetValueError, W1ThermSensorError
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.units import Unit
+
+
+class TemperatureDecoder:
+    """
+    Decodes the raw readings of a single sensor into temperatures.
+
+    Everything which does not change between two readings of a sensor,
+    like its type, offset and the requested unit, is resolved once when
+    the decoder is created. Decoding a reading is then reduced to
+    converting the temperature bytes into an integer.
+
+    Use ``W1ThermSensor.get_decoder()`` to get the decoder of a sensor.
+    """
+
+    __slots__ = (
+        "sensor_id",
+        "comply_12bit_standard",
+        "raw_value_factor",
+        "offset",
+        "reset_value",
+        "convert",
+    )
+
+    def __init__(
+        self,
+        sensor_type: Sensor,
+        sensor_id: str,
+        offset: float,
+        unit: Unit,
+        reset_value: float,
+        raw_value_factor: float,
+    ) -> None:
+        """Initializes a TemperatureDecoder.
+
+        :param sensor_type: the type of the sensor.
+        :param string sensor_id: the id of the sensor.
+        :param float offset: the offset in Degrees Celsius added to each reading.
+        :param unit: the unit of the decoded temperatures.
+        :param float reset_value: the sensor reset value in Degrees Celsius.
+        :param float raw_value_factor: the factor to convert the raw value
+                                       of non 12 bit sensors to Degrees Celsius.
+
+        :raises UnsupportedUnitError: if the unit is not supported
+        """
+        self.sensor_id = sensor_id
+        self.comply_12bit_standard = sensor_type.comply_12bit_standard()
+        self.raw_value_factor = raw_value_factor
+        self.offset = offset
+        self.reset_value = reset_value
+        self.convert = Unit.get_conversion_function(Unit.DEGREES_C, unit)
+
+    def decode_line(self, raw_temperature_line: str) -> float:
+        """Decodes the temperature line of the ``w1_slave`` dump
+
+        :param string raw_temperature_line: the second line of the ``w1_slave`` dump
+
+        :returns: the temperature in the unit of this decoder
+        :rtype: float
+
+        :raises ResetValueError: if the sensor has still the initial value and no measurement
+        """
+        if self.comply_12bit_standard:
+            # the first two bytes hold the two complement count, LSB first
+            count = int(raw_temperature_line[3:5] + raw_temperature_line[0:2], 16)
+            if count & 0x8000:
+                count -= 0x10000
+            # the int part is 8 bit wide, 4 bit are left on 12 bit
+            # so divide with 2^4 = 16 to get the celsius fractions
+            value = count / 16.0
+            if value == self.reset_value:
+                raise ResetValueError(self.sensor_id)
+        else:
+            # Fallback to precalculated value for other sensor types
+            value = (
+                float(raw_temperature_line[raw_temperature_line.rindex("=") + 1:])
+                * self.raw_value_factor
+            )
+
+        return self.convert(value + self.offset)
+
+    def decode_dump(self, dump: bytes) -> float:
+        """Decodes the raw bytes of the whole ``w1_slave`` dump
+
+        Unlike ``decode_line`` the dump is not decoded to text and split into lines.
+
+        :param bytes dump: the content of the ``w1_slave`` file
+
+        :returns: the temperature in the unit of this decoder
+        :rtype: float
+
+        :raises ResetValueError: if the sensor has still the initial value and no measurement
+        """
+        if self.comply_12bit_standard:
+            start = dump.index(b"\n") + 1
+            count = int(dump[start + 3:start + 5] + dump[start:start + 2], 16)
+            if count & 0x8000:
+                count -= 0x10000
+            value = count / 16.0
+            if value == self.reset_value:
+                raise ResetValueError(self.sensor_id)
+        else:
+            value = float(dump[dump.rindex(b"=") + 1:]) * self.raw_value_factor
+
+        return self.convert(value + self.offset)
+
+    def decode_millicelsius(self, millicelsius: int) -> float:
+        """Decodes the value of the sysfs ``temperature`` attribute
+
+        :param int millicelsius: the temperature in millidegrees Celsius
+
+        :returns: the temperature in the unit of this decoder
+        :rtype: float
+
+        :raises ResetValueError: if the sensor has still the initial value and no measurement
+        """
+        if self.comply_12bit_standard:
+            # the kernel truncates the 1/16 degree steps to whole millidegrees,
+            # round back to the closest step to match the w1_slave readings.
+            value = round(millicelsius * 0.016) / 16.0
+            if value == self.reset_value:
+                raise ResetValueError(self.sensor_id)
+        else:
+            value = millicelsius * self.raw_value_factor
+
+        return self.convert(value + self.offset)
+
+
+#: Holds the number of characters of a ``w1_slave`` line needed to decode it
+DUMP_LINE_WIDTH = 39
+
+
+def decode_many(
+    lines: Iterable[Union[str, bytes]],
+    sensor_type: Sensor = Sensor.DS18B20,
+    reset_value: float = 85.0,
+):
+    """Decodes a batch of archived ``w1_slave`` dumps into temperatures at once
+
+    Each entry is either a whole ``w1_slave`` dump or one of its two lines.
+    The temperature is decoded from the scratchpad bytes every line starts
+    with, the CRC verdict is only available from the first line.
+
+    The entries are decoded in a vectorized form, which is much faster
+    than decoding them one by one. Entries are masked if the CRC check
+    failed, the scratchpad is all zeros, the temperature is the reset value
+    or if the entry is no valid dump at all.
+
+    Note: numpy is required to decode many dumps at once.
+
+    :param list lines: the dumps to decode.
+    :param sensor_type: the type of the sensor the dumps were read from.
+    :param float reset_value: the sensor reset value in Degrees Celsius.
+
+    :returns: the temperatures in Degrees Celsius in the order of the given dumps
+    :rtype: numpy.ma.MaskedArray
+
+    :raises W1ThermSensorError: if numpy is not installed
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise W1ThermSensorError(
+            "Install numpy to decode many dumps at once: pip install numpy"
+        )
+
+    if not isinstance(lines, (list, tuple, np.ndarray)):
+        lines = list(lines)
+    # a fixed width byte matrix, shorter entries are padded with zeros
+    raw = np.ascontiguousarray(
+        np.array(lines, dtype="S{0}".format(DUMP_LINE_WIDTH)).reshape(-1)
+    )
+    chars = raw.view(np.uint8).reshape(-1, DUMP_LINE_WIDTH)
+
+    hex_table = np.full(256, -1, dtype=np.int32)
+    for value, digit in enumerate(b"0123456789abcdef"):
+        hex_table[digit] = value
+        hex_table[ord(chr(digit).upper())] = value
+
+    def scratchpad_byte(index):
+        # the scratchpad bytes are written as "xx " starting at column 0,
+        # invalid hex digits make the byte negative
+        column = index * 3
+        return (hex_table[chars[:, column]] << 4) | hex_table[chars[:, column + 1]]
+
+    lsb, msb = scratchpad_byte(0), scratchpad_byte(1)
+    invalid = (lsb < 0) | (msb < 0)
+
+    # two complement count, LSB first
+    count = lsb | (msb << 8)
+    count -= (count & 0x8000) << 1
+
+    if sensor_type.comply_12bit_standard():
+        values = count / 16.0
+    else:
+        # the DS18S20 refines the half degrees by the count remain,
+        # computed in millidegrees like the kernel does
+        count_remain, count_per_c = scratchpad_byte(6), scratchpad_byte(7)
+        invalid |= (count_remain < 0) | (count_per_c <= 0)
+        millicelsius = (
+            (count >> 1) * 1000 - 250
+            + 1000 * (count_per_c - count_remain) // np.where(invalid, 1, count_per_c)
+        )
+        values = millicelsius * 1e-3
+
+    # compare the whole scratchpad at once to detect sensors which did not answer
+    scratchpad = raw.view([("scratchpad", "S26"), ("rest", "S13")])["scratchpad"]
+    no_answer = scratchpad == b"00 00 00 00 00 00 00 00 00"
+
+    # the first line reports the CRC check as ": crc=xx YES" after the scratchpad
+    first_line = chars[:, 27] == ord(":")
+    crc_ok = (
+        (chars[:, 36] == ord("Y")) & (chars[:, 37] == ord("E")) & (chars[:, 38] == ord("S"))
+    )
+    mask = invalid | (first_line & ~crc_ok) | no_answer | (values == reset_value)
+    return np.ma.MaskedArray(values, mask=mask)
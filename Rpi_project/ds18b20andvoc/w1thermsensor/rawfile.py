@@ -0,0 +1,83 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import errno
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+#: Holds the errors of a read from a file whose device left the bus since it was opened
+STALE_ERRNOS = frozenset((errno.ENODEV, errno.ENOENT, errno.ENXIO, errno.EBADF))
+
+
+class RawFile:
+    """
+    Represents a sysfs file which is kept open and re-read from its start.
+
+    Reading a sysfs attribute from offset 0 makes the kernel generate
+    its content again, so a single file descriptor can be re-read for
+    every reading. Each read is a single ``preadv`` into a preallocated
+    buffer instead of an open, a buffered text wrapper, a read and a close.
+
+    The file is reopened if the device disappeared from the bus since it was opened.
+    """
+
+    def __init__(self, path: Path, size: int = 256) -> None:
+        """Initializes a RawFile. The file is opened on the first read.
+
+        :param path: the sysfs file.
+        :param int size: the size of the read buffer, larger than the file content.
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+        self._buffer = bytearray(size)
+        self._lock = threading.Lock()
+
+    def __del__(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the file descriptor, if it is open"""
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+    def _read(self) -> bytes:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+        length = _preadv(self._fd, [self._buffer], 0)
+        return bytes(self._buffer[:length])
+
+    def read(self) -> bytes:
+        """Returns the current content of the file
+
+        :raises FileNotFoundError: if the file does not exist
+        :raises OSError: if the file could not be read
+        """
+        with self._lock:
+            try:
+                return self._read()
+            except OSError as exc:
+                if exc.errno not in STALE_ERRNOS:
+                    raise
+            # the device left the bus since the file was opened, a sensor
+            # which is back on the bus has a new sysfs file
+            self.close()
+            return self._read()
+
+
+try:
+    _preadv = os.preadv
+except AttributeError:  # pragma: no cover
+
+    def _preadv(fd, buffers, offset):
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.readv(fd, buffers)
@@ -0,0 +1,248 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import heapq
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from w1thermsensor.core import W1ThermSensor
+from w1thermsensor.errors import (
+    ResetValueError,
+    SensorNotReadyError,
+    SensorTimeoutError,
+    W1ThermSensorError
+)
+from w1thermsensor.reading import SensorReading
+from w1thermsensor.units import Unit
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Describes how failed reads of a sensor are retried.
+
+    The n-th retry is delayed by ``delay * backoff ** n`` seconds, capped at
+    ``max_delay`` and varied by up to ``jitter`` (as a fraction of the delay)
+    in both directions, so sensors which failed together are not retried
+    in lockstep.
+
+    Only errors listed in ``retry_on`` are retried. By default these are
+    the transient errors of a sensor: a failed CRC check and the reset
+    value after a power glitch.
+    """
+
+    attempts: int = 3
+    delay: float = 0.1
+    backoff: float = 2.0
+    max_delay: float = 2.0
+    jitter: float = 0.1
+    retry_on: Tuple[Type[W1ThermSensorError], ...] = (
+        SensorNotReadyError,
+        ResetValueError,
+    )
+
+    def __post_init__(self):
+        if self.attempts < 0:
+            raise ValueError(
+                "The given retry attempts '{0}' must not be negative".format(self.attempts)
+            )
+
+        if self.delay < 0 or self.max_delay < 0:
+            raise ValueError("The retry delays must not be negative")
+
+        if not 0 <= self.jitter <= 1:
+            raise ValueError(
+                "The given retry jitter '{0}' is out of range (0-1)".format(self.jitter)
+            )
+
+    def should_retry(self, error: Exception, retry: int) -> bool:
+        """Returns if a read which failed with the given error should be retried
+
+        :param error: the error the read failed with.
+        :param int retry: the number of retries done so far.
+        """
+        return retry < self.attempts and isinstance(error, self.retry_on)
+
+    def get_delay(self, retry: int) -> float:
+        """Returns the time in seconds to wait before the given retry
+
+        :param int retry: the number of retries done so far.
+        """
+        delay = min(self.max_delay, self.delay * self.backoff ** retry)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class RetryScheduler:
+    """
+    Reads multiple sensors concurrently and retries failed reads.
+
+    Failed sensors are retried after the delay of their ``RetryPolicy``
+    while the reads of the other sensors continue, so a single flaky sensor
+    does not stall a sweep. A sweep with a timeout returns on time with
+    the readings available by then. Reads which are still running are
+    waited for by the next sweep of the sensor instead of starting a second
+    read, but since they were started before that sweep their results are
+    dropped and the sensor is read again.
+
+    Examples:
+        Read all sensors, giving up on sensors which are not read after 2 seconds
+
+        >>> with RetryScheduler() as scheduler:
+        ...     readings = scheduler.sweep(W1ThermSensor.get_available_sensors(), timeout=2)
+
+        Retry a flaky sensor more patiently
+
+        >>> scheduler = RetryScheduler(policies={"01226304075d": RetryPolicy(attempts=10)})
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy = RetryPolicy(),
+        policies: Optional[Dict[str, RetryPolicy]] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """Initializes a RetryScheduler.
+
+        :param policy: the retry policy of all sensors without their own policy.
+        :param dict policies: the retry policies of specific sensors by sensor id.
+        :param int max_workers: the maximum number of concurrent reads.
+                                Defaults to ``W1ThermSensor.MAX_CONCURRENT_READS``.
+        """
+        self.policy = policy
+        self.policies = policies or {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or W1ThermSensor.MAX_CONCURRENT_READS,
+            thread_name_prefix="w1thermsensor-retry",
+        )
+        # reads which did not finish within their sweep with their unit
+        # and the monotonic time they were submitted, by sensor id
+        self._inflight: Dict[str, Tuple[Future, Unit, float]] = {}
+
+    def __enter__(self) -> "RetryScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker threads once the running reads are finished"""
+        self._executor.shutdown(wait=False)
+
+    def get_policy(self, sensor: W1ThermSensor) -> RetryPolicy:
+        """Returns the retry policy of the given sensor"""
+        return self.policies.get(sensor.id, self.policy)
+
+    def _submit(self, sensor: W1ThermSensor, unit: Unit) -> Tuple[Future, float]:
+        """Returns the future of a read of the sensor and the time it was submitted
+
+        A read left over from an earlier sweep is returned if it has the same unit.
+        """
+        future, inflight_unit, submitted = self._inflight.pop(sensor.id, (None, None, 0.0))
+        if future is None or inflight_unit != unit:
+            future, submitted = self._executor.submit(sensor.get_temperature, unit), time.monotonic()
+        return future, submitted
+
+    def sweep(
+        self,
+        sensors: Iterable[W1ThermSensor],
+        unit: Unit = Unit.DEGREES_C,
+        timeout: Optional[float] = None,
+    ) -> List[SensorReading]:
+        """Read the temperature of the given sensors, retrying failed reads.
+
+        :param list sensors: the sensors to read.
+        :param int unit: the unit of the temperatures requested.
+        :param float timeout: the time in seconds after which the sweep returns.
+                              If timeout is None the sweep returns once every
+                              sensor is read or out of retries.
+
+        :returns: a reading for each sensor in the order of the given sensors.
+                  Sensors which could not be read carry their last error, or
+                  a ``SensorTimeoutError`` if no read finished in time.
+        :rtype: list
+        """
+        sensors = list(sensors)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        # forget the reads of sensors which are no longer swept
+        ids = {s.id for s in sensors}
+        for sensor_id in [i for i in self._inflight if i not in ids]:
+            self._inflight.pop(sensor_id)[0].cancel()
+
+        readings: Dict[int, SensorReading] = {}
+        errors: Dict[int, Exception] = {}
+        retries = [0] * len(sensors)
+        # the sensor index and the submit time of each running read
+        running: Dict[Future, Tuple[int, float]] = {}
+        for i, sensor in enumerate(sensors):
+            future, submitted = self._submit(sensor, unit)
+            running[future] = (i, submitted)
+        # (due time, sensor index) of the reads waiting for their retry
+        waiting: List[Tuple[float, int]] = []
+
+        while running or waiting:
+            now = time.monotonic()
+            while waiting and waiting[0][0] <= now:
+                _, i = heapq.heappop(waiting)
+                future, submitted = self._submit(sensors[i], unit)
+                running[future] = (i, submitted)
+
+            wake_up = waiting[0][0] if waiting else None
+            if deadline is not None:
+                if now >= deadline:
+                    break
+                wake_up = deadline if wake_up is None else min(wake_up, deadline)
+
+            if not running:
+                # only retries are left, sleep until the first one is due
+                time.sleep(max(0.0, wake_up - now))  # type: ignore
+                continue
+
+            done, _ = wait(
+                running,
+                timeout=None if wake_up is None else max(0.0, wake_up - now),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                i, submitted = running.pop(future)
+                sensor = sensors[i]
+                if submitted < started:
+                    # the read was started before this sweep, measure again
+                    future, submitted = self._submit(sensor, unit)
+                    running[future] = (i, submitted)
+                    continue
+                try:
+                    readings[i] = SensorReading(sensor, unit, temperature=future.result())
+                except Exception as exc:  # pylint: disable=broad-except
+                    policy = self.get_policy(sensor)
+                    if not policy.should_retry(exc, retries[i]):
+                        readings[i] = SensorReading(sensor, unit, error=exc)
+                        continue
+                    errors[i] = exc
+                    heapq.heappush(
+                        waiting, (time.monotonic() + policy.get_delay(retries[i]), i)
+                    )
+                    retries[i] += 1
+
+        # keep reads which did not finish in time for the next sweep
+        for future, (i, submitted) in running.items():
+            self._inflight[sensors[i].id] = (future, unit, submitted)
+
+        return [
+            readings.get(i)
+            or SensorReading(
+                sensor, unit, error=errors.get(i) or SensorTimeoutError(sensor, timeout)
+            )
+            for i, sensor in enumerate(sensors)
+        ]
@@ -8,8 +8,9 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
+from array import array
 from enum import Enum
-from typing import Callable
+from typing import Callable, Dict, Tuple
 
 from w1thermsensor.errors import UnsupportedUnitError
 
@@ -19,6 +20,10 @@ class Unit(Enum):
     DEGREES_F = "fahrenheit"
     KELVIN = "kelvin"
 
+    # units are singletons compared by identity, hashing them by identity
+    # as well makes the lookups of the conversion functions much cheaper
+    __hash__ = object.__hash__
+
     @classmethod
     def get_conversion_function(
         cls, unit_from: "Unit", unit_to: "Unit"
@@ -34,15 +39,60 @@ class Unit(Enum):
         :raises UnsupportedUnitError: if the unit pair is not supported
         """
         try:
-            if isinstance(unit_from, str):
-                unit_from = cls(unit_from)
-            if isinstance(unit_to, str):
-                unit_to = cls(unit_to)
-
-            return UNIT_FACTORS[(unit_from, unit_to)]
-        except KeyError:
+            return _CONVERSIONS[(unit_from, unit_to)]
+        except (KeyError, TypeError):
             raise UnsupportedUnitError()
 
+    @classmethod
+    def convert_array(cls, values, unit_from: "Unit", unit_to: "Unit"):
+        """Converts many temperatures from one unit to another at once
+
+        NumPy arrays are converted as a whole and a new array is returned.
+        ``array('d')`` buffers are copied and converted in place through a
+        NumPy view of the copy, so no Python function is called per value.
+        Without NumPy, and for all other iterables, each value is converted
+        by the conversion function.
+
+        The results are the same as converting each value with the
+        function returned by ``get_conversion_function``.
+
+        :param values: the temperatures to convert
+        :param int unit_from: the unit to convert from
+        :param int unit_to: the unit to convert into
+
+        :returns: the converted temperatures as a NumPy array, an ``array('d')``
+                  or a list, depending on the given values
+        :rtype: numpy.ndarray, array or list
+
+        :raises UnsupportedUnitError: if the unit pair is not supported
+        """
+        convert = cls.get_conversion_function(unit_from, unit_to)
+        shift, scale, offset = _AFFINE[(unit_from, unit_to)]
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+        if np is not None and isinstance(values, np.ndarray):
+            return np.array(convert(values.astype(float, copy=False)), dtype=float)
+
+        if isinstance(values, array):
+            converted = array("d", values)
+            if np is None:
+                return array("d", map(convert, converted))
+            view = np.frombuffer(converted, dtype=float)
+            # the same operations in the same order as the conversion function
+            if shift:
+                view += shift
+            if scale != 1.0:
+                view *= scale
+            if offset:
+                view += offset
+            return converted
+
+        return list(map(convert, values))
+
 
 #: Holds conversion functions for all units
 UNIT_FACTORS = {
@@ -60,3 +110,30 @@ UNIT_FACTORS = {
     (Unit.KELVIN, Unit.DEGREES_C): lambda x: x - 273.15,
     (Unit.KELVIN, Unit.DEGREES_F): lambda x: (x - 273.15) * 1.8 + 32,
 }
+
+#: Holds the conversions of ``UNIT_FACTORS`` as ``(x + shift) * scale + offset``
+UNIT_AFFINE: Dict[Tuple[Unit, Unit], Tuple[float, float, float]] = {
+    (Unit.DEGREES_C, Unit.DEGREES_C): (0.0, 1.0, 0.0),
+    (Unit.DEGREES_F, Unit.DEGREES_F): (0.0, 1.0, 0.0),
+    (Unit.KELVIN, Unit.KELVIN): (0.0, 1.0, 0.0),
+    (Unit.DEGREES_C, Unit.DEGREES_F): (0.0, 1.8, 32.0),
+    (Unit.DEGREES_C, Unit.KELVIN): (0.0, 1.0, 273.15),
+    (Unit.DEGREES_F, Unit.DEGREES_C): (-32.0, 5.0 / 9.0, 0.0),
+    (Unit.DEGREES_F, Unit.KELVIN): (-32.0, 5.0 / 9.0, 273.15),
+    (Unit.KELVIN, Unit.DEGREES_C): (-273.15, 1.0, 0.0),
+    (Unit.KELVIN, Unit.DEGREES_F): (-273.15, 1.8, 32.0),
+}
+
+
+def _with_unit_names(table):
+    # resolve the units once, so the units can be given by their names as well
+    keys = [(u, u) for u in Unit] + [(u.value, u) for u in Unit]
+    return {
+        (key_from, key_to): table[(unit_from, unit_to)]
+        for key_from, unit_from in keys
+        for key_to, unit_to in keys
+    }
+
+
+_CONVERSIONS = _with_unit_names(UNIT_FACTORS)
+_AFFINE = _with_unit_names(UNIT_AFFINE)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+样本的压缩归档 (见 samples.py)。
+
+超过一定天数的样本按通道和 UTC 的天压缩成一个数据块，保存在 archive_blocks 表中，
+并从 samples 表中删除。samples 表中每个样本约占 20 多字节，压缩后
+30 秒一次的温度样本每个只占 1 字节左右:
+
+    * 时间戳存储二阶差分 (delta-of-delta)，固定间隔的采样几乎全是 0
+    * DS18B20 的读数是 1/16 °C 的整数倍，数值乘以 16 (或 100、1000) 后
+      存储相邻整数的差，无法这样精确还原的数值存储与前一个数值的 XOR
+    * 整数用 zigzag varint 编码，整个数据块再用 zlib 压缩
+
+read_samples 按时间顺序合并归档和 samples 表中的样本，history.py 用它查询原始样本。
+汇总表在归档前更新，归档后依然完整。
+
+用法:
+    python3 archive.py temp_ds.db --days 30
+"""
+
+import argparse
+import heapq
+import sqlite3
+import struct
+import time
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from samples import ensure_schema, update_rollups
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_blocks (
+    channel_id INTEGER NOT NULL REFERENCES channels (id),
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (channel_id, start_ts)
+);
+"""
+
+#: 每个数据块包含的时间 (秒)，一个 UTC 的天
+BLOCK_SECONDS = 86400
+
+#: 尝试的数值缩放倍数，DS18B20 为 1/16 °C，其他数值多为两位或三位小数
+SCALES = (16, 100, 1000)
+
+#: 数值的编码方式: 缩放后的整数差，或与前一个数值的 XOR
+ENCODING_DELTA = 0
+ENCODING_XOR = 1
+
+DOUBLE = struct.Struct(">d")
+UINT64 = struct.Struct(">Q")
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    """把有符号整数以 zigzag varint 编码写入 out"""
+    value = -2 * value - 1 if value < 0 else 2 * value
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """从 data 的 pos 处读取一个 zigzag varint，返回数值和下一个位置"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+
+def find_scale(values: List[float]) -> Optional[int]:
+    """返回能把所有数值精确还原为 整数 / 倍数 的最小倍数，没有则返回 None"""
+    for scale in SCALES:
+        try:
+            if all(round(value * scale) / scale == value for value in values):
+                return scale
+        except (OverflowError, ValueError):
+            # 无穷大和 NaN 只能用 XOR 存储
+            return None
+    return None
+
+
+def encode_block(rows: List[Tuple[int, float]]) -> bytes:
+    """把按时间排序的样本 (ts, value) 编码为压缩的数据块"""
+    out = bytearray()
+    values = [value for _, value in rows]
+    scale = find_scale(values)
+    out.append(ENCODING_XOR if scale is None else ENCODING_DELTA)
+    write_varint(out, scale or 0)
+    write_varint(out, len(rows))
+
+    previous_ts = previous_delta = 0
+    for ts, _ in rows:
+        delta = ts - previous_ts
+        write_varint(out, delta - previous_delta)
+        previous_ts, previous_delta = ts, delta
+
+    if scale is None:
+        previous = 0
+        for value in values:
+            bits = UINT64.unpack(DOUBLE.pack(value))[0]
+            out += UINT64.pack(bits ^ previous)
+            previous = bits
+    else:
+        previous = 0
+        for value in values:
+            quantized = round(value * scale)
+            write_varint(out, quantized - previous)
+            previous = quantized
+
+    return zlib.compress(bytes(out), 9)
+
+
+def decode_block(data: bytes) -> List[Tuple[int, float]]:
+    """把数据块解码为按时间排序的样本 (ts, value)"""
+    data = zlib.decompress(data)
+    encoding = data[0]
+    scale, pos = read_varint(data, 1)
+    count, pos = read_varint(data, pos)
+
+    timestamps = []
+    ts = delta = 0
+    for _ in range(count):
+        delta_of_delta, pos = read_varint(data, pos)
+        delta += delta_of_delta
+        ts += delta
+        timestamps.append(ts)
+
+    values = []
+    if encoding == ENCODING_XOR:
+        bits = 0
+        for _ in range(count):
+            bits ^= UINT64.unpack_from(data, pos)[0]
+            pos += UINT64.size
+            values.append(DOUBLE.unpack(UINT64.pack(bits))[0])
+    else:
+        quantized = 0
+        for _ in range(count):
+            difference, pos = read_varint(data, pos)
+            quantized += difference
+            values.append(quantized / scale)
+
+    return list(zip(timestamps, values))
+
+
+def ensure_archive_schema(conn: sqlite3.Connection) -> None:
+    """确保样本表、汇总表和归档表存在"""
+    ensure_schema(conn)
+    conn.executescript(ARCHIVE_SCHEMA)
+
+
+def archive_block(conn: sqlite3.Connection, channel_id: int, start: int) -> int:
+    """把一个通道在 [start, start + BLOCK_SECONDS) 内的样本归档，返回归档的样本数
+
+    已有的数据块会先被还原到 samples 表中，与归档后才写入的样本一起重新归档，
+    同一秒的样本保留归档中的。归档后才写入的旧样本会让汇总表的这一天不完整，
+    直到再次归档。需要在事务中调用。
+    """
+    end = start + BLOCK_SECONDS
+    row = conn.execute(
+        "SELECT data FROM archive_blocks WHERE channel_id = ? AND start_ts = ?", (channel_id, start)
+    ).fetchone()
+    if row:
+        conn.executemany(
+            "INSERT OR REPLACE INTO samples (channel_id, ts, value) VALUES (?, ?, ?)",
+            [(channel_id, ts, value) for ts, value in decode_block(row[0])],
+        )
+
+    # 汇总表由样本计算，要在删除样本之前更新
+    update_rollups(conn, channel_id, start, end - 1)
+
+    rows = conn.execute(
+        "SELECT ts, value FROM samples WHERE channel_id = ? AND ts >= ? AND ts < ? "
+        "AND value IS NOT NULL ORDER BY ts",
+        (channel_id, start, end),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    conn.execute(
+        "INSERT OR REPLACE INTO archive_blocks (channel_id, start_ts, end_ts, count, data) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (channel_id, start, rows[-1][0], len(rows), encode_block(rows)),
+    )
+    # 数值为 NULL 的样本不归档，留在 samples 表中
+    conn.execute(
+        "DELETE FROM samples WHERE channel_id = ? AND ts >= ? AND ts < ? AND value IS NOT NULL",
+        (channel_id, start, end),
+    )
+    return len(rows)
+
+
+def archive(conn: sqlite3.Connection, before: int, pause: float = 0.05) -> Iterator[Tuple[str, int, int]]:
+    """把所有通道在 before 所在的 UTC 天之前的样本归档，每个数据块一个事务
+
+    conn 需要用 isolation_level=None 打开。
+
+    :returns: 逐个返回归档的 (通道名, 数据块开始时间, 样本数)
+    """
+    before -= before % BLOCK_SECONDS
+    channels = conn.execute("SELECT id, name FROM channels").fetchall()
+    for channel_id, name in channels:
+        starts = conn.execute(
+            "SELECT DISTINCT ts - ts % ? FROM samples WHERE channel_id = ? AND ts < ? "
+            "AND value IS NOT NULL ORDER BY 1",
+            (BLOCK_SECONDS, channel_id, before),
+        ).fetchall()
+        for (start,) in starts:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = archive_block(conn, channel_id, start)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            yield name, start, count
+            time.sleep(pause)
+
+
+def read_archive(
+    conn: sqlite3.Connection, channel_id: int, start: int, end: int
+) -> Iterator[Tuple[int, float]]:
+    """按时间顺序返回一个通道在 [start, end) 内的归档样本，每次只解码一个数据块"""
+    blocks = conn.execute(
+        "SELECT start_ts FROM archive_blocks WHERE channel_id = ? AND end_ts >= ? AND start_ts < ? "
+        "ORDER BY start_ts",
+        (channel_id, start, end),
+    ).fetchall()
+    for (block_start,) in blocks:
+        row = conn.execute(
+            "SELECT data FROM archive_blocks WHERE channel_id = ? AND start_ts = ?",
+            (channel_id, block_start),
+        ).fetchone()
+        for ts, value in decode_block(row[0]):
+            if start <= ts < end:
+                yield ts, value
+
+
+def read_live(
+    conn: sqlite3.Connection, channel_id: int, start: int, end: int, chunk_size: int = 1000
+) -> Iterator[Tuple[int, float]]:
+    """按时间顺序返回一个通道在 [start, end) 内 samples 表中的样本"""
+    cursor = conn.execute(
+        "SELECT ts, value FROM samples WHERE channel_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+        (channel_id, start, end),
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def read_samples(
+    conn: sqlite3.Connection, channel_id: int, start: int, end: int, chunk_size: int = 1000
+) -> Iterator[Tuple[int, float]]:
+    """按时间顺序返回一个通道在 [start, end) 内的所有样本，合并归档和 samples 表
+
+    同一秒有多个样本时只返回归档中的样本，与写入 samples 表时一样只保留第一个。
+    """
+    if not has_archive(conn):
+        yield from read_live(conn, channel_id, start, end, chunk_size)
+        return
+
+    previous = None
+    merged = heapq.merge(
+        ((ts, 0, value) for ts, value in read_archive(conn, channel_id, start, end)),
+        ((ts, 1, value) for ts, value in read_live(conn, channel_id, start, end, chunk_size)),
+    )
+    for ts, _, value in merged:
+        if ts != previous:
+            yield ts, value
+            previous = ts
+
+
+def has_archive(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archive_blocks'"
+    ).fetchone() is not None
+
+
+def archive_size(conn: sqlite3.Connection) -> Iterable[Tuple[str, int, int]]:
+    """返回每个通道归档的 (通道名, 样本数, 压缩后的字节数)"""
+    return conn.execute(
+        "SELECT name, sum(count), sum(length(data)) FROM archive_blocks "
+        "JOIN channels ON channels.id = archive_blocks.channel_id GROUP BY channels.id ORDER BY name"
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把旧样本压缩归档")
+    parser.add_argument("db_path", nargs="?", default="temp_ds.db", help="数据库文件")
+    parser.add_argument("--days", type=int, default=30, help="归档多少天之前的样本")
+    parser.add_argument("--pause", type=float, default=0.05, help="两个数据块之间暂停的秒数")
+    parser.add_argument("--vacuum", action="store_true", help="归档后整理数据库文件，释放删除样本的空间")
+    args = parser.parse_args()
+
+    # 自己控制事务，等待记录程序的写入最多 30 秒
+    conn = sqlite3.connect(args.db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_archive_schema(conn)
+
+    started = time.monotonic()
+    blocks = sum(1 for _ in archive(conn, int(time.time()) - args.days * 86400, args.pause))
+    print(f"归档了 {blocks} 个数据块，用时 {time.monotonic() - started:.1f} 秒")
+    for name, count, size in archive_size(conn):
+        print(f"{name}: 归档 {count} 个样本，{size} 字节，每个样本 {size / count:.2f} 字节")
+
+    if args.vacuum:
+        conn.execute("VACUUM")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+根据样本表 samples 补算汇总表 samples_minute、samples_hour 和 samples_day (见 samples.py)。
+
+记录程序写入样本时会自动更新汇总表，只有迁移的旧数据 (见 migrate_db.py)
+或汇总表建立之前写入的样本需要补算:
+
+    python3 backfill_rollups.py temp_ds.db
+
+按通道和时间分块计算，每块是一个很短的事务，记录程序在补算期间可以继续写入。
+重复运行是安全的，汇总值总是重新计算，不会重复计数。
+"""
+
+import argparse
+import sqlite3
+import time
+
+from samples import ensure_schema, update_rollups
+
+
+def backfill_channel(conn, channel_id, days, pause):
+    """分块补算一个通道的汇总表，返回补算的天数"""
+    start, end = conn.execute(
+        "SELECT min(ts), max(ts) FROM samples WHERE channel_id = ?", (channel_id,)
+    ).fetchone()
+    if start is None:
+        return 0
+
+    chunk = days * 86400
+    # 从 UTC 的一天开始分块，每块都包含完整的天
+    low = start - start % 86400
+    while low <= end:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            update_rollups(conn, channel_id, low, low + chunk - 1)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        low += chunk
+        time.sleep(pause)
+    return (end - end % 86400 - (start - start % 86400)) // 86400 + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据样本表补算汇总表")
+    parser.add_argument("db_path", nargs="?", default="temp_ds.db", help="数据库文件")
+    parser.add_argument("--days", type=int, default=7, help="每个事务补算的天数")
+    parser.add_argument("--pause", type=float, default=0.05, help="两块之间暂停的秒数")
+    args = parser.parse_args()
+
+    # 自己控制事务，等待记录程序的写入最多 30 秒
+    conn = sqlite3.connect(args.db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+
+    for channel_id, name in conn.execute("SELECT id, name FROM channels").fetchall():
+        started = time.monotonic()
+        days = backfill_channel(conn, channel_id, args.days, args.pause)
+        print(f"{name}: 补算了 {days} 天，用时 {time.monotonic() - started:.1f} 秒")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询和导出样本表 samples 中的历史数据 (见 samples.py)。
+
+结果由数据库游标按固定大小分块读取并逐块写出，导出一年的 30 秒温度数据
+也只占用固定的内存。支持导出 CSV、NDJSON 和 NumPy 的 .npy 文件。
+npy 格式把每列写入目录中单独的 .npy 文件 (如 ts.npy、value.npy)，
+可以用 numpy.load(..., mmap_mode="r") 以内存映射的方式只读取需要的列；
+文件逐块追加写入，写完后再在文件头中填入行数。
+
+按时间段重采样时 (--interval)，时间段是汇总表时间段的整数倍就直接读取
+汇总表 (见 samples.ROLLUPS)，否则由样本计算；结束时间所在的不完整时间段
+总是由样本计算。时间段从 UTC 的 Unix 时间 0 开始划分。
+原始样本包括已压缩归档的样本 (见 archive.py)。
+
+用法:
+    python3 history.py --list
+    python3 history.py temp_list.temp --start 2024-01-01 --end 2024-02-01
+    python3 history.py temp_list.temp --interval 3600 --format ndjson
+    python3 history.py temp_list.temp --format npy -o temp_npy
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+import time
+from datetime import datetime
+from itertools import groupby, islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from archive import has_archive, read_archive, read_samples
+from samples import ROLLUPS
+
+#: 原始样本的列
+RAW_COLUMNS = ("ts", "value")
+
+#: 重采样结果的列，mean 和 std 是时间段内样本的平均值和标准差
+RESAMPLED_COLUMNS = ("ts", "count", "min", "max", "mean", "std")
+
+
+def parse_time(text: str) -> int:
+    """把 Unix 时间戳或 ISO 格式的时间 (如 2024-01-01 12:00) 转换为 UTC 时间戳，
+    没有时区的时间按本地时间处理"""
+    try:
+        return int(float(text))
+    except ValueError:
+        return int(datetime.fromisoformat(text).timestamp())
+
+
+def get_channel_id(conn: sqlite3.Connection, name: str) -> int:
+    row = conn.execute("SELECT id FROM channels WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise ValueError(f"没有通道 {name}")
+    return row[0]
+
+
+def build_rollup_query(channel_id: int, start: int, end: int, interval: int) -> Optional[Tuple[str, tuple]]:
+    """返回由汇总表重采样 [start, end) 的 SQL 和参数，重采样时间段不是任何汇总表
+    时间段的整数倍时返回 None
+
+    只包括在 end 之前结束的完整时间段，end 所在的时间段要由样本计算，
+    否则会包括 end 之后的样本。start 需要是时间段的整数倍。
+    """
+    # 用时间段能整除重采样时间段的最大的汇总表
+    source = None
+    for table, width in ROLLUPS:
+        if interval % width == 0:
+            source = table
+    if source is None:
+        return None
+
+    return (
+        "SELECT bucket - bucket % ? AS bucket, sum(count), min(min), max(max), "
+        "sum(sum), sum(sumsq) FROM {0} "
+        "WHERE channel_id = ? AND bucket >= ? AND bucket < ? GROUP BY 1 ORDER BY 1".format(source),
+        (interval, channel_id, start, end - end % interval),
+    )
+
+
+def resampled_row(row: tuple) -> tuple:
+    bucket, count, minimum, maximum, total, squares = row
+    mean = total / count
+    return bucket, count, minimum, maximum, mean, math.sqrt(max(squares / count - mean * mean, 0.0))
+
+
+def resample(samples: Iterable[Tuple[int, float]], interval: int) -> Iterator[tuple]:
+    """把按时间排序的样本按时间段汇总，与汇总表的计算方式相同"""
+    for bucket, group in groupby(
+        (sample for sample in samples if sample[1] is not None),
+        key=lambda sample: sample[0] - sample[0] % interval,
+    ):
+        count, minimum, maximum, total, squares = 0, math.inf, -math.inf, 0.0, 0.0
+        for _, value in group:
+            count += 1
+            minimum = min(minimum, value)
+            maximum = max(maximum, value)
+            total += value
+            squares += value * value
+        yield bucket, count, minimum, maximum, total, squares
+
+
+def chunked(rows: Iterable[tuple], chunk_size: int) -> Iterator[List[tuple]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def query(
+    conn: sqlite3.Connection,
+    channel: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    interval: Optional[int] = None,
+    chunk_size: int = 1000,
+) -> Iterator[List[tuple]]:
+    """按时间顺序逐块返回一个通道在 [start, end) 内的样本，包括已归档的样本 (见 archive.py)
+
+    :param channel: 通道名，如 'temp_list.temp'
+    :param start: 开始的 UTC 时间戳，默认为最早的样本
+    :param end: 结束的 UTC 时间戳 (不含)，默认为现在
+    :param interval: 重采样的时间段 (秒)，每行是一个时间段，列见 RESAMPLED_COLUMNS。
+                     从 start 之后的第一个整段开始，最后一段只包含 end 之前的样本。
+                     默认返回原始样本，列见 RAW_COLUMNS
+    :param chunk_size: 每块的行数
+
+    :raises ValueError: 通道不存在或 interval 不是正数时
+    """
+    if interval is not None and interval <= 0:
+        raise ValueError(f"重采样的时间段必须是正数: {interval}")
+    channel_id = get_channel_id(conn, channel)
+    start = 0 if start is None else start
+    end = int(time.time()) + 1 if end is None else end
+    if interval is None:
+        yield from chunked(read_samples(conn, channel_id, start, end, chunk_size), chunk_size)
+        return
+
+    start += (-start) % interval
+    rollup_query = build_rollup_query(channel_id, start, end, interval)
+    if rollup_query is None:
+        rows = resample(read_samples(conn, channel_id, start, end, chunk_size), interval)
+        for chunk in chunked(rows, chunk_size):
+            yield [resampled_row(row) for row in chunk]
+        return
+
+    cursor = conn.execute(*rollup_query)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [resampled_row(row) for row in rows]
+    finally:
+        cursor.close()
+
+    # 汇总表不包括 end 所在的不完整时间段，由样本计算
+    tail_start = max(end - end % interval, start)
+    tail = [
+        resampled_row(row)
+        for row in resample(read_samples(conn, channel_id, tail_start, end, chunk_size), interval)
+    ]
+    if tail:
+        yield tail
+
+
+def list_channels(conn: sqlite3.Connection) -> Iterator[Tuple[str, int, Optional[int], Optional[int]]]:
+    """逐个返回通道的 (通道名, 样本数, 最早的时间戳, 最晚的时间戳)，包括已归档的样本"""
+    archived = has_archive(conn)
+    for channel_id, name in conn.execute("SELECT id, name FROM channels ORDER BY name").fetchall():
+        count, first, last = conn.execute(
+            "SELECT count(*), min(ts), max(ts) FROM samples WHERE channel_id = ?", (channel_id,)
+        ).fetchone()
+        if archived:
+            archived_count, archived_first_block, archived_last = conn.execute(
+                "SELECT coalesce(sum(count), 0), min(start_ts), max(end_ts) FROM archive_blocks "
+                "WHERE channel_id = ?",
+                (channel_id,),
+            ).fetchone()
+            if archived_count:
+                # 数值为 NULL 的样本不归档，samples 表中可能有比归档更早的样本，
+                # 最早和最晚的时间取两者中的；归档中最早的样本只需解码第一个数据块
+                archived_first = next(
+                    read_archive(conn, channel_id, archived_first_block, archived_last + 1)
+                )[0]
+                first = archived_first if first is None else min(first, archived_first)
+                last = archived_last if last is None else max(last, archived_last)
+                count += archived_count
+        yield name, count, first, last
+
+
+def local_time(ts: int) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def export_csv(chunks, columns, out) -> int:
+    writer = csv.writer(out)
+    writer.writerow(("time",) + columns)
+    written = 0
+    for rows in chunks:
+        writer.writerows((local_time(row[0]),) + tuple(row) for row in rows)
+        written += len(rows)
+    return written
+
+
+def export_ndjson(chunks, columns, out) -> int:
+    written = 0
+    for rows in chunks:
+        out.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+        written += len(rows)
+    return written
+
+
+def npy_header(np, dtype, rows: int, size: int = 0) -> bytes:
+    """返回一维数组的 .npy 文件头 (1.0 版)，用空格补齐到至少 size 字节和 64 的整数倍"""
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)})
+    prefix = np.lib.format.magic(1, 0)
+    length = len(prefix) + 2 + len(header) + 1
+    length = max(size, length + (-length) % 64)
+    header = header.ljust(length - len(prefix) - 3) + "\n"
+    return prefix + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def export_npy(chunks, columns, directory) -> int:
+    """把结果的每列逐块追加写入目录中的 <列名>.npy 文件，目录不存在时创建
+
+    每列一个文件，读取一列时不用读取其他列。行数事先未知，写完后再改写文件头中的行数。
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise SystemExit("导出 .npy 文件需要安装 numpy: pip install numpy")
+
+    dtype = np.dtype([(column, "<i8" if column in ("ts", "count") else "<f8") for column in columns])
+    # 文件头按最大的行数预留空间，改写时长度不变
+    sizes = {column: len(npy_header(np, dtype[column], 2 ** 63 - 1)) for column in columns}
+    os.makedirs(directory, exist_ok=True)
+    outs = {column: open(os.path.join(directory, f"{column}.npy"), "wb") for column in columns}
+    written = 0
+    try:
+        for column, out in outs.items():
+            out.write(npy_header(np, dtype[column], 0, sizes[column]))
+        for chunk in chunks:
+            array = np.array(chunk, dtype=dtype)
+            for column, out in outs.items():
+                out.write(array[column].tobytes())
+            written += len(chunk)
+        for column, out in outs.items():
+            out.seek(0)
+            out.write(npy_header(np, dtype[column], written, sizes[column]))
+    finally:
+        for out in outs.values():
+            out.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询和导出历史数据")
+    parser.add_argument("channel", nargs="?", help="通道名，如 temp_list.temp")
+    parser.add_argument("--db", default="temp_ds.db", help="数据库文件")
+    parser.add_argument("--list", action="store_true", help="列出所有通道")
+    parser.add_argument("--start", type=parse_time, help="开始时间，如 2024-01-01 或 Unix 时间戳")
+    parser.add_argument("--end", type=parse_time, help="结束时间 (不含)，默认为现在")
+    parser.add_argument("--interval", type=int, help="重采样的时间段 (秒)，如 3600")
+    parser.add_argument("--format", choices=("csv", "ndjson", "npy"), default="csv", help="导出格式")
+    parser.add_argument("-o", "--output", help="输出文件，默认输出到屏幕；npy 格式必须指定输出目录")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每次从数据库读取的行数")
+    args = parser.parse_args()
+    if args.interval is not None and args.interval <= 0:
+        parser.error("--interval 必须是正数")
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    if args.list:
+        for name, count, first, last in list_channels(conn):
+            span = f"{local_time(first)} - {local_time(last)}" if count else ""
+            print(f"{name}\t{count} 个样本\t{span}")
+        return
+    if not args.channel:
+        parser.error("请指定通道，用 --list 列出所有通道")
+    if args.format == "npy" and not args.output:
+        parser.error("npy 格式必须用 -o 指定输出目录")
+
+    start = 0 if args.start is None else args.start
+    end = int(time.time()) + 1 if args.end is None else args.end
+    columns = RESAMPLED_COLUMNS if args.interval else RAW_COLUMNS
+    try:
+        chunks = query(conn, args.channel, start, end, args.interval, args.chunk_size)
+        if args.format == "npy":
+            written = export_npy(chunks, columns, args.output)
+        else:
+            export = export_csv if args.format == "csv" else export_ndjson
+            out = open(args.output, "w", newline="") if args.output else sys.stdout
+            try:
+                written = export(chunks, columns, out)
+            finally:
+                if args.output:
+                    out.close()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"导出了 {written} 行", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ import json
 import RPi.GPIO as GPIO
 import pigpio
 from datetime import datetime
-from w1thermsensor import W1ThermSensor
+from w1thermsensor import sensor_registry
 
 # ==================================
 # === 配置区 (请根据实际情况修改) ===
@@ -132,7 +132,7 @@ def read_tvoc_sensor(pi):
 def read_temperature():
     """读取 DS18B20 温度"""
     try:
-        sensors = W1ThermSensor.get_available_sensors()
+        sensors = sensor_registry.get_sensors()
         if not sensors:
             return None
         return sensors[0].get_temperature()
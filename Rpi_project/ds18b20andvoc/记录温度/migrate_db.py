@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+把旧表 temp_list 和 tempanvoc 的数据迁移到样本表 samples (见 samples.py)。
+
+旧表的时间是本地时间的文本，迁移时转换为 UTC 的 Unix 时间戳。
+转换使用本机的时区，可以用 TZ 环境变量指定，如:
+
+    TZ=Asia/Shanghai python3 migrate_db.py temp_ds.db
+
+迁移按 id 分块进行，每块是一个很短的事务，块之间暂停一下，
+记录程序在迁移期间可以继续写入。迁移进度保存在 migration_progress 表中，
+中断后再次运行会从上次的位置继续；迁移完成后再运行只会迁移新增的行。
+旧表保持不变。迁移后用 backfill_rollups.py 补算汇总表。
+"""
+
+import argparse
+import sqlite3
+import time
+
+from samples import ensure_schema, get_channel_ids
+
+# 旧表: (表名, 时间列, 数值列)
+SOURCES = (
+    ("temp_list", "date", ("temp",)),
+    ("tempanvoc", "timestamp", ("temp", "ch2o", "tvoc", "co2")),
+)
+
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS migration_progress (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+)
+"""
+
+
+def table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def migrate_table(conn, table, time_column, value_columns, chunk_size, pause):
+    """分块迁移一个旧表，返回迁移的样本数"""
+    channels = get_channel_ids(conn, [f"{table}.{column}" for column in value_columns])
+    row = conn.execute("SELECT last_id FROM migration_progress WHERE source = ?", (table,)).fetchone()
+    if row:
+        last_id = row[0]
+    else:
+        # 从最小的 id 开始，旧表中有 id 为 0 的行
+        last_id = conn.execute(f"SELECT coalesce(min(id), 1) - 1 FROM {table}").fetchone()[0]
+
+    # strftime('%s', ..., 'utc') 把本地时间转换为 UTC 时间戳，无法解析的时间得到 NULL，
+    # 因 ts 不能为 NULL 而被 INSERT OR IGNORE 跳过
+    inserts = [
+        (
+            f"INSERT OR IGNORE INTO samples (channel_id, ts, value) "
+            f"SELECT ?, CAST(strftime('%s', {time_column}, 'utc') AS INTEGER), {column} "
+            f"FROM {table} WHERE id > ? AND id <= ? AND {column} IS NOT NULL",
+            channels[f"{table}.{column}"],
+        )
+        for column in value_columns
+    ]
+
+    migrated = 0
+    while True:
+        max_id = conn.execute(f"SELECT max(id) FROM {table}").fetchone()[0] or 0
+        if last_id >= max_id:
+            return migrated
+
+        upper = min(last_id + chunk_size, max_id)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, channel_id in inserts:
+                migrated += conn.execute(sql, (channel_id, last_id, upper)).rowcount
+            conn.execute(
+                "INSERT OR REPLACE INTO migration_progress (source, last_id) VALUES (?, ?)",
+                (table, upper),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        last_id = upper
+        print(f"{table}: 已迁移到 id {last_id} / {max_id}")
+        time.sleep(pause)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把旧表的数据迁移到样本表")
+    parser.add_argument("db_path", nargs="?", default="temp_ds.db", help="数据库文件")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="每个事务迁移的行数")
+    parser.add_argument("--pause", type=float, default=0.05, help="两块之间暂停的秒数")
+    args = parser.parse_args()
+
+    # 自己控制事务，等待记录程序的写入最多 30 秒
+    conn = sqlite3.connect(args.db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+    conn.execute(PROGRESS_SCHEMA)
+
+    for table, time_column, value_columns in SOURCES:
+        if not table_exists(conn, table):
+            continue
+        started = time.monotonic()
+        migrated = migrate_table(conn, table, time_column, value_columns, args.chunk_size, args.pause)
+        print(f"{table}: 迁移了 {migrated} 个样本，用时 {time.monotonic() - started:.1f} 秒")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+样本表结构。
+每个测量值(如 DS18B20 温度、TVOC)是一个通道，样本按 (通道, UTC 时间戳) 存储:
+
+    channels(id, name)                  通道，name 如 'temp_list.temp'
+    samples(channel_id, ts, value)      ts 为 UTC 的 Unix 时间戳(秒)
+
+samples 是 WITHOUT ROWID 表，主键 (channel_id, ts) 本身就是包含 value 的
+覆盖索引，按通道和时间范围查询时只需读取索引的一段，不用全表扫描，
+也不受本地时间夏令时切换的影响。
+
+汇总表 samples_minute、samples_hour 和 samples_day 按 UTC 的分钟、小时和天
+保存每个通道的样本数、最小值、最大值、总和与平方和，图表和报表读取几百行
+汇总数据即可，不用读取几万行样本。BatchWriter 每次写入样本时用
+update_rollups_on_flush 更新涉及的时间段，已有的数据用 backfill_rollups.py 补算。
+"""
+
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    channel_id INTEGER NOT NULL REFERENCES channels (id),
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (channel_id, ts)
+) WITHOUT ROWID;
+"""
+
+#: 汇总表: (表名, 时间段的秒数)，每个汇总表由前一个汇总表计算
+ROLLUPS = (
+    ("samples_minute", 60),
+    ("samples_hour", 3600),
+    ("samples_day", 86400),
+)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    channel_id INTEGER NOT NULL REFERENCES channels (id),
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    sum REAL,
+    sumsq REAL,
+    PRIMARY KEY (channel_id, bucket)
+) WITHOUT ROWID;
+"""
+
+# 同一通道同一秒只保留第一个样本，迁移旧数据时重复的样本也会被忽略
+INSERT_SAMPLE = "INSERT OR IGNORE INTO samples (channel_id, ts, value) VALUES (?, ?, ?)"
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """确保样本表和汇总表存在"""
+    conn.executescript(SCHEMA + "".join(ROLLUP_SCHEMA.format(table=table) for table, _ in ROLLUPS))
+
+
+def get_channel_ids(conn: sqlite3.Connection, names: Iterable[str]) -> Dict[str, int]:
+    """返回各通道的 id，不存在的通道会被创建"""
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO channels (name) VALUES (?)", [(name,) for name in names]
+        )
+    return {name: channel_id for channel_id, name in conn.execute("SELECT id, name FROM channels")}
+
+
+def setup_channels(db_path: str, names: Iterable[str]) -> Dict[str, int]:
+    """确保数据库中有样本表和给定的通道，返回各通道的 id"""
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)
+        return get_channel_ids(conn, names)
+    finally:
+        conn.close()
+
+
+def update_rollups(conn: sqlite3.Connection, channel_id: int, start: int, end: int) -> None:
+    """重新计算一个通道在 start 到 end (含) 之间的样本所在的汇总时间段
+
+    汇总值总是由样本或前一个汇总表重新计算，重复更新同一时间段不会重复计数。
+    """
+    source = None
+    for table, width in ROLLUPS:
+        low = start - start % width
+        high = end - end % width + width
+        if source is None:
+            select = (
+                "SELECT channel_id, ts - ts % ?, count(value), min(value), max(value), "
+                "sum(value), sum(value * value) FROM samples "
+                "WHERE channel_id = ? AND ts >= ? AND ts < ? AND value IS NOT NULL "
+                "GROUP BY ts - ts % ?"
+            )
+        else:
+            select = (
+                "SELECT channel_id, bucket - bucket % ?, sum(count), min(min), max(max), "
+                "sum(sum), sum(sumsq) FROM {0} "
+                "WHERE channel_id = ? AND bucket >= ? AND bucket < ? "
+                "GROUP BY bucket - bucket % ?".format(source)
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO {0} (channel_id, bucket, count, min, max, sum, sumsq) "
+            "{1}".format(table, select),
+            (width, channel_id, low, high, width),
+        )
+        source = table
+
+
+def get_sample_ranges(rows: Iterable[Sequence]) -> Dict[int, Tuple[int, int]]:
+    """返回样本 (channel_id, ts, value) 中每个通道的最早和最晚时间戳"""
+    ranges: Dict[int, List[int]] = defaultdict(list)
+    for channel_id, ts, _ in rows:
+        ranges[channel_id].append(ts)
+    return {channel_id: (min(ts), max(ts)) for channel_id, ts in ranges.items()}
+
+
+def update_rollups_on_flush(conn: sqlite3.Connection, pending: Dict[str, List[Sequence]]) -> None:
+    """BatchWriter 的 on_flush 回调，在写入样本的同一事务中更新汇总表"""
+    for channel_id, (start, end) in get_sample_ranges(pending.get(INSERT_SAMPLE, ())).items():
+        update_rollups(conn, channel_id, start, end)
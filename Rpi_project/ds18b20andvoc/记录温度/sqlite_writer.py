@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入 SQLite 数据库。
+样本先缓存在内存中，攒够一定条数或等待一定时间后，由后台线程用 executemany
+在一个事务里一次写入，避免每个样本都提交一次、在 SD 卡上做一次 fsync。
+数据库使用 WAL 模式和 synchronous=NORMAL，读数据的程序不会阻塞写入。
+"""
+
+import atexit
+import signal
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class BatchWriter:
+    """
+    缓冲样本并批量写入 SQLite 数据库。
+
+    用法:
+        writer = BatchWriter('temp_ds.db')
+        writer.add("INSERT INTO temp_list (temp, date) VALUES (?, ?)", (23.5, now))
+
+    满足以下任一条件时写入数据库:
+        * 缓存的样本达到 max_rows 条
+        * 最早缓存的样本已等待 max_delay 秒
+        * 调用 flush() 或 close()
+        * 程序退出，包括 Ctrl+C (SIGINT) 和 kill (SIGTERM)
+
+    断电时最多丢失 max_delay 秒内的样本。
+
+    写入失败的样本留在缓存中，每隔 max_delay 秒重试。连续 max_attempts 次失败后
+    逐条写入，仍然写不进去的样本 (如违反约束) 记录到日志后丢弃，不会无限重试。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_rows: int = 100,
+        max_delay: float = 60.0,
+        synchronous: str = "NORMAL",
+        handle_signals: bool = True,
+        log: Callable[[str], None] = print,
+        on_flush: Optional[Callable[[sqlite3.Connection, Dict[str, List[Sequence]]], None]] = None,
+        max_attempts: int = 3,
+    ) -> None:
+        """
+        :param db_path: 数据库文件
+        :param max_rows: 缓存多少条样本后写入
+        :param max_delay: 样本最多缓存多少秒
+        :param synchronous: SQLite 的 synchronous 设置，WAL 模式下 NORMAL 只在检查点时 fsync
+        :param handle_signals: 是否在收到 SIGTERM 时正常退出，以便写入缓存的样本
+        :param log: 输出写入错误的函数
+        :param on_flush: 在写入样本的同一事务中调用的函数，参数为数据库连接和按 SQL 语句分组的样本，
+                         如 samples.update_rollups_on_flush
+        :param max_attempts: 整批写入连续失败多少次后改为逐条写入
+        """
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.log = log
+        self.on_flush = on_flush
+        self.max_attempts = max_attempts
+
+        # 连接由后台线程和调用 flush() 的线程共用，写入时由 _write_lock 保护
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+
+        # 按 SQL 语句分组缓存的样本，每组用一次 executemany 写入
+        self._pending: Dict[str, List[Sequence]] = {}
+        self._count = 0
+        self._first_added: Optional[float] = None
+        # 整批写入连续失败的次数
+        self._failures = 0
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="BatchWriter", daemon=True)
+        self._thread.start()
+
+        atexit.register(self.close)
+        if handle_signals:
+            install_sigterm_handler()
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, sql: str, params: Sequence) -> None:
+        """缓存一条样本，params 是 sql 语句的参数"""
+        with self._condition:
+            if self._closed:
+                raise ValueError("BatchWriter 已关闭")
+            self._pending.setdefault(sql, []).append(params)
+            self._count += 1
+            if self._first_added is None:
+                self._first_added = time.monotonic()
+                self._condition.notify()
+            elif self._count == self.max_rows:
+                # 只在刚达到 max_rows 时唤醒，写入失败后缓存超过 max_rows 时不要打断重试的等待
+                self._condition.notify()
+
+    def _take_pending(self) -> Dict[str, List[Sequence]]:
+        with self._condition:
+            pending, self._pending = self._pending, {}
+            self._count = 0
+            self._first_added = None
+            return pending
+
+    def _put_back(self, pending: Dict[str, List[Sequence]]) -> None:
+        # 写入失败的样本放回缓存的最前面，下次再写
+        with self._condition:
+            for sql, rows in self._pending.items():
+                pending.setdefault(sql, []).extend(rows)
+            self._pending = pending
+            self._count = sum(len(rows) for rows in pending.values())
+            self._first_added = time.monotonic() if self._count else None
+
+    def _write(self, pending: Dict[str, List[Sequence]]) -> None:
+        with self.conn:
+            for sql, rows in pending.items():
+                self.conn.executemany(sql, rows)
+            if self.on_flush is not None:
+                self.on_flush(self.conn, pending)
+
+    def _write_rows(self, pending: Dict[str, List[Sequence]]) -> None:
+        """在一个事务里逐条写入样本，写不进去的样本记录到日志后丢弃
+
+        on_flush 失败时样本照常写入，汇总表可以之后用 backfill_rollups.py 补算。
+        """
+        written: Dict[str, List[Sequence]] = {}
+        with self.conn:
+            # 先取得写锁，数据库被锁定时整批样本留在缓存中，不会被当作写不进去的样本丢弃
+            self.conn.execute("BEGIN IMMEDIATE")
+            for sql, rows in pending.items():
+                for params in rows:
+                    self.conn.execute("SAVEPOINT sample")
+                    try:
+                        self.conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        self.conn.execute("ROLLBACK TO sample")
+                        self.log(f"丢弃无法写入的样本 {params!r}: {e}")
+                    else:
+                        written.setdefault(sql, []).append(params)
+                    self.conn.execute("RELEASE sample")
+            if self.on_flush is not None and written:
+                self.conn.execute("SAVEPOINT on_flush")
+                try:
+                    self.on_flush(self.conn, written)
+                except Exception as e:
+                    self.conn.execute("ROLLBACK TO on_flush")
+                    self.log(f"样本已写入，但 on_flush 失败: {e}")
+                self.conn.execute("RELEASE on_flush")
+
+    def flush(self) -> bool:
+        """在一个事务里写入所有缓存的样本，写入失败时样本留在缓存中
+
+        连续 max_attempts 次失败后改为逐条写入，见 BatchWriter。
+
+        :returns: 是否写入成功
+        """
+        with self._write_lock:
+            pending = self._take_pending()
+            if not pending:
+                return True
+            try:
+                if self._failures < self.max_attempts:
+                    self._write(pending)
+                else:
+                    self._write_rows(pending)
+            except Exception as e:
+                # on_flush 抛出的其他异常也不能让后台线程退出、丢失样本
+                self._failures += 1
+                self.log(f"批量写入数据库失败 (连续 {self._failures} 次): {e}")
+                self._put_back(pending)
+                return False
+            self._failures = 0
+            return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._first_added is not None:
+                        if self._count >= self.max_rows:
+                            break
+                        remaining = self._first_added + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+            if not self.flush():
+                # 数据库暂时不可写时等待 max_delay 秒再重试，只有 close() 能打断等待
+                retry_at = time.monotonic() + self.max_delay
+                with self._condition:
+                    while not self._closed:
+                        remaining = retry_at - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+
+    def close(self) -> None:
+        """写入缓存的样本，停止后台线程并关闭数据库"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        if not self.flush():
+            # 最后一次机会，逐条写入能写的样本
+            self._failures = self.max_attempts
+            self.flush()
+        with self._write_lock:
+            self.conn.close()
+        atexit.unregister(self.close)
+
+
+def install_sigterm_handler() -> None:
+    """收到 SIGTERM 时像 Ctrl+C 一样正常退出，以便执行 finally 和 atexit 中的清理
+
+    只在主线程中、且 SIGTERM 还是默认处理方式时安装。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        return
+
+    def handle_sigterm(signum, frame):
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
@@ -1,7 +1,8 @@
 from datetime import datetime
 import time
-import sqlite3
-from w1thermsensor import W1ThermSensor#模块在https://pypi.org/project/w1thermsensor/
+from samples import INSERT_SAMPLE, setup_channels, update_rollups_on_flush
+from sqlite_writer import BatchWriter
+from w1thermsensor import sensor_registry#模块在https://pypi.org/project/w1thermsensor/
 # Raspi VCC (3V3) Pin 1 -----------------------------   VCC    DS18B20
 #                                                |
 #                                                |
@@ -35,21 +36,20 @@ from w1thermsensor import W1ThermSensor#模块在https://pypi.org/project/w1ther
 #28-01226304075d传感器的id号
 #获取ds18b20的温度值，将温度值每隔30秒插入到数据库temp_ds.dbo中
 #将ds18b20的数据线插入到树莓派的GPIO4引脚上，该程序可以运行
-def read_temperature():
-    # 获取 DS18B20 传感器列表
-    sensors = W1ThermSensor.get_available_sensors()
-    
-    if sensors:
-        # 获取第一个传感器的温度
-        temperature_in_celsius = sensors[0].get_temperature()
-        return temperature_in_celsius
-    else:
+def wait_for_sensor(retry_seconds=5):
+    # 获取第一个 DS18B20 传感器，未接好时每隔几秒重试
+    while True:
+        sensors = sensor_registry.get_sensors()
+        if sensors:
+            return sensors[0]
         print("未找到 DS18B20 传感器")
+        time.sleep(retry_seconds)
 if __name__ == "__main__":
    
-    mydb=sqlite3.connect('temp_ds.db')
-   
-    mycur = mydb.cursor()
+    # 样本先缓存，每 20 条或每 10 分钟批量写入一次并更新汇总表，程序退出时写入剩余的样本
+    writer = BatchWriter('temp_ds.db', max_rows=20, max_delay=600, on_flush=update_rollups_on_flush)
+    # 同时写入按 UTC 时间戳索引的样本表，旧表 temp_list 的数据用 migrate_db.py 迁移
+    channel_id = setup_channels('temp_ds.db', ['temp_list.temp'])['temp_list.temp']
     total_runtime_hours = 72
     total_runtime_seconds = total_runtime_hours * 60 * 60
 
@@ -58,16 +58,22 @@ if __name__ == "__main__":
 
 
     
-    while True:
-        temperature = read_temperature()
-        query = "INSERT INTO temp_list (temp) VALUES (?); "
-        mycur.execute(query, (temperature,))
-        mydb.commit()
+    # 按单调时钟的固定节拍采样，读取和写库的耗时不会累积成时间漂移
+    sensor = wait_for_sensor()
+    for reading in sensor.stream(interval_seconds):
+        if not reading.ok:
+            print(f"读取温度失败: {reading.error}")
+            continue
+        if reading.missed:
+            print(f"错过了 {reading.missed} 次采样")
+        temperature = reading.temperatures[0]
         # 获取当前时间
-        current_time = datetime.now()
+        current_time = datetime.fromtimestamp(reading.timestamp)
 
         # 将时间对象格式化为字符串
         formatted_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
+        # 批量写入时要写明采样时间，不能用插入时的默认时间
+        query = "INSERT INTO temp_list (temp, date) VALUES (?, ?); "
+        writer.add(query, (temperature, formatted_time))
+        writer.add(INSERT_SAMPLE, (channel_id, int(reading.timestamp), temperature))
         print(f"当前温度: {temperature:.2f} 摄氏度 "+formatted_time)
-        time.sleep(interval_seconds)
-    
@@ -1,26 +1,27 @@
 import time
-import sqlite3
-from w1thermsensor import W1ThermSensor#模块在https://pypi.org/project/w1thermsensor/
+from datetime import datetime
+from samples import INSERT_SAMPLE, setup_channels, update_rollups_on_flush
+from sqlite_writer import BatchWriter
+from w1thermsensor import sensor_registry#模块在https://pypi.org/project/w1thermsensor/
 import socket
 
 #获取ds18b20的温度值，将温度值每隔30秒插入到数据库temp_ds.dbo中
 #导入socket,等待数据请求，当客户端请求时，将温度数值传输到客户端
-def read_temperature():
-    # 获取 DS18B20 传感器列表
-    sensors = W1ThermSensor.get_available_sensors()
-    
-    if sensors:
-        # 获取第一个传感器的温度
-        temperature_in_celsius = sensors[0].get_temperature()
-        return temperature_in_celsius
-    else:
+def wait_for_sensor(retry_seconds=5):
+    # 获取第一个 DS18B20 传感器，未接好时每隔几秒重试
+    while True:
+        sensors = sensor_registry.get_sensors()
+        if sensors:
+            return sensors[0]
         print("未找到 DS18B20 传感器")
+        time.sleep(retry_seconds)
 if __name__ == "__main__":
     # 设置 GPIO 编号
     # W1ThermSensor.set_default_gpio(17)  # 使用 GPIO17
-    mydb=sqlite3.connect('temp_ds.db')
-   
-    mycur = mydb.cursor()
+    # 样本先缓存，每 20 条或每 10 分钟批量写入一次并更新汇总表，程序退出时写入剩余的样本
+    writer = BatchWriter('temp_ds.db', max_rows=20, max_delay=600, on_flush=update_rollups_on_flush)
+    # 同时写入按 UTC 时间戳索引的样本表，旧表 temp_list 的数据用 migrate_db.py 迁移
+    channel_id = setup_channels('temp_ds.db', ['temp_list.temp'])['temp_list.temp']
     total_runtime_hours = 72
     total_runtime_seconds = total_runtime_hours * 60 * 60
     # 创建一个TCP/IP套接字
@@ -39,24 +40,32 @@ if __name__ == "__main__":
     # 设置每次运行间隔为 30 秒
     interval_seconds = 30
     try:
-        while True:
-            # 模拟温度数据
-            temperature = read_temperature()
+        # 按单调时钟的固定节拍采样，发送和写库的耗时不会累积成时间漂移
+        sensor = wait_for_sensor()
+        for reading in sensor.stream(interval_seconds):
+            if not reading.ok:
+                print(f"读取温度失败: {reading.error}")
+                continue
+            if reading.missed:
+                print(f"错过了 {reading.missed} 次采样")
+            temperature = reading.temperatures[0]
 
             # 将温度数据转换为字节并发送
             connection.sendall(str(temperature).encode('utf-8'))
             
-            query = "INSERT INTO temp_list (temp) VALUES (?); "
-            mycur.execute(query, (temperature,))
-            mydb.commit()
+            # 批量写入时要写明采样时间，不能用插入时的默认时间
+            formatted_time = datetime.fromtimestamp(reading.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            query = "INSERT INTO temp_list (temp, date) VALUES (?, ?); "
+            writer.add(query, (temperature, formatted_time))
+            writer.add(INSERT_SAMPLE, (channel_id, int(reading.timestamp), temperature))
             print(f"当前温度: {temperature:.2f} 摄氏度 ")
-            time.sleep(interval_seconds)
            
 
     finally:
         # 清理连接
         connection.close()
         server_socket.close()
+        writer.close()
     
     
 
@@ -4,6 +4,8 @@
 自动记录温度与空气质量(TVOC/CH2O/CO2)到 SQLite 数据库。
 支持断线重连、错误日志、防崩溃循环。
 每 1 小时采样一次。
+数据库使用 WAL 模式，由 BatchWriter 在后台写入，程序退出时写入缓存的样本。
+同时写入按 UTC 时间戳索引的样本表 samples，旧数据用 migrate_db.py 迁移。
 """
 
 import os
@@ -11,7 +13,9 @@ import time
 import sqlite3
 import serial
 from datetime import datetime
-from w1thermsensor import W1ThermSensor
+from samples import INSERT_SAMPLE, setup_channels, update_rollups_on_flush
+from sqlite_writer import BatchWriter
+from w1thermsensor import sensor_registry
 
 # === 配置区 ===
 SERIAL_PORT = '/dev/serial0'
@@ -19,6 +23,8 @@ BAUD_RATE = 9600
 DATA_FRAME_LENGTH = 9
 DB_PATH = '/home/fengweipi/Rpi_project/ds18b20/temperature/temp_ds.db'
 TABLE_NAME = 'tempanvoc'
+# 写入样本表的列，通道名为 表名.列名
+SAMPLE_COLUMNS = ('temp', 'ch2o', 'tvoc', 'co2')
 INTERVAL_SECONDS = 3600   # 每小时记录一次
 LOG_FILE = '/home/fengweipi/Rpi_project/ds18b20/temperature/tempandvoc.log'
 
@@ -70,7 +76,7 @@ def read_tvoc_sensor(ser):
 def read_temperature():
     """读取 DS18B20 温度"""
     try:
-        sensors = W1ThermSensor.get_available_sensors()
+        sensors = sensor_registry.get_sensors()
         if not sensors:
             return None
         return sensors[0].get_temperature()
@@ -80,7 +86,7 @@ def read_temperature():
 
 
 def setup_database():
-    """确保数据库和表存在"""
+    """确保数据库和表存在，返回批量写入器和各列的通道 id"""
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
     cur.execute(f"""
@@ -94,7 +100,10 @@ def setup_database():
         )
     """)
     conn.commit()
-    return conn, cur
+    conn.close()
+    channels = setup_channels(DB_PATH, [f"{TABLE_NAME}.{column}" for column in SAMPLE_COLUMNS])
+    # 每小时只有一个样本，最多缓存 60 秒，断电时不会丢失已记录的样本
+    return BatchWriter(DB_PATH, max_delay=60, log=log, on_flush=update_rollups_on_flush), channels
 
 
 def open_serial():
@@ -110,12 +119,13 @@ def open_serial():
 
 def main():
     log("==== 启动温度与空气质量记录程序 ====")
-    conn, cur = setup_database()
+    writer, channels = setup_database()
     ser = open_serial()
 
     while True:
         try:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            sampled = time.time()
+            now = datetime.fromtimestamp(sampled).strftime("%Y-%m-%d %H:%M:%S")
             temp = read_temperature()
             air = read_tvoc_sensor(ser)
 
@@ -125,18 +135,22 @@ def main():
                 ch2o = air['CH2O'] if air else None
                 tvoc = air['TVOC'] if air else None
                 co2 = air['CO2'] if air else None
-                cur.execute(f"""
+                writer.add(f"""
                     INSERT INTO {TABLE_NAME} (timestamp, temp, ch2o, tvoc, co2)
                     VALUES (?, ?, ?, ?, ?)
                 """, (now, temp, ch2o, tvoc, co2))
-                conn.commit()
-                log(f"写入成功 | T={temp:.2f}°C | CH2O={ch2o:.3f} | TVOC={tvoc:.3f} | CO2={co2:.3f}")
-
-        except (sqlite3.Error, serial.SerialException) as e:
-            log(f"数据库或串口错误: {e}")
+                values = {'temp': temp, 'ch2o': ch2o, 'tvoc': tvoc, 'co2': co2}
+                for column, value in values.items():
+                    if value is not None:
+                        writer.add(INSERT_SAMPLE, (channels[f"{TABLE_NAME}.{column}"], int(sampled), value))
+                log(f"记录成功 | T={temp:.2f}°C | CH2O={ch2o:.3f} | TVOC={tvoc:.3f} | CO2={co2:.3f}")
+
+        # 写库由 BatchWriter 的后台线程完成，写入失败时它用 log 记录并自行重试，
+        # writer.add 不会抛出数据库错误
+        except serial.SerialException as e:
+            log(f"串口错误: {e}")
             time.sleep(5)
             ser = open_serial()
-            conn, cur = setup_database()
         except Exception as e:
             log(f"未知错误: {e}")
             ser = open_serial()
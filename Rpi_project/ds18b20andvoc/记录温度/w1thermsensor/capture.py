@@ -0,0 +1,297 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import mmap
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Union
+
+from w1thermsensor.errors import W1ThermSensorError
+from w1thermsensor.sensors import Sensor
+from w1thermsensor.simulation import SimulatedBus, SimulatedSensor
+
+if TYPE_CHECKING:  # pragma: no cover
+    from w1thermsensor.core import W1ThermSensor
+
+#: Holds the header of a capture file: magic, format version and record size
+HEADER = struct.Struct("<5sBH")
+MAGIC = b"W1CAP"
+VERSION = 1
+
+#: Holds a record of a capture file: timestamp, family code, id, scratchpad and CRC flag
+RECORD = struct.Struct("<dB6s9sB")
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    """
+    Represents a single captured read of a sensor scratchpad.
+    """
+
+    timestamp: float
+    sensor_type: Sensor
+    sensor_id: str
+    scratchpad: bytes
+    crc_ok: bool
+
+    def pack(self) -> bytes:
+        """Returns the binary record of this capture"""
+        return RECORD.pack(
+            self.timestamp,
+            self.sensor_type.value,
+            bytes.fromhex(self.sensor_id),
+            self.scratchpad,
+            self.crc_ok,
+        )
+
+    @classmethod
+    def unpack(cls, timestamp, family, sensor_id, scratchpad, crc_ok) -> "CaptureRecord":
+        """Creates a CaptureRecord from the fields of a binary record"""
+        return cls(timestamp, Sensor(family), sensor_id.hex(), scratchpad, bool(crc_ok))
+
+
+class CaptureRecorder:
+    """
+    Appends the raw scratchpad of every ``w1_slave`` read to a capture file.
+
+    Each read is stored as a fixed-width record of 25 bytes, so the file
+    can be memory-mapped and a reading every 10 minutes takes about
+    1.3 MB per sensor and year. Reads which failed the CRC check are
+    captured as well, since they are the interesting ones to replay.
+
+    Examples:
+        Capture the reads of all sensors
+
+        >>> W1ThermSensor.recorder = CaptureRecorder("sensors.w1cap")
+
+        Capture the reads of a single sensor
+
+        >>> sensor = W1ThermSensor()
+        >>> sensor.recorder = CaptureRecorder("sensor.w1cap")
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Initializes a CaptureRecorder appending to the given file.
+
+        :param path: the capture file. It is created if it does not exist.
+
+        :raises W1ThermSensorError: if the file is no capture file
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = self.path.open("ab")
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self._file.flush()
+        else:
+            try:
+                check_header(self.path)
+            except W1ThermSensorError:
+                self._file.close()
+                raise
+
+    def __enter__(self) -> "CaptureRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Writes the pending records and closes the capture file"""
+        with self._lock:
+            self._file.close()
+
+    def flush(self) -> None:
+        """Writes the pending records to the capture file"""
+        with self._lock:
+            self._file.flush()
+
+    def record(self, record: CaptureRecord) -> None:
+        """Appends the given record to the capture file
+
+        The record is flushed right away, so a process which is killed
+        loses no captured reads.
+        """
+        data = record.pack()
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+
+    def record_dump(
+        self, sensor: "W1ThermSensor", lines: List[str], timestamp: Optional[float] = None
+    ) -> None:
+        """Appends the scratchpad of the given ``w1_slave`` dump to the capture file
+
+        Dumps without a readable scratchpad are not captured.
+
+        :param sensor: the sensor the dump was read from.
+        :param list lines: the lines of the ``w1_slave`` dump.
+        :param float timestamp: the time of the read. Defaults to now.
+        """
+        try:
+            scratchpad = bytes.fromhex(lines[0][:26])
+        except (IndexError, ValueError):
+            return
+
+        if len(scratchpad) != 9:
+            return
+
+        self.record(
+            CaptureRecord(
+                time.time() if timestamp is None else timestamp,
+                sensor.type,
+                sensor.id,
+                scratchpad,
+                lines[0].rstrip().endswith("YES"),
+            )
+        )
+
+
+def check_header(path: Union[str, Path]) -> None:
+    """Checks that the given file is a capture file of a supported version
+
+    :raises W1ThermSensorError: if the file is no capture file
+    """
+    with Path(path).open("rb") as f:
+        header = f.read(HEADER.size)
+
+    if len(header) != HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, RECORD.size):
+        raise W1ThermSensorError("{0} is no supported capture file".format(path))
+
+
+def read_records(path: Union[str, Path]) -> Iterator[CaptureRecord]:
+    """Yields the records of the given capture file
+
+    The file is memory-mapped, a partially written last record is skipped.
+
+    :param path: the capture file.
+
+    :raises W1ThermSensorError: if the file is no capture file
+    """
+    check_header(path)
+    with Path(path).open("rb") as f:
+        size = f.seek(0, 2)
+        end = size - (size - HEADER.size) % RECORD.size
+        if end <= HEADER.size:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            with memoryview(data) as view:
+                for fields in RECORD.iter_unpack(view[HEADER.size:end]):
+                    yield CaptureRecord.unpack(*fields)
+
+
+def map_records(path: Union[str, Path]):
+    """Maps the records of the given capture file into a numpy record array
+
+    Note: numpy is required to map capture files.
+
+    :param path: the capture file.
+
+    :returns: the records with the fields ``timestamp``, ``family``, ``id``,
+              ``scratchpad`` and ``crc_ok``
+    :rtype: numpy.memmap
+
+    :raises W1ThermSensorError: if numpy is not installed or the file is no capture file
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise W1ThermSensorError(
+            "Install numpy to map capture files: pip install numpy"
+        )
+
+    check_header(path)
+    dtype = np.dtype([
+        ("timestamp", "<f8"),
+        ("family", "u1"),
+        ("id", "u1", (6,)),
+        ("scratchpad", "u1", (9,)),
+        ("crc_ok", "u1"),
+    ])
+    records = (Path(path).stat().st_size - HEADER.size) // RECORD.size
+    if not records:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(records,))
+
+
+class ReplayBus(SimulatedBus):
+    """
+    Replays a capture file as a simulated w1 bus.
+
+    Every sensor of the capture appears on the bus and each read of its
+    ``w1_slave`` file returns its next captured scratchpad, including the
+    reads which failed the CRC check. Once all records of a sensor are
+    replayed the sensor disappears from the bus, unless ``loop`` is set.
+
+    With a ``speed`` the reads are delayed to keep the captured timing,
+    e.g. a speed of 60 replays an hour in a minute. Without a speed the
+    records are replayed as fast as they are read.
+
+    Examples:
+        Replay a capture through W1ThermSensor
+
+        >>> bus = ReplayBus("sensors.w1cap")
+        >>> sensor = W1ThermSensor(base_directory=bus.root)
+        >>> sensor.get_temperature()
+    """
+
+    def __init__(
+        self, path: Union[str, Path], speed: Optional[float] = None, loop: bool = False
+    ) -> None:
+        """Initializes a ReplayBus.
+
+        :param path: the capture file to replay.
+        :param float speed: the factor the captured timing is sped up by.
+                            If speed is None the records are replayed without delay.
+        :param bool loop: if the records of a sensor start over once all are replayed.
+
+        :raises W1ThermSensorError: if the file is no capture file
+        """
+        super().__init__(sensors=0, time_scale=0, temperature_file=False, bulk_read=False)
+        self.speed = speed
+        self.loop = loop
+        self.records: Dict[str, List[CaptureRecord]] = {}
+        self._positions: Dict[str, int] = {}
+        self._origin: Optional[float] = None
+        self._started: Optional[float] = None
+
+        for record in read_records(path):
+            sensor = SimulatedSensor(record.sensor_type, record.sensor_id)
+            self.records.setdefault(sensor.name, []).append(record)
+            if self._origin is None:
+                self._origin = record.timestamp
+        for name, records in self.records.items():
+            self.add_sensor(records[0].sensor_type, records[0].sensor_id)
+            self._positions[name] = 0
+
+    def _next_record(self, sensor: SimulatedSensor) -> CaptureRecord:
+        with self._lock:
+            records = self.records[sensor.name]
+            position = self._positions[sensor.name]
+            if position >= len(records) and self.loop:
+                position = 0
+            if position >= len(records):
+                self.sensors.pop(sensor.name, None)
+                raise FileNotFoundError("No captured reads left for {0}".format(sensor.name))
+            self._positions[sensor.name] = position + 1
+            if self._started is None:
+                self._started = time.monotonic()
+            return records[position]
+
+    def _read_w1_slave(self, sensor: SimulatedSensor) -> str:
+        record = self._next_record(sensor)
+        if self.speed:
+            due = self._started + (record.timestamp - self._origin) / self.speed  # type: ignore
+            time.sleep(max(0.0, due - time.monotonic()))
+        return self.format_w1_slave(sensor, record.scratchpad, record.crc_ok)
@@ -8,12 +8,16 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
+import csv
 import json
+import time
 from itertools import count
 
 import click
 
 from w1thermsensor.core import Sensor, Unit, W1ThermSensor
+from w1thermsensor.registry import sensor_registry
+from w1thermsensor.schedule import TickSchedule
 
 #: major click version to compensate API changes
 CLICK_MAJOR_VERSION = int(click.__version__.split(".")[0])
@@ -137,22 +141,66 @@ def ls(types, as_json, resolution):  # pylint: disable=invalid-name
 @click.option(
     "-j", "--json", "as_json", flag_value=True, help="Output result in JSON format"
 )
-def all(types, unit, resolution, as_json):  # pylint: disable=redefined-builtin
-    """Get temperatures of all available sensors"""
+@click.option(
+    "-p",
+    "--parallel",
+    default=W1ThermSensor.MAX_CONCURRENT_READS,
+    type=click.IntRange(min=1),
+    help="The number of sensors read concurrently. Defaults to {0}".format(
+        W1ThermSensor.MAX_CONCURRENT_READS
+    ),
+)
+@click.option(
+    "-b",
+    "--bulk",
+    is_flag=True,
+    help="Start the conversion of all sensors with a single bus-wide command",
+)
+@click.option(
+    "-e",
+    "--elapsed",
+    "with_elapsed",
+    is_flag=True,
+    help="Report the time it took to read all sensors in seconds",
+)
+def all(  # pylint: disable=redefined-builtin
+    types, unit, resolution, as_json, parallel, bulk, with_elapsed
+):
+    """Get temperatures of all available sensors
+
+    With --elapsed the JSON output is an object with the list of sensors
+    as "readings" and the time it took to read them in seconds as "elapsed".
+    """
+    started = time.monotonic()
     sensors = W1ThermSensor.get_available_sensors(types)
-    temperatures = []
-    for sensor in sensors:
-        if resolution:
+    if resolution:
+        for sensor in sensors:
             sensor.set_resolution(resolution, persist=False)
 
-        temperatures.append(sensor.get_temperature(unit))
+    readings = W1ThermSensor.read_many(sensors, unit, max_workers=parallel, bulk=bulk)
+    elapsed = time.monotonic() - started
+    for reading in readings:
+        if not reading.ok:
+            raise reading.error  # type: ignore
+    temperatures = [reading.temperature for reading in readings]
 
     if as_json:
         data = [
-            {"id": i, "hwid": s.id, "type": s.name, "temperature": t, "unit": unit}
+            {
+                "id": i,
+                "hwid": s.id,
+                "type": s.name,
+                "temperature": t,
+                "unit": unit,
+            }
             for i, s, t in zip(count(start=1), sensors, temperatures)
         ]
-        click.echo(json.dumps(data, indent=4, sort_keys=True))
+        if with_elapsed:
+            click.echo(
+                json.dumps({"readings": data, "elapsed": elapsed}, indent=4, sort_keys=True)
+            )
+        else:
+            click.echo(json.dumps(data, indent=4, sort_keys=True))
     else:
         click.echo(
             "Got temperatures of {0} sensors:".format(
@@ -168,6 +216,12 @@ def all(types, unit, resolution, as_json):  # pylint: disable=redefined-builtin
                     click.style(unit, bold=True),
                 )
             )
+        if with_elapsed:
+            click.echo(
+                "Read all sensors in {0} seconds".format(
+                    click.style("{0:.2f}".format(elapsed), bold=True)
+                )
+            )
 
 
 @cli.command()
@@ -288,3 +342,138 @@ def resolution(resolution, id_, hwid, type_):
         sensor = W1ThermSensor(type_, hwid)
 
     sensor.set_resolution(resolution, persist=True)
+
+
+@cli.command()
+@click.option(
+    "-t",
+    "--type",
+    "types",
+    multiple=True,
+    type=click.Choice([s.name for s in Sensor]),
+    callback=resolve_type_name,
+    help="Watch only sensors of this type",
+)
+@click.option(
+    "-u",
+    "--unit",
+    default="celsius",
+    type=click.Choice([u.value for u in Unit]),
+    help="The unit of the temperature. Defaults to Celsius",
+)
+@click.option(
+    "-i",
+    "--interval",
+    default=5.0,
+    type=click.FloatRange(min=0.01),
+    help="The time in seconds between two sweeps. Defaults to 5 seconds",
+)
+@click.option(
+    "-n",
+    "--count",
+    "max_sweeps",
+    type=click.IntRange(min=1),
+    help="Stop after this number of sweeps. Defaults to watch forever",
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    default="ndjson",
+    type=click.Choice(["ndjson", "csv"]),
+    help="The output format. Defaults to one JSON object per line",
+)
+@click.option(
+    "-p",
+    "--parallel",
+    type=click.IntRange(min=1),
+    help="The number of sensors read concurrently. Defaults to {0}".format(
+        W1ThermSensor.MAX_CONCURRENT_READS
+    ),
+)
+@click.option(
+    "--flush/--no-flush",
+    default=True,
+    help="Flush the output after every sweep. Enabled by default",
+)
+def watch(types, unit, interval, max_sweeps, format_, parallel, flush):
+    """Continuously get temperatures of all available sensors
+
+    Every sweep reads all sensors concurrently and writes one line per
+    sensor to stdout. The latency of each sweep is written to stderr.
+    """
+    stdout = click.get_text_stream("stdout")
+    fields = ["timestamp", "hwid", "type", "temperature", "unit", "error"]
+    if format_ == "csv":
+        writer = csv.DictWriter(stdout, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            stdout.write(json.dumps(record, sort_keys=True) + "\n")
+
+    schedule = TickSchedule(interval)
+    # skipped ticks do not count as sweeps, they are only reported as missed
+    sweeps = 0
+    try:
+        while max_sweeps is None or sweeps < max_sweeps:
+            time.sleep(schedule.start())
+            started = time.monotonic()
+            timestamp = time.time()
+            readings = W1ThermSensor.read_many(
+                sensor_registry.get_sensors(types), unit, max_workers=parallel
+            )
+            duration = time.monotonic() - started
+
+            for reading in readings:
+                write({
+                    "timestamp": timestamp,
+                    "hwid": reading.sensor.id,
+                    "type": reading.sensor.name,
+                    "temperature": reading.temperature,
+                    "unit": unit,
+                    "error": None if reading.ok else str(reading.error),
+                })
+            if flush:
+                stdout.flush()
+
+            click.echo(
+                "Sweep {0}: read {1} sensors in {2:.1f} ms{3}".format(
+                    sweeps,
+                    len(readings),
+                    duration * 1e3,
+                    ", missed {0} sweeps".format(schedule.missed) if schedule.missed else "",
+                ),
+                err=True,
+            )
+            schedule.complete(duration)
+            sweeps += 1
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+
+
+@cli.command()
+@click.argument("names", nargs=-1, metavar="[NAME]...")
+def bench(names):
+    """Benchmark this package and output the results in JSON format
+
+    \b
+    Available benchmarks are:
+      - decode
+      - decode_many
+      - units
+      - discovery
+      - read
+      - sweep
+      - async
+      - import
+    """
+    from w1thermsensor.benchmark import BENCHMARKS, report
+
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise click.BadArgumentUsage(
+            "Unknown benchmarks: {0}".format(", ".join(sorted(unknown)))
+        )
+
+    click.echo(json.dumps(report(names), indent=4, sort_keys=True))
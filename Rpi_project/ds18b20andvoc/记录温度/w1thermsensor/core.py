@@ -8,24 +8,30 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
-import subprocess
+import os
 import time
-from functools import lru_cache
+import warnings
 from pathlib import Path
-from typing import Iterable, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Union
 
-from w1thermsensor.calibration_data import CalibrationData
+from w1thermsensor.calibration_data import BaseCalibrationData
+from w1thermsensor.decoder import TemperatureDecoder
 from w1thermsensor.errors import (
     InvalidCalibrationDataError,
     NoSensorFoundError,
-    ResetValueError,
     SensorNotReadyError,
     UnsupportedSensorError,
     W1ThermSensorError
 )
+from w1thermsensor.rawfile import RawFile
+from w1thermsensor.reading import SensorReading, StreamReading
+from w1thermsensor.schedule import TickSchedule
 from w1thermsensor.sensors import Sensor
 from w1thermsensor.units import Unit
 
+if TYPE_CHECKING:  # pragma: no cover
+    from w1thermsensor.capture import CaptureRecorder
+
 
 class W1ThermSensor:
     """
@@ -54,6 +60,24 @@ class W1ThermSensor:
 
         >>> sensor.get_temperature(Unit.DEGREES_F)
 
+        Keep the sysfs files of a sensor open for frequent readings
+
+        >>> with W1ThermSensor(keep_open=True) as sensor:
+        ...     sensor.get_temperature()
+
+        Read all available sensors concurrently
+
+        >>> W1ThermSensor.read_all()
+
+        Read all available sensors after a single bus-wide conversion
+
+        >>> W1ThermSensor.read_all(bulk=True)
+
+        Read a sensor every 30 seconds
+
+        >>> for reading in sensor.stream(30):
+        ...     print(reading.timestamp, reading.temperatures)
+
     Supported sensors are:
         * DS18S20
         * DS1822
@@ -72,6 +96,9 @@ class W1ThermSensor:
     #  sensor devices on the system provided by the kernel modules
     BASE_DIRECTORY = Path("/sys/bus/w1/devices")
     SLAVE_FILE = "w1_slave"
+    TEMPERATURE_FILE = "temperature"
+    BUS_MASTER_PATTERN = "w1_bus_master*"
+    BULK_READ_FILE = "therm_bulk_read"
 
     #: Holds the sensor reset value in Degrees Celsius
     SENSOR_RESET_VALUE = 85.0
@@ -79,18 +106,60 @@ class W1ThermSensor:
     #: Holds the factor to convert the raw sensor value to Degrees Celsius
     RAW_VALUE_TO_DEGREE_CELSIUS_FACTOR = 1e-3
 
+    #: Holds if the ``temperature`` attribute of newer kernels should be read
+    #  instead of parsing the ``w1_slave`` dump, if the kernel provides it
+    PREFER_TEMPERATURE_FILE = True
+
+    #: Holds the recorder capturing the scratchpad of every read, if any.
+    #  While a recorder is set the ``w1_slave`` dump is always read.
+    recorder: Optional["CaptureRecorder"] = None
+
     #: Holds settings for patient retries used to access the sensors
     RETRY_ATTEMPTS = 10
     RETRY_DELAY_SECONDS = 1.0 / RETRY_ATTEMPTS
 
+    #: Holds the upper bound of worker threads used to read multiple sensors concurrently
+    MAX_CONCURRENT_READS = 8
+
+    #: Holds the time a 12 bit temperature conversion takes at most
+    CONVERSION_TIME_SECONDS = 0.75
+
+    #: Holds the interval in which the bus masters are polled for a finished bulk conversion
+    BULK_READ_POLL_SECONDS = 0.01
+
+    #: Holds the size of the buffer the sysfs files are read into if they are kept open
+    READ_BUFFER_SIZE = 256
+
+    @classmethod
+    def get_base_directory(cls, base_directory: Optional[Path] = None) -> Path:
+        """Return the given base directory or the default ``BASE_DIRECTORY``.
+
+        The needed kernel modules are loaded before the default
+        base directory is returned for the first time.
+
+        :raises KernelModuleLoadError: if the w1 therm kernel modules could not
+                                       be loaded correctly
+        """
+        if base_directory is not None:
+            return base_directory
+
+        from w1thermsensor.kernel import ensure_kernel_modules
+
+        ensure_kernel_modules()
+        return cls.BASE_DIRECTORY
+
     @classmethod
     def get_available_sensors(
-        cls, types: Optional[Iterable[Union[Sensor, str]]] = None
+        cls,
+        types: Optional[Iterable[Union[Sensor, str]]] = None,
+        base_directory: Optional[Path] = None,
     ) -> List["W1ThermSensor"]:
         """Return all available sensors.
 
         :param list types: the type of the sensor to look for.
                            If types is None it will search for all available types.
+        :param base_directory: the directory to look for sensors in.
+                               Defaults to ``BASE_DIRECTORY``.
 
         :returns: a list of sensor instances.
         :rtype: list
@@ -109,18 +178,199 @@ class W1ThermSensor:
             return any(dir_name.startswith(hex(x.value)[2:]) for x in types)
 
         return [
-            cls(Sensor.from_id_string(s.name[:2]), s.name[3:])
-            for s in cls.BASE_DIRECTORY.iterdir()
+            cls(
+                Sensor.from_id_string(s.name[:2]),
+                s.name[3:],
+                base_directory=base_directory,
+            )
+            for s in cls.get_base_directory(base_directory).iterdir()
             if is_sensor(s.name)
         ]
 
+    @classmethod
+    def get_bulk_read_paths(cls, base_directory: Optional[Path] = None) -> List[Path]:
+        """Return the bulk read trigger files of all available bus masters.
+
+        Note: The bulk read trigger is supported since kernel 5.10.
+
+        :param base_directory: the directory to look for bus masters in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: a list of paths to the ``therm_bulk_read`` files.
+        :rtype: list
+        """
+        return sorted(
+            master / cls.BULK_READ_FILE
+            for master in cls.get_base_directory(base_directory).glob(
+                cls.BUS_MASTER_PATTERN)
+            if (master / cls.BULK_READ_FILE).exists()
+        )
+
+    @classmethod
+    def trigger_bulk_conversion(
+        cls, timeout: Optional[float] = None, base_directory: Optional[Path] = None
+    ) -> bool:
+        """Start a temperature conversion on all sensors of all bus masters at once.
+
+        The conversion is started with a single command per bus and this function
+        waits until every bus reports it as finished. Afterwards every sensor
+        returns the converted temperature without starting a conversion of its own.
+
+        Note: root permissions are required to trigger a bulk conversion.
+
+        :param float timeout: the maximum time in seconds to wait for the conversion.
+                              Defaults to twice ``CONVERSION_TIME_SECONDS``.
+        :param base_directory: the directory to look for bus masters in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: if a bulk conversion was triggered. ``False`` if no bus
+                  master supports bulk conversions.
+        :rtype: bool
+
+        :raises W1ThermSensorError: if the conversion could not be triggered or
+                                    did not finish in time
+        """
+        paths = cls.get_bulk_read_paths(base_directory)
+        if not paths:
+            return False
+
+        for path in paths:
+            try:
+                path.write_text("trigger\n")
+            except OSError:
+                raise W1ThermSensorError(
+                    "Failed to trigger bulk conversion on {0}. "
+                    "You might have to be root to trigger a bulk conversion".format(
+                        path.parent.name)
+                )
+
+        if timeout is None:
+            timeout = 2 * cls.CONVERSION_TIME_SECONDS
+        deadline = time.monotonic() + timeout
+        # the bus master reports -1 as long as a conversion is in progress
+        while True:
+            pending = []
+            for path in paths:
+                try:
+                    state = path.read_text().strip()
+                except OSError as exc:
+                    raise W1ThermSensorError(
+                        "Failed to read the bulk conversion state of {0}".format(
+                            path.parent.name)
+                    ) from exc
+                if state == "-1":
+                    pending.append(path)
+            paths = pending
+            if not paths:
+                return True
+            if time.monotonic() >= deadline:
+                raise W1ThermSensorError(
+                    "Bulk conversion on {0} did not finish within {1} seconds".format(
+                        ", ".join(p.parent.name for p in paths), timeout)
+                )
+            time.sleep(cls.BULK_READ_POLL_SECONDS)
+
+    @classmethod
+    def try_bulk_conversion(cls, base_directory: Optional[Path] = None) -> bool:
+        """Trigger a bulk conversion like ``trigger_bulk_conversion`` but do not fail.
+
+        If the conversion could not be triggered or did not finish in time
+        a ``RuntimeWarning`` is issued instead. Every sensor then does its
+        own conversion when it is read.
+
+        :param base_directory: the directory to look for bus masters in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: if a bulk conversion was done.
+        :rtype: bool
+        """
+        try:
+            return cls.trigger_bulk_conversion(base_directory=base_directory)
+        except W1ThermSensorError as exc:
+            warnings.warn(
+                "{0}. Falling back to a conversion per sensor".format(exc), RuntimeWarning)
+            return False
+
+    @classmethod
+    def read_many(
+        cls,
+        sensors: Iterable["W1ThermSensor"],
+        unit: Unit = Unit.DEGREES_C,
+        max_workers: Optional[int] = None,
+        bulk: bool = False,
+    ) -> List[SensorReading]:
+        """Read the temperature of multiple sensors concurrently.
+
+        Every sensor blocks for its whole conversion time when it is read.
+        Reading the sensors from a bounded pool of worker threads lets these
+        conversions overlap, so a sweep over all sensors costs roughly one
+        conversion time instead of one per sensor.
+
+        If ``bulk`` is set a single bus-wide conversion is triggered first,
+        see ``try_bulk_conversion``. If no bus master supports it or the
+        conversion fails, every sensor does its own conversion as usual.
+
+        :param list sensors: the sensors to read.
+        :param int unit: the unit of the temperatures requested.
+        :param int max_workers: the maximum number of concurrent reads.
+                                Defaults to ``MAX_CONCURRENT_READS``.
+        :param bool bulk: if a bulk conversion should be used.
+
+        :returns: a reading for each sensor in the order of the given sensors.
+                  Sensors which failed to read carry the error instead of a temperature.
+        :rtype: list
+        """
+        sensors = list(sensors)
+        if not sensors:
+            return []
+
+        if bulk:
+            for base_directory in {s.base_directory for s in sensors}:
+                cls.try_bulk_conversion(base_directory)
+
+        # imported on use, it takes longer to import than the rest of this module
+        from concurrent.futures import ThreadPoolExecutor
+
+        workers = min(len(sensors), max_workers or cls.MAX_CONCURRENT_READS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda s: s.get_reading(unit), sensors))
+
+    @classmethod
+    def read_all(
+        cls,
+        types: Optional[Iterable[Union[Sensor, str]]] = None,
+        unit: Unit = Unit.DEGREES_C,
+        max_workers: Optional[int] = None,
+        bulk: bool = False,
+        base_directory: Optional[Path] = None,
+    ) -> List[SensorReading]:
+        """Read the temperature of all available sensors concurrently.
+
+        See ``read_many`` for details.
+
+        :param list types: the type of the sensors to read.
+                           If types is None all available sensors are read.
+        :param int unit: the unit of the temperatures requested.
+        :param int max_workers: the maximum number of concurrent reads.
+        :param bool bulk: if a bulk conversion should be used.
+        :param base_directory: the directory to look for sensors in.
+                               Defaults to ``BASE_DIRECTORY``.
+
+        :returns: a reading for each available sensor.
+        :rtype: list
+        """
+        return cls.read_many(
+            cls.get_available_sensors(types, base_directory), unit, max_workers, bulk)
+
     def __init__(
         self,
         sensor_type: Optional[Sensor] = None,
         sensor_id: Optional[str] = None,
         offset: float = 0.0,
         offset_unit: Unit = Unit.DEGREES_C,
-        calibration_data: Optional[CalibrationData] = None,
+        calibration_data: Optional[BaseCalibrationData] = None,
+        base_directory: Optional[Path] = None,
+        keep_open: bool = False,
     ) -> None:
         """Initializes a W1ThermSensor.
 
@@ -135,12 +385,20 @@ class W1ThermSensor:
         :param float offset: a calibration offset for the temperature sensor readings
                              in the unit of ``offset_unit``.
         :param offset_unit: the unit in which the offset is provided.
+        :param base_directory: the directory to look for the sensor in, e.g. the
+                               ``root`` of a ``SimulatedBus``.
+                               Defaults to ``BASE_DIRECTORY``.
+        :param bool keep_open: if the sysfs files of the sensor are kept open and
+                               re-read for each reading instead of being opened
+                               every time. Use ``close()`` to close them.
 
         :raises KernelModuleLoadError: if the w1 therm kernel modules could not
                                        be loaded correctly
         :raises NoSensorFoundError: if the sensor with the given type and/or id
                                     does not exist or is not connected
         """
+        self.base_directory = self.get_base_directory(base_directory)
+
         if not sensor_type and not sensor_id:
             self._init_with_first_sensor()
         elif not sensor_id and sensor_type:
@@ -152,11 +410,17 @@ class W1ThermSensor:
 
         # store path to sensor
         self.sensorpath = (
-            self.BASE_DIRECTORY / (self.slave_prefix +
+            self.base_directory / (self.slave_prefix +
                                    self.id) / self.SLAVE_FILE
         )
+        self.temperaturepath = self.sensorpath.parent / self.TEMPERATURE_FILE
 
         self.calibration_data = calibration_data
+        self._decoders: Dict[Union[Unit, str], TemperatureDecoder] = {}
+
+        # only files of the real sysfs can be kept open, not simulated ones
+        self.keep_open = keep_open and isinstance(self.sensorpath, Path)
+        self._raw_files: Dict[str, RawFile] = {}
 
         if not self.exists():
             raise NoSensorFoundError(
@@ -164,11 +428,17 @@ class W1ThermSensor:
                     self.name, self.id)
             )
 
+        # kernels since 5.10 provide the temperature in millidegrees,
+        # which saves parsing the whole w1_slave dump on every read.
+        self.use_temperature_file = (
+            self.PREFER_TEMPERATURE_FILE and self.temperaturepath.exists()
+        )
+
         self.set_offset(offset, offset_unit)
 
     def _init_with_first_sensor(self):
         for _ in range(self.RETRY_ATTEMPTS):
-            s = self.get_available_sensors()
+            s = self.get_available_sensors(base_directory=self.base_directory)
             if s:
                 self._init_with_type_and_id(s[0].type, s[0].id)
                 break
@@ -177,7 +447,7 @@ class W1ThermSensor:
             raise NoSensorFoundError("Could not find any sensor")
 
     def _init_with_first_sensor_by_type(self, sensor_type: Sensor) -> None:
-        s = self.get_available_sensors([sensor_type])
+        s = self.get_available_sensors([sensor_type], self.base_directory)
         if not s:
             raise NoSensorFoundError(
                 "Could not find any sensor of type {}".format(sensor_type.name)
@@ -187,7 +457,9 @@ class W1ThermSensor:
 
     def _init_with_first_sensor_by_id(self, sensor_id: str) -> None:
         sensor = next(  # pragma: no cover
-            (s for s in self.get_available_sensors() if s.id == sensor_id), None
+            (s for s in self.get_available_sensors(base_directory=self.base_directory)
+             if s.id == sensor_id),
+            None,
         )
         if not sensor:
             raise NoSensorFoundError(
@@ -220,6 +492,24 @@ class W1ThermSensor:
             self.__class__.__name__, self.type.name, self.type.value, self.id
         )
 
+    def __enter__(self) -> "W1ThermSensor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the sysfs files of this sensor which are kept open"""
+        for raw_file in self._raw_files.values():
+            raw_file.close()
+        self._raw_files.clear()
+
+    def _read_raw_file(self, path: Path) -> bytes:
+        raw_file = self._raw_files.get(path.name)
+        if raw_file is None:
+            raw_file = self._raw_files[path.name] = RawFile(path, self.READ_BUFFER_SIZE)
+        return raw_file.read()
+
     @property
     def name(self) -> str:
         """Returns the type name of this temperature sensor"""
@@ -243,6 +533,10 @@ class W1ThermSensor:
         :raises NoSensorFoundError: if the sensor could not be found
         :raises SensorNotReadyError: if the sensor is not ready yet
         """
+        if self.keep_open:
+            # not self.get_raw_dump(), which is a coroutine for AsyncW1ThermSensor
+            return W1ThermSensor.get_raw_dump(self).decode().splitlines(True)
+
         try:
             with self.sensorpath.open("r") as f:
                 data = f.readlines()
@@ -252,6 +546,9 @@ class W1ThermSensor:
                     self.name, self.id)
             )
 
+        if self.recorder is not None:
+            self.recorder.record_dump(self, data)
+
         if (
             len(data) < 1
             or data[0].strip()[-3:] != "YES"
@@ -261,6 +558,91 @@ class W1ThermSensor:
 
         return data
 
+    def get_raw_dump(self) -> bytes:
+        """Reads the raw ``w1_slave`` dump through the file kept open
+
+        :returns: the bytes of the whole dump
+        :rtype: bytes
+
+        :raises NoSensorFoundError: if the sensor could not be found
+        :raises SensorNotReadyError: if the sensor is not ready yet
+        """
+        try:
+            data = self._read_raw_file(self.sensorpath)
+        except IOError:
+            raise NoSensorFoundError(
+                "Could not find sensor of type {} with id {}".format(
+                    self.name, self.id)
+            )
+
+        if self.recorder is not None:
+            self.recorder.record_dump(self, data.decode().splitlines(True))
+
+        end = data.find(b"\n")
+        if (
+            end < 0
+            or data[:end].rstrip()[-3:] != b"YES"
+            or b"00 00 00 00 00 00 00 00 00" in data[:end]
+        ):
+            raise SensorNotReadyError(self)
+
+        return data
+
+    def get_raw_millicelsius(self) -> int:
+        """Reads the temperature from the kernel sysfs ``temperature`` attribute
+
+        Note: This attribute is supported since kernel 5.10.
+
+        :returns: the temperature in millidegrees Celsius
+        :rtype: int
+
+        :raises NoSensorFoundError: if the sensor could not be found
+        :raises SensorNotReadyError: if the sensor is not ready yet
+        """
+        try:
+            if self.keep_open:
+                data = self._read_raw_file(self.temperaturepath)
+            else:
+                with self.temperaturepath.open("rb") as f:
+                    data = f.read()
+        except FileNotFoundError:
+            raise NoSensorFoundError(
+                "Could not find sensor of type {} with id {}".format(
+                    self.name, self.id)
+            )
+        except IOError:
+            raise SensorNotReadyError(self)
+
+        # the kernel returns nothing if the CRC check of the scratchpad failed
+        try:
+            return int(data)
+        except ValueError:
+            raise SensorNotReadyError(self)
+
+    def get_decoder(self, unit: Unit = Unit.DEGREES_C) -> TemperatureDecoder:
+        """Returns the decoder for readings of this sensor in the specified unit
+
+        The decoder is created once per unit and kept until the offset changes.
+
+        :param int unit: the unit of the decoded temperatures
+
+        :returns: the decoder for this sensor
+        :rtype: TemperatureDecoder
+
+        :raises UnsupportedUnitError: if the unit is not supported
+        """
+        decoder = self._decoders.get(unit)
+        if decoder is None or decoder.offset != self.offset:
+            decoder = self._decoders[unit] = TemperatureDecoder(
+                self.type,
+                self.id,
+                self.offset,
+                unit,
+                self.SENSOR_RESET_VALUE,
+                self.RAW_VALUE_TO_DEGREE_CELSIUS_FACTOR,
+            )
+        return decoder
+
     def get_temperature(self, unit: Unit = Unit.DEGREES_C) -> float:
         """Returns the temperature in the specified unit
 
@@ -274,16 +656,29 @@ class W1ThermSensor:
         :raises SensorNotReadyError: if the sensor is not ready yet
         :raises ResetValueError: if the sensor has still the initial value and no measurement
         """
-        raw_temperature_line = self.get_raw_sensor_strings()[1]
-        return evaluate_temperature(
-            raw_temperature_line,
-            self.RAW_VALUE_TO_DEGREE_CELSIUS_FACTOR,
-            unit,
-            self.type,
-            self.id,
-            self.offset,
-            self.SENSOR_RESET_VALUE,
-        )
+        decoder = self.get_decoder(unit)
+        if self.use_temperature_file and self.recorder is None:
+            return decoder.decode_millicelsius(self.get_raw_millicelsius())
+        if self.keep_open:
+            return decoder.decode_dump(self.get_raw_dump())
+
+        return decoder.decode_line(self.get_raw_sensor_strings()[1])
+
+    def get_reading(self, unit: Unit = Unit.DEGREES_C) -> SensorReading:
+        """Returns the temperature in the specified unit wrapped in a reading
+
+        In contrast to ``get_temperature`` sensor errors are not raised
+        but stored in the returned reading.
+
+        :param int unit: the unit of the temperature requested
+
+        :returns: the reading of this sensor
+        :rtype: SensorReading
+        """
+        try:
+            return SensorReading(self, unit, temperature=self.get_temperature(unit))
+        except W1ThermSensorError as exc:
+            return SensorReading(self, unit, error=exc)
 
     def get_corrected_temperature(self, unit: Unit = Unit.DEGREES_C) -> float:
         """Returns the temperature in the specified unit, corrected based on the calibration data
@@ -306,11 +701,12 @@ class W1ThermSensor:
                 None,
             )
 
+        convert = self.get_decoder(unit).convert
         raw_temperature = self.get_temperature(Unit.DEGREES_C)
         corrected_temperature = self.calibration_data.correct_temperature_for_calibration_data(
             raw_temperature)
 
-        return Unit.get_conversion_function(Unit.DEGREES_C, unit)(corrected_temperature)
+        return convert(corrected_temperature)
 
     def get_temperatures(self, units: Iterable[Unit]) -> List[float]:
         """Returns the temperatures in the specified units
@@ -325,11 +721,10 @@ class W1ThermSensor:
         :raises NoSensorFoundError: if the sensor could not be found
         :raises SensorNotReadyError: if the sensor is not ready yet
         """
+        # the conversions are bound once by the decoders of the units
+        converters = [self.get_decoder(unit).convert for unit in units]
         sensor_value = self.get_temperature(Unit.DEGREES_C)
-        return [
-            Unit.get_conversion_function(Unit.DEGREES_C, unit)(sensor_value)
-            for unit in units
-        ]
+        return [convert(sensor_value) for convert in converters]
 
     def get_corrected_temperatures(self, units: Iterable[Unit]) -> List[float]:
         """Returns the temperatures in the specified units, corrected based on the calibration data
@@ -346,11 +741,51 @@ class W1ThermSensor:
         :raises InvalidCalibrationDataError: if the calibration data was not provided at creation
         """
 
+        converters = [self.get_decoder(unit).convert for unit in units]
         corrected_temperature = self.get_corrected_temperature(Unit.DEGREES_C)
-        return [
-            Unit.get_conversion_function(Unit.DEGREES_C, unit)(corrected_temperature)
-            for unit in units
-        ]
+        return [convert(corrected_temperature) for convert in converters]
+
+    def stream(
+        self,
+        interval: float,
+        units: Iterable[Unit] = (Unit.DEGREES_C,),
+        count: Optional[int] = None,
+    ) -> Iterator[StreamReading]:
+        """Yields readings of this sensor every ``interval`` seconds
+
+        The readings are scheduled on the monotonic clock, see ``TickSchedule``.
+        The time it takes to read the sensor and to process a reading
+        does not shift the schedule. Readings which could not be taken
+        in time are reported in the ``missed`` count of the next reading.
+
+        Sensor errors do not end the stream but are stored in the reading.
+
+        :param float interval: the time in seconds between two readings.
+        :param list units: the units of the temperatures in each reading.
+        :param int count: the number of readings after which the stream ends.
+                          If count is None the stream does not end.
+
+        :returns: an iterator over the readings
+        :rtype: iterator
+        """
+        units = tuple(units)
+        schedule = TickSchedule(interval)
+        produced = 0
+        while count is None or produced < count:
+            time.sleep(schedule.start())
+            started = time.monotonic()
+            try:
+                temperatures, error = tuple(self.get_temperatures(units)), None
+            except W1ThermSensorError as exc:
+                temperatures, error = None, exc
+            duration = time.monotonic() - started
+            reading = StreamReading(
+                self, schedule.tick, time.time(), duration, schedule.missed,
+                temperatures, error
+            )
+            schedule.complete(duration)
+            produced += 1
+            yield reading
 
     def get_resolution(self) -> int:
         """Get the current resolution from the sensor.
@@ -361,6 +796,11 @@ class W1ThermSensor:
         raw_temperature_line = self.get_raw_sensor_strings()[1]
         return evaluate_resolution(raw_temperature_line)
 
+    def _write_slave_file(self, command: str) -> None:
+        # every command needs its own write, the kernel handles one command per write
+        with self.sensorpath.open("w") as f:
+            f.write(command)
+
     def set_resolution(self, resolution: int, persist: bool = False) -> bool:
         """Set the resolution of the sensor for the next readings.
 
@@ -391,10 +831,9 @@ class W1ThermSensor:
                 )
             )
 
-        exitcode = subprocess.call(
-            "echo {0} > {1}".format(resolution, self.sensorpath), shell=True
-        )
-        if exitcode != 0:
+        try:
+            self._write_slave_file(str(resolution))
+        except OSError:
             raise W1ThermSensorError(
                 "Failed to change resolution to {0} bit. "
                 "You might have to be root to change the resolution".format(
@@ -402,10 +841,9 @@ class W1ThermSensor:
             )
 
         if persist:
-            exitcode = subprocess.call(
-                "echo 0 > {0}".format(self.sensorpath), shell=True
-            )
-            if exitcode != 0:
+            try:
+                self._write_slave_file("0")
+            except OSError:
                 raise W1ThermSensorError(
                     "Failed to write resolution configuration to sensor EEPROM"
                 )
@@ -453,7 +891,6 @@ class W1ThermSensor:
         return factor(self.offset) - factor(0)
 
 
-@lru_cache()
 def evaluate_temperature(
     raw_temperature_line: str,
     raw_temperature_to_degree_celsius_factor: float,
@@ -463,27 +900,35 @@ def evaluate_temperature(
     sensor_offset: float,
     sensor_reset_value: float,
 ) -> float:
-    factor = Unit.get_conversion_function(
-        Unit.DEGREES_C, target_temperature_unit)
-    if sensor_type.comply_12bit_standard():
-        value = float(convert_raw_temperature_to_sensor_count(
-            raw_temperature_line))
-        # the int part is 8 bit wide, 4 bit are left on 12 bit
-        # so divide with 2^4 = 16 to get the celsius fractions
-        value /= 16.0
-
-        # check if the sensor value is the reset value
-        if value == sensor_reset_value:
-            raise ResetValueError(sensor_id)
-    else:
-        # Fallback to precalculated value for other sensor types
-        value = get_raw_temperature(raw_temperature_line)
-        value *= raw_temperature_to_degree_celsius_factor
-
-    return factor(value + sensor_offset)
+    return TemperatureDecoder(
+        sensor_type,
+        sensor_id,
+        sensor_offset,
+        target_temperature_unit,
+        sensor_reset_value,
+        raw_temperature_to_degree_celsius_factor,
+    ).decode_line(raw_temperature_line)
+
+
+def evaluate_millicelsius(
+    millicelsius: int,
+    raw_temperature_to_degree_celsius_factor: float,
+    target_temperature_unit: Unit,
+    sensor_type: Sensor,
+    sensor_id: str,
+    sensor_offset: float,
+    sensor_reset_value: float,
+) -> float:
+    return TemperatureDecoder(
+        sensor_type,
+        sensor_id,
+        sensor_offset,
+        target_temperature_unit,
+        sensor_reset_value,
+        raw_temperature_to_degree_celsius_factor,
+    ).decode_millicelsius(millicelsius)
 
 
-@lru_cache()
 def evaluate_resolution(raw_temperature_line: str) -> int:
     # Byte 5 is the config register
     config_str = raw_temperature_line.split()[4]
@@ -492,7 +937,6 @@ def evaluate_resolution(raw_temperature_line: str) -> int:
     return bit_base + 9  # min. is 9 bits
 
 
-@lru_cache()
 def convert_raw_temperature_to_sensor_count(raw_temperature_line: str) -> int:
     """Convert the raw temperature from the kernel module to the raw integer ADC count
 
@@ -519,7 +963,6 @@ def convert_raw_temperature_to_sensor_count(raw_temperature_line: str) -> int:
         return int16 - (1 << 16)
 
 
-@lru_cache()
 def get_raw_temperature(raw_temperature_line: str) -> float:
     """Get the raw temperature from a temperature line
 
@@ -530,3 +973,31 @@ def get_raw_temperature(raw_temperature_line: str) -> float:
     :raises SensorNotReadyError: if the sensor is not ready yet
     """
     return float(raw_temperature_line.split("=")[1])
+
+
+# Select a simulated bus for all sensors, e.g. for development without hardware.
+# Set the environment variable W1THERMSENSOR_SIMULATE to the number of sensors
+# or to the options of the bus, e.g. W1THERMSENSOR_SIMULATE="sensors=20,time_scale=0.1"
+if os.environ.get("W1THERMSENSOR_SIMULATE"):  # pragma: no cover
+    from w1thermsensor.simulation import SimulatedBus
+
+    W1ThermSensor.BASE_DIRECTORY = SimulatedBus.from_spec(  # type: ignore
+        os.environ["W1THERMSENSOR_SIMULATE"]
+    ).root
+
+# Capture the scratchpad of every read into the file given by W1THERMSENSOR_CAPTURE,
+# or replay the capture file given by W1THERMSENSOR_REPLAY instead of reading the bus.
+if os.environ.get("W1THERMSENSOR_CAPTURE"):  # pragma: no cover
+    import atexit
+
+    from w1thermsensor.capture import CaptureRecorder as _CaptureRecorder
+
+    W1ThermSensor.recorder = _CaptureRecorder(os.environ["W1THERMSENSOR_CAPTURE"])
+    atexit.register(W1ThermSensor.recorder.close)
+
+if os.environ.get("W1THERMSENSOR_REPLAY"):  # pragma: no cover
+    from w1thermsensor.capture import ReplayBus
+
+    W1ThermSensor.BASE_DIRECTORY = ReplayBus(  # type: ignore
+        os.environ["W1THERMSENSOR_REPLAY"]
+    ).root
@@ -8,8 +8,6 @@ A Python package and CLI tool to work with w1 temperature sensors.
 :license: MIT, see LICENSE for more details.
 """
 
-import textwrap
-
 
 class W1ThermSensorError(Exception):
     """Exception base-class for W1ThermSensor errors"""
@@ -28,6 +26,9 @@ class NoSensorFoundError(W1ThermSensorError):
     """Exception when no sensor is found"""
 
     def __init__(self, message):
+        # imported here since textwrap pulls in re, which is slow to import
+        import textwrap
+
         super().__init__(
             textwrap.dedent(
                 """
@@ -83,3 +84,13 @@ class InvalidCalibrationDataError(W1ThermSensorError):
         super().__init__(
             "Calibration data {} is invalid: {}.".format(message, calibration_data)
         )
+
+
+class SensorTimeoutError(W1ThermSensorError):
+    """Exception when a sensor could not be read in time"""
+
+    def __init__(self, sensor, timeout):
+        super().__init__(
+            "Sensor {} could not be read within {} seconds".format(sensor.id, timeout)
+        )
+        self.sensor = sensor
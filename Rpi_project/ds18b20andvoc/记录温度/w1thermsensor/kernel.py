@@ -9,11 +9,65 @@ A Python package and CLI tool to work with w1 temperature sensors.
 """
 
 import os
+import subprocess
+import threading
 import time
+from pathlib import Path
+from typing import Iterable, List
 
 from w1thermsensor.core import W1ThermSensor
 from w1thermsensor.errors import KernelModuleLoadError
 
+#: Holds the kernel modules needed by the temperature sensor
+KERNEL_MODULES = ("w1_gpio", "w1_therm")
+
+#: Holds the list of loaded kernel modules
+PROC_MODULES = Path("/proc/modules")
+
+#: Holds the directory of the loaded and built-in kernel modules
+SYS_MODULES = Path("/sys/module")
+
+#: Holds the first delay in seconds while waiting for the base directory
+FIRST_WAIT_DELAY_SECONDS = 0.005
+
+
+def get_missing_kernel_modules(modules: Iterable[str] = KERNEL_MODULES) -> List[str]:
+    """Returns the given kernel modules which are neither loaded nor built-in
+
+    :param modules: the names of the kernel modules as in ``/proc/modules``.
+    """
+    try:
+        loaded = {line.split(" ", 1)[0] for line in PROC_MODULES.read_text().splitlines()}
+    except OSError:
+        loaded = set()
+
+    return [
+        module
+        for module in modules
+        if module not in loaded and not (SYS_MODULES / module).is_dir()
+    ]
+
+
+def wait_for_base_directory(timeout: float) -> bool:
+    """Waits until the base directory of the sensors exists
+
+    The directory is checked with an exponentially growing delay,
+    so a bus which comes up quickly is found within milliseconds.
+
+    :param float timeout: the maximum time to wait in seconds.
+
+    :returns: if the base directory exists
+    """
+    deadline = time.monotonic() + timeout
+    delay = FIRST_WAIT_DELAY_SECONDS
+    while not W1ThermSensor.BASE_DIRECTORY.is_dir():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay *= 2
+    return True
+
 
 def load_kernel_modules() -> None:
     """
@@ -22,19 +76,49 @@ def load_kernel_modules() -> None:
     If the base directory then does not exist an exception is raised an the kernel module loading
     should be treated as failed.
 
+    The loaded modules are read from ``/proc/modules`` and ``modprobe``
+    is only run for the missing ones.
+
     :raises KernelModuleLoadError: if the kernel module could not be loaded properly
     """
-    if W1ThermSensor.BASE_DIRECTORY.is_dir():  # pragma: no cover
+    if W1ThermSensor.BASE_DIRECTORY.is_dir():
         return
 
-    # load kernel modules
-    os.system("modprobe w1-gpio >/dev/null 2>&1")
-    os.system("modprobe w1-therm >/dev/null 2>&1")
+    missing = get_missing_kernel_modules()
+    if missing:
+        try:
+            subprocess.run(
+                ["modprobe", "-a"] + missing,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        except OSError:
+            pass
 
-    for _ in range(W1ThermSensor.RETRY_ATTEMPTS):
-        if W1ThermSensor.BASE_DIRECTORY.is_dir():  # pragma: no cover
-            # w1 therm modules loaded correctly
-            break
-        time.sleep(W1ThermSensor.RETRY_DELAY_SECONDS)
-    else:
+    timeout = W1ThermSensor.RETRY_ATTEMPTS * W1ThermSensor.RETRY_DELAY_SECONDS
+    if not wait_for_base_directory(timeout):
         raise KernelModuleLoadError()
+
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def ensure_kernel_modules() -> None:
+    """
+    Load the kernel modules needed by the temperature sensor once per process.
+
+    This is done on the first access to the sensors instead of on import.
+    Set the environment variable W1THERMSENSOR_NO_KERNEL_MODULE=1 to skip it.
+
+    :raises KernelModuleLoadError: if the kernel module could not be loaded properly
+    """
+    global _loaded
+    if _loaded or os.environ.get("W1THERMSENSOR_NO_KERNEL_MODULE", "0") == "1":
+        return
+
+    with _lock:
+        if not _loaded:
+            load_kernel_modules()
+            _loaded = True
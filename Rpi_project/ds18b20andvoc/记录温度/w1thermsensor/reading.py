@@ -0,0 +1,64 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from w1thermsensor.errors import W1ThermSensorError
+from w1thermsensor.units import Unit
+
+if TYPE_CHECKING:  # pragma: no cover
+    from w1thermsensor.core import W1ThermSensor
+
+
+@dataclass(frozen=True)
+class SensorReading:
+    """
+    Represents the outcome of reading a single sensor as part of a
+    multi-sensor read.
+
+    Either ``temperature`` is set or ``error`` holds the exception
+    the sensor raised, so a failing sensor does not hide the readings
+    of the others.
+    """
+
+    sensor: "W1ThermSensor"
+    unit: Unit
+    temperature: Optional[float] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Returns if the sensor was read successfully"""
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class StreamReading:
+    """
+    Represents a single reading of a sensor stream, see ``W1ThermSensor.stream()``.
+
+    ``tick`` is the index of the schedule tick this reading belongs to and
+    ``missed`` the number of ticks skipped right before it because reading
+    or processing the previous tick overran them.
+    """
+
+    sensor: "W1ThermSensor"
+    tick: int
+    timestamp: float
+    duration: float
+    missed: int
+    temperatures: Optional[Tuple[float, ...]] = None
+    error: Optional[W1ThermSensorError] = None
+
+    @property
+    def ok(self) -> bool:
+        """Returns if the sensor was read successfully"""
+        return self.error is None
@@ -0,0 +1,147 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from w1thermsensor.core import W1ThermSensor
+from w1thermsensor.errors import NoSensorFoundError, UnsupportedSensorError
+from w1thermsensor.sensors import Sensor
+
+
+class SensorRegistry:
+    """
+    Caches the sensors discovered on the w1 bus.
+
+    ``W1ThermSensor.get_available_sensors()`` scans the sysfs directory and
+    creates new sensor instances on every call. The registry keeps the
+    discovered sensors instead and only scans again if the list of slaves of
+    one of the bus masters changed. The slave lists are not checked more
+    often than every ``ttl`` seconds, so lookups within this time do not
+    touch the filesystem at all.
+
+    Examples:
+        Get all cached sensors
+
+        >>> registry = SensorRegistry()
+        >>> registry.get_sensors()
+
+        Get a cached sensor by its id
+
+        >>> registry.get_sensor("01226304075d")
+    """
+
+    #: Holds the file of each bus master listing its connected slaves
+    MASTER_SLAVES_FILE = "w1_master_slaves"
+
+    def __init__(
+        self,
+        sensor_class: Type[W1ThermSensor] = W1ThermSensor,
+        ttl: float = 5.0,
+        base_directory: Optional[Path] = None,
+    ) -> None:
+        """Initializes a SensorRegistry.
+
+        :param sensor_class: the class of the sensors to create.
+        :param float ttl: the time in seconds in which the cached sensors
+                          are used without checking for changes on the bus.
+        :param base_directory: the directory to look for sensors in.
+                               Defaults to ``BASE_DIRECTORY`` of the sensor class.
+        """
+        self.sensor_class = sensor_class
+        self.ttl = ttl
+        self.base_directory = base_directory
+        self._lock = threading.Lock()
+        self._sensors: Dict[str, W1ThermSensor] = {}
+        self._slaves: Optional[Tuple[str, ...]] = None
+        self._checked_at = float("-inf")
+
+    def _read_slaves(self) -> Tuple[str, ...]:
+        base_directory = self.sensor_class.get_base_directory(self.base_directory)
+        slaves = []
+        for master in sorted(base_directory.glob(self.sensor_class.BUS_MASTER_PATTERN)):
+            try:
+                slaves.append((master / self.MASTER_SLAVES_FILE).read_text())
+            except OSError:  # pragma: no cover
+                # the bus master vanished in the meantime
+                continue
+        return tuple(slaves)
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.ttl:
+            return
+
+        slaves = self._read_slaves()
+        # without a bus master there is nothing to compare, so rescan every time
+        if slaves != self._slaves or not slaves:
+            self._sensors = {
+                s.id: s
+                for s in self.sensor_class.get_available_sensors(
+                    base_directory=self.base_directory)
+            }
+            self._slaves = slaves
+        self._checked_at = now
+
+    def invalidate(self) -> None:
+        """Forces a rescan of the bus on the next lookup"""
+        with self._lock:
+            self._slaves = None
+            self._checked_at = float("-inf")
+
+    def get_sensors(
+        self, types: Optional[Iterable[Union[Sensor, str]]] = None
+    ) -> List[W1ThermSensor]:
+        """Return all available sensors from the cache.
+
+        :param list types: the type of the sensor to look for.
+                           If types is None all cached sensors are returned.
+
+        :returns: a list of sensor instances.
+        :rtype: list
+        """
+        with self._lock:
+            self._refresh()
+            sensors = list(self._sensors.values())
+
+        if not types:
+            return sensors
+
+        try:
+            types = {s if isinstance(s, Sensor) else Sensor[s] for s in types}
+        except KeyError as exc:  # sensor type does not exist
+            raise UnsupportedSensorError(str(exc), (s.name for s in Sensor))
+        return [s for s in sensors if s.type in types]
+
+    def get_sensor(self, sensor_id: str) -> W1ThermSensor:
+        """Return the cached sensor with the given id.
+
+        :param string sensor_id: the id of the sensor.
+
+        :returns: the sensor instance.
+        :rtype: W1ThermSensor
+
+        :raises NoSensorFoundError: if the sensor is not connected
+        """
+        with self._lock:
+            self._refresh()
+            sensor = self._sensors.get(sensor_id)
+
+        if sensor is None:
+            raise NoSensorFoundError(
+                "Could not find sensor with id {}".format(sensor_id)
+            )
+        return sensor
+
+
+#: Holds the process-wide registry of ``W1ThermSensor`` instances
+sensor_registry = SensorRegistry()
@@ -0,0 +1,86 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import math
+import time
+from typing import Callable
+
+
+class TickSchedule:
+    """
+    Represents a fixed-rate schedule on the monotonic clock.
+
+    Tick ``n`` is due ``n * interval`` seconds after the schedule started,
+    no matter how long the work done for the previous ticks took.
+    This avoids the drift of sleeping a fixed interval after each reading.
+
+    Reading a sensor takes the whole conversion time, so the schedule
+    keeps an estimate of this duration and wakes up early by it. The
+    readings then complete on the tick instead of one conversion later.
+
+    If the work for a tick overruns the following ticks, only the latest
+    overdue tick is done right away. The ticks before it are skipped and
+    counted in ``missed``, so the schedule is never shifted.
+    """
+
+    #: Holds the weight of the latest duration in the duration estimate
+    DURATION_SMOOTHING = 0.2
+
+    def __init__(
+        self, interval: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """Initializes a TickSchedule starting now.
+
+        :param float interval: the time in seconds between two ticks.
+        :param clock: the monotonic clock to use.
+        """
+        if interval <= 0:
+            raise ValueError(
+                "The given interval '{0}' must be greater than 0".format(interval)
+            )
+
+        self.interval = interval
+        self.clock = clock
+        self.origin = clock()
+        self.tick = 0
+        self.missed = 0
+        self.duration = 0.0
+
+    @property
+    def deadline(self) -> float:
+        """Returns the monotonic time the current tick is due"""
+        return self.origin + self.tick * self.interval
+
+    def start(self) -> float:
+        """Skips overdue ticks and returns the time in seconds to wait
+        before starting the work for the current tick.
+
+        Of all overdue ticks only the latest one is kept, the number of
+        skipped ticks is stored in ``missed``.
+        """
+        now = self.clock()
+        due = math.floor((now - self.origin) / self.interval)
+        if due > self.tick:
+            self.missed += due - self.tick
+            self.tick = due
+        return max(0.0, self.deadline - self.duration - now)
+
+    def complete(self, duration: float) -> None:
+        """Marks the work for the current tick as done and advances to the next tick.
+
+        :param float duration: the time in seconds the work for this tick took.
+        """
+        if self.tick == 0:
+            self.duration = duration
+        else:
+            self.duration += self.DURATION_SMOOTHING * (duration - self.duration)
+        self.duration = min(self.duration, self.interval)
+        self.tick += 1
+        self.missed = 0
@@ -0,0 +1,460 @@
+"""
+w1thermsensor
+~~~~~~~~~~~~~
+
+A Python package and CLI tool to work with w1 temperature sensors.
+
+:copyright: (c) 2020 by Timo Furrer <tuxtimo@gmail.com>
+:license: MIT, see LICENSE for more details.
+"""
+
+import errno
+import fnmatch
+import io
+import random
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from w1thermsensor.sensors import Sensor
+
+#: Holds the time a temperature conversion takes at most by resolution
+CONVERSION_TIME_SECONDS = {9: 0.09375, 10: 0.1875, 11: 0.375, 12: 0.75}
+
+
+def crc8(data: bytes) -> int:
+    """Computes the Dallas/Maxim 1-Wire CRC8 of the given bytes
+
+    :param bytes data: the bytes to compute the CRC of.
+
+    :returns: the CRC8 checksum
+    :rtype: int
+    """
+    crc = 0
+    for byte in data:
+        for _ in range(8):
+            mix = (crc ^ byte) & 0x01
+            crc >>= 1
+            if mix:
+                crc ^= 0x8C
+            byte >>= 1
+    return crc
+
+
+class SimulatedSensor:
+    """
+    Represents a sensor on a ``SimulatedBus``.
+
+    The temperature does a small random walk with every conversion,
+    so consecutive readings look like the readings of a real sensor.
+    """
+
+    def __init__(
+        self,
+        sensor_type: Sensor,
+        sensor_id: str,
+        temperature: float = 20.0,
+        resolution: int = 12,
+    ) -> None:
+        self.type = sensor_type
+        self.id = sensor_id
+        self.temperature = temperature
+        self.resolution = resolution
+        #: Holds the monotonic time a bulk conversion is ready, if one was triggered
+        self.bulk_ready_at: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        """Returns the sysfs directory name of this sensor"""
+        return "{0:02x}-{1}".format(self.type.value, self.id)
+
+    def get_scratchpad(self, temperature: float) -> bytes:
+        """Returns the 9 byte scratchpad holding the given temperature"""
+        if self.type.comply_12bit_standard():
+            count = int(round(temperature * 16))
+            # the undefined low bits of lower resolutions read as zero
+            count &= ~((1 << (12 - self.resolution)) - 1)
+            count &= 0xFFFF
+            config = ((self.resolution - 9) << 5) | 0x1F
+            data = bytes([count & 0xFF, count >> 8, 0x4B, 0x46, config, 0xFF, 0x0C, 0x10])
+        else:
+            # the DS18S20 holds whole degrees and refines them by the count remain
+            whole = int((temperature + 0.25) // 1)
+            count_remain = 16 - min(16, int(round((temperature - whole + 0.25) * 16)))
+            raw = (whole * 2) & 0xFFFF
+            data = bytes([raw & 0xFF, raw >> 8, 0x4B, 0x46, 0xFF, 0xFF, count_remain, 0x10])
+        return data + bytes([crc8(data)])
+
+    def get_millicelsius(self, scratchpad: bytes) -> int:
+        """Returns the temperature the kernel computes from the given scratchpad"""
+        if self.type.comply_12bit_standard():
+            count = int.from_bytes(scratchpad[0:2], "little", signed=True)
+            return int(count * 1000 / 16)
+
+        whole = int.from_bytes(scratchpad[0:2], "little", signed=True) >> 1
+        if not scratchpad[7]:
+            # a corrupted scratchpad, do not divide by zero
+            return whole * 1000
+        return whole * 1000 - 250 + 1000 * (scratchpad[7] - scratchpad[6]) // scratchpad[7]
+
+
+class SimulatedBus:
+    """
+    Simulates a w1 bus master with its sensors as an in-memory sysfs tree.
+
+    The ``root`` of the bus behaves like the ``/sys/bus/w1/devices`` directory
+    and can be used as base directory of ``W1ThermSensor``. Reading a sensor
+    blocks for the conversion time of its resolution, scaled by ``time_scale``,
+    and the bus transaction to read the scratchpad is serialized like on a
+    real bus. The bulk read trigger of the bus master is supported as well.
+
+    Reads can be made to fail the CRC check and to yield the 85 degree
+    reset value at a configurable rate.
+
+    Examples:
+        Read 200 simulated sensors without hardware
+
+        >>> bus = SimulatedBus(sensors=200, time_scale=0.1)
+        >>> W1ThermSensor.read_all(base_directory=bus.root)
+
+        Select the simulated bus for all sensors through the environment
+
+        $ W1THERMSENSOR_SIMULATE="sensors=20,crc_failure_rate=0.01" w1thermsensor all
+    """
+
+    MASTER_NAME = "w1_bus_master1"
+
+    #: Holds the time a bus transaction to read a scratchpad takes
+    TRANSACTION_TIME_SECONDS = 0.005
+
+    def __init__(
+        self,
+        sensors: int = 1,
+        sensor_type: Sensor = Sensor.DS18B20,
+        resolution: int = 12,
+        time_scale: float = 1.0,
+        crc_failure_rate: float = 0.0,
+        reset_rate: float = 0.0,
+        temperature_file: bool = True,
+        bulk_read: bool = True,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initializes a SimulatedBus.
+
+        :param int sensors: the number of sensors on the bus.
+        :param sensor_type: the type of the sensors.
+        :param int resolution: the initial resolution of the sensors.
+        :param float time_scale: the factor applied to all simulated delays.
+                                 Use 0 to disable the delays completely.
+        :param float crc_failure_rate: the probability of a read failing the CRC check.
+        :param float reset_rate: the probability of a read yielding the reset value.
+        :param bool temperature_file: if the sensors provide the ``temperature``
+                                      attribute of newer kernels.
+        :param bool bulk_read: if the bus master provides the bulk read trigger.
+        :param int seed: the seed of the random generator.
+        """
+        self.time_scale = time_scale
+        self.crc_failure_rate = crc_failure_rate
+        self.reset_rate = reset_rate
+        self.temperature_file = temperature_file
+        self.bulk_read = bulk_read
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bus_lock = threading.Lock()
+        self.sensors: Dict[str, SimulatedSensor] = {}
+        for _ in range(sensors):
+            self.add_sensor(sensor_type, resolution=resolution)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "SimulatedBus":
+        """Creates a SimulatedBus from a specification string
+
+        The specification is either the number of sensors or a comma separated
+        list of ``key=value`` pairs of the arguments of ``SimulatedBus``,
+        e.g. ``sensors=20,time_scale=0.1,crc_failure_rate=0.01``.
+
+        :param str spec: the specification of the bus.
+
+        :returns: the simulated bus
+        :rtype: SimulatedBus
+        """
+        if spec.strip().isdigit():
+            return cls(sensors=int(spec))
+
+        kwargs = {}  # type: Dict[str, object]
+        for item in spec.split(","):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key in ("sensors", "resolution", "seed"):
+                kwargs[key] = int(value)
+            elif key in ("time_scale", "crc_failure_rate", "reset_rate"):
+                kwargs[key] = float(value)
+            elif key in ("temperature_file", "bulk_read"):
+                kwargs[key] = value.strip().lower() in ("1", "true", "yes")
+            elif key == "sensor_type":
+                kwargs[key] = Sensor[value.strip()]
+            else:
+                raise ValueError("Unknown simulated bus option '{0}'".format(key))
+        return cls(**kwargs)  # type: ignore
+
+    @property
+    def root(self) -> "SimulatedPath":
+        """Returns the simulated ``/sys/bus/w1/devices`` directory"""
+        return SimulatedPath(self, ())
+
+    def add_sensor(
+        self,
+        sensor_type: Sensor = Sensor.DS18B20,
+        sensor_id: Optional[str] = None,
+        temperature: Optional[float] = None,
+        resolution: int = 12,
+    ) -> SimulatedSensor:
+        """Connects a new sensor to the bus
+
+        :returns: the new sensor
+        :rtype: SimulatedSensor
+        """
+        with self._lock:
+            if sensor_id is None:
+                sensor_id = "{0:012x}".format(self.random.getrandbits(48))
+            if temperature is None:
+                temperature = self.random.uniform(15.0, 30.0)
+            sensor = SimulatedSensor(sensor_type, sensor_id, temperature, resolution)
+            self.sensors[sensor.name] = sensor
+        return sensor
+
+    def remove_sensor(self, sensor_id: str) -> None:
+        """Disconnects the sensor with the given id from the bus"""
+        with self._lock:
+            for name, sensor in list(self.sensors.items()):
+                if sensor.id == sensor_id:
+                    del self.sensors[name]
+
+    def _sleep(self, seconds: float) -> None:
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _convert(self, sensor: SimulatedSensor) -> Tuple[bytes, bool]:
+        with self._lock:
+            now = time.monotonic()
+            if sensor.bulk_ready_at is not None:
+                # the bulk conversion already started, only wait for the rest of it
+                wait = max(0.0, sensor.bulk_ready_at - now) / (self.time_scale or 1)
+                sensor.bulk_ready_at = None
+            else:
+                wait = CONVERSION_TIME_SECONDS[sensor.resolution]
+            sensor.temperature = min(125.0, max(-55.0, sensor.temperature
+                                                + self.random.gauss(0.0, 0.05)))
+            temperature = sensor.temperature
+            if self.random.random() < self.reset_rate:
+                temperature = 85.0
+            verdict = self.random.random() >= self.crc_failure_rate
+            corrupted_byte = self.random.randrange(8)
+
+        # the bus is released while the sensor converts
+        self._sleep(wait)
+        with self._bus_lock:
+            self._sleep(self.TRANSACTION_TIME_SECONDS)
+
+        scratchpad = sensor.get_scratchpad(temperature)
+        if not verdict:
+            corrupted = bytearray(scratchpad)
+            corrupted[corrupted_byte] ^= 0x5A
+            scratchpad = bytes(corrupted)
+        return scratchpad, verdict
+
+    @staticmethod
+    def format_w1_slave(sensor: SimulatedSensor, scratchpad: bytes, verdict: bool) -> str:
+        """Returns the ``w1_slave`` dump the kernel writes for the given scratchpad"""
+        data = " ".join("{0:02x}".format(b) for b in scratchpad)
+        return "{0} : crc={1:02x} {2}\n{0} t={3}\n".format(
+            data, crc8(scratchpad[:8]), "YES" if verdict else "NO",
+            sensor.get_millicelsius(scratchpad)
+        )
+
+    def _read_w1_slave(self, sensor: SimulatedSensor) -> str:
+        scratchpad, verdict = self._convert(sensor)
+        return self.format_w1_slave(sensor, scratchpad, verdict)
+
+    def _read_temperature(self, sensor: SimulatedSensor) -> str:
+        scratchpad, verdict = self._convert(sensor)
+        # the kernel returns nothing if the CRC check failed
+        return "{0}\n".format(sensor.get_millicelsius(scratchpad)) if verdict else ""
+
+    def _read_bulk_read(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            pending = [s.bulk_ready_at for s in self.sensors.values()
+                       if s.bulk_ready_at is not None]
+        if any(ready_at > now for ready_at in pending):
+            return "-1\n"
+        return "1\n" if pending else "0\n"
+
+    def _trigger_bulk_read(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for sensor in self.sensors.values():
+                sensor.bulk_ready_at = (
+                    now + CONVERSION_TIME_SECONDS[sensor.resolution] * self.time_scale
+                )
+
+    def _get_master_files(self) -> List[str]:
+        return ["w1_master_slaves"] + (["therm_bulk_read"] if self.bulk_read else [])
+
+    def _get_sensor_files(self) -> List[str]:
+        return ["w1_slave"] + (["temperature"] if self.temperature_file else [])
+
+    def _get_sensor(self, name: str) -> Optional[SimulatedSensor]:
+        with self._lock:
+            return self.sensors.get(name)
+
+    def listdir(self, parts: Tuple[str, ...]) -> Optional[List[str]]:
+        """Returns the entries of the given directory or None if it is no directory"""
+        if not parts:
+            with self._lock:
+                return [self.MASTER_NAME] + list(self.sensors)
+        if len(parts) == 1:
+            if parts[0] == self.MASTER_NAME:
+                with self._lock:
+                    return self._get_master_files() + list(self.sensors)
+            if self._get_sensor(parts[0]):
+                return self._get_sensor_files()
+        if len(parts) == 2 and parts[0] == self.MASTER_NAME and self._get_sensor(parts[1]):
+            return self._get_sensor_files()
+        return None
+
+    def read_file(self, parts: Tuple[str, ...]) -> str:
+        """Returns the content of the given file
+
+        :raises FileNotFoundError: if the file does not exist
+        """
+        if len(parts) == 2 and parts[0] == self.MASTER_NAME:
+            if parts[1] == "w1_master_slaves":
+                with self._lock:
+                    return "".join(name + "\n" for name in self.sensors)
+            if parts[1] == "therm_bulk_read" and self.bulk_read:
+                return self._read_bulk_read()
+        parts = parts[1:] if parts[:1] == (self.MASTER_NAME,) and len(parts) == 3 else parts
+        if len(parts) == 2:
+            sensor = self._get_sensor(parts[0])
+            if sensor and parts[1] == "w1_slave":
+                return self._read_w1_slave(sensor)
+            if sensor and parts[1] == "temperature" and self.temperature_file:
+                return self._read_temperature(sensor)
+        raise FileNotFoundError(errno.ENOENT, "No such file", "/".join(parts))
+
+    def write_file(self, parts: Tuple[str, ...], data: str) -> None:
+        """Writes the given data to the given file
+
+        :raises FileNotFoundError: if the file does not exist
+        :raises OSError: if the data is not a valid command for the file
+        """
+        command = data.strip()
+        if parts == (self.MASTER_NAME, "therm_bulk_read") and self.bulk_read:
+            if command != "trigger":
+                raise OSError(errno.EINVAL, "Invalid argument")
+            self._trigger_bulk_read()
+            return
+        parts = parts[1:] if parts[:1] == (self.MASTER_NAME,) and len(parts) == 3 else parts
+        sensor = self._get_sensor(parts[0]) if len(parts) == 2 else None
+        if sensor is None or parts[1] != "w1_slave":
+            raise FileNotFoundError(errno.ENOENT, "No such file", "/".join(parts))
+        if command == "0":
+            # persisting the resolution to the EEPROM changes nothing on the bus
+            return
+        if command not in ("9", "10", "11", "12"):
+            raise OSError(errno.EINVAL, "Invalid argument")
+        with self._lock:
+            sensor.resolution = int(command)
+
+
+class _WriteBuffer(io.StringIO):
+    def __init__(self, path: "SimulatedPath") -> None:
+        super().__init__()
+        self._path = path
+
+    def close(self) -> None:
+        if not self.closed:
+            data = self.getvalue()
+            super().close()
+            self._path.bus.write_file(self._path.parts, data)
+
+
+class SimulatedPath:
+    """
+    Represents a file or directory of a ``SimulatedBus``.
+
+    Implements the subset of ``pathlib.Path`` used by ``W1ThermSensor``.
+    """
+
+    def __init__(self, bus: SimulatedBus, parts: Tuple[str, ...]) -> None:
+        self.bus = bus
+        self.parts = parts
+
+    def __truediv__(self, name: str) -> "SimulatedPath":
+        return SimulatedPath(self.bus, self.parts + tuple(str(name).split("/")))
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, SimulatedPath)
+            and other.bus is self.bus
+            and other.parts == self.parts
+        )
+
+    def __lt__(self, other: "SimulatedPath") -> bool:
+        return self.parts < other.parts
+
+    def __hash__(self) -> int:
+        return hash((id(self.bus), self.parts))
+
+    def __str__(self) -> str:
+        return "/".join(("<simulated>",) + self.parts)
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return "SimulatedPath('{0}')".format(self)
+
+    @property
+    def name(self) -> str:
+        """Returns the final component of this path"""
+        return self.parts[-1] if self.parts else ""
+
+    @property
+    def parent(self) -> "SimulatedPath":
+        """Returns the directory containing this path"""
+        return SimulatedPath(self.bus, self.parts[:-1])
+
+    def is_dir(self) -> bool:
+        return self.bus.listdir(self.parts) is not None
+
+    def exists(self) -> bool:
+        if self.is_dir():
+            return True
+        entries = self.bus.listdir(self.parts[:-1]) if self.parts else None
+        return entries is not None and self.parts[-1] in entries
+
+    def iterdir(self) -> Iterator["SimulatedPath"]:
+        entries = self.bus.listdir(self.parts)
+        if entries is None:
+            raise NotADirectoryError(errno.ENOTDIR, "Not a directory", str(self))
+        return (self / name for name in entries)
+
+    def glob(self, pattern: str) -> Iterator["SimulatedPath"]:
+        return (p for p in self.iterdir() if fnmatch.fnmatch(p.name, pattern))
+
+    def open(self, mode: str = "r"):
+        if "w" in mode:
+            if "b" in mode:
+                raise ValueError("Binary writes are not supported")
+            return _WriteBuffer(self)
+        data = self.bus.read_file(self.parts)
+        return io.BytesIO(data.encode()) if "b" in mode else io.StringIO(data)
+
+    def read_text(self) -> str:
+        return self.bus.read_file(self.parts)
+
+    def read_bytes(self) -> bytes:
+        return self.bus.read_file(self.parts).encode()
+
+    def write_text(self, data: str) -> int:
+        self.bus.write_file(self.parts, data)
+        return len(data)